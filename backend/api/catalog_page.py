@@ -0,0 +1,355 @@
+import asyncio
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, F, Q
+from django.http import Http404
+
+from catalog.attributes import filter_by_attributes
+from catalog.facets import (
+    DEFAULT_BUCKETS,
+    HISTOGRAM_MODES,
+    MAX_BUCKETS,
+    PRICE_FACET,
+    cached_category_histograms,
+)
+from catalog.fitment import filter_by_vehicle
+from catalog.metadata import banners, catalog_metadata
+from catalog.models import CategoryAttribute, Product, ProductAttributeValue
+from catalog.popularity import sort_products
+
+from .serializers import BannerSerializer, CatalogProductSerializer
+
+DEFAULT_PAGE_SIZE = 9
+
+
+def _int_param(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class CatalogPage:
+    """
+    Catalog page for one set of query params. ``resolve`` loads the category
+    tree; after it the ``fetch_*`` methods are independent of each other, so
+    ``build`` runs them in turn and ``abuild`` runs them concurrently.
+    """
+
+    def __init__(self, query_params):
+        self.query_params = query_params
+        self.page_number = max(_int_param(query_params.get("page", 1), 1), 1)
+        self.page_size = _int_param(query_params.get("page_size", DEFAULT_PAGE_SIZE), DEFAULT_PAGE_SIZE)
+        if self.page_size < 1:
+            self.page_size = DEFAULT_PAGE_SIZE
+        self.histogram_mode = query_params.get("histogram")
+        if self.histogram_mode not in HISTOGRAM_MODES:
+            self.histogram_mode = HISTOGRAM_MODES[0]
+        self.buckets = min(
+            max(_int_param(query_params.get("buckets", DEFAULT_BUCKETS), DEFAULT_BUCKETS), 1),
+            MAX_BUCKETS,
+        )
+        self.categories = []
+        self.category = None
+
+    def resolve(self):
+        """
+        Load active categories and pick the requested one (the first by default).
+        Returns False when there are no categories at all.
+        """
+
+        self.metadata = catalog_metadata()
+        self.categories = list(self.metadata.categories)
+        if not self.categories:
+            return False
+        category_id = self.query_params.get("category")
+        if category_id:
+            by_id = {str(item.id): item for item in self.categories}
+            self.category = by_id.get(str(category_id).strip())
+            if self.category is None:
+                raise Http404("No Category matches the given query.")
+        else:
+            self.category = self.categories[0]
+
+        self.categories_by_parent = {}
+        for item in self.categories:
+            self.categories_by_parent.setdefault(item.parent_id, []).append(item)
+        self.descendant_ids = self._collect_descendant_ids(self.category.id)
+        self.base_products = Product.objects.filter(is_active=True, category_id__in=self.descendant_ids)
+        self.filtered_products = self._filter(self.base_products)
+        return True
+
+    def _collect_descendant_ids(self, start_id):
+        ids = []
+        stack = [start_id]
+        while stack:
+            current_id = stack.pop()
+            ids.append(current_id)
+            for child in self.categories_by_parent.get(current_id, []):
+                stack.append(child.id)
+        return ids
+
+    def _build_tree(self, parent_id=None):
+        return [
+            {
+                "id": item.id,
+                "name": item.name,
+                "slug": item.slug,
+                "image_url": item.image_url.url if item.image_url else "",
+                "children": self._build_tree(item.id),
+            }
+            for item in self.categories_by_parent.get(parent_id, [])
+        ]
+
+    def _breadcrumbs(self):
+        by_id = {item.id: item for item in self.categories}
+        breadcrumbs = []
+        current = self.category
+        while current:
+            breadcrumbs.append({"id": current.id, "name": current.name, "slug": current.slug})
+            current = by_id.get(current.parent_id) or current.parent
+        breadcrumbs.reverse()
+        return breadcrumbs
+
+    def _filter(self, products):
+        params = self.query_params
+        brands = params.getlist("brand")
+        search = params.get("search")
+        min_price = params.get("min_price")
+        max_price = params.get("max_price")
+        if brands:
+            products = products.filter(brand_id__in=brands)
+        if search:
+            products = products.filter(Q(name__icontains=search) | Q(description__icontains=search))
+        if min_price:
+            products = products.filter(price__gte=min_price)
+        if max_price:
+            products = products.filter(price__lte=max_price)
+        if params.get("in_stock") in {"1", "true", "yes"}:
+            products = products.filter(stock_quantity__gt=F("stock_reserved"))
+        products = filter_by_attributes(
+            products,
+            params.getlist("attribute"),
+            params.getlist("attribute_min"),
+            params.getlist("attribute_max"),
+        )
+        return filter_by_vehicle(products, params)
+
+    def fetch_count(self):
+        return self.filtered_products.count()
+
+    def fetch_results(self, page_number):
+        offset = (page_number - 1) * self.page_size
+        products = (
+            sort_products(self.filtered_products, self.query_params.get("sort"))
+            .select_related("brand", "category")
+            .prefetch_related("media")[offset:offset + self.page_size]
+        )
+        return CatalogProductSerializer(products, many=True).data
+
+    def fetch_brands(self):
+        return [
+            {"id": item["brand_id"], "name": item["brand__name"], "count": item["count"]}
+            for item in self.base_products.values("brand_id", "brand__name")
+            .annotate(count=Count("id"))
+            .order_by("brand__name")
+        ]
+
+    def fetch_attributes(self):
+        return list(self.metadata.attributes.get(self.category.id, ()))
+
+    def fetch_options(self):
+        """
+        Value counts for every filterable string and boolean attribute of the
+        category in one grouped query, keyed by attribute id.
+        """
+
+        rows = (
+            ProductAttributeValue.objects.filter(
+                product__in=self.base_products,
+                attribute__category=self.category,
+                attribute__is_filterable=True,
+            )
+            .exclude(attribute__data_type=CategoryAttribute.DataType.NUMBER)
+            .values("attribute_id", "attribute__data_type", "value_string", "value_boolean")
+            .annotate(count=Count("id"))
+            .order_by("attribute_id", "value_boolean", "value_string")
+        )
+        options = {}
+        for row in rows:
+            if row["attribute__data_type"] == CategoryAttribute.DataType.BOOLEAN:
+                if row["value_boolean"] is None:
+                    continue
+                value = str(row["value_boolean"]).lower()
+                label = "Да" if row["value_boolean"] else "Нет"
+            else:
+                if row["value_string"] == "":
+                    continue
+                value = label = row["value_string"]
+            attribute_options = options.setdefault(row["attribute_id"], {})
+            if value in attribute_options:
+                attribute_options[value]["count"] += row["count"]
+            else:
+                attribute_options[value] = {"value": value, "label": label, "count": row["count"]}
+        return {attribute_id: list(values.values()) for attribute_id, values in options.items()}
+
+    def fetch_histograms(self, attributes):
+        return cached_category_histograms(
+            self.descendant_ids,
+            self.base_products,
+            [
+                attribute.id
+                for attribute in attributes
+                if attribute.data_type == CategoryAttribute.DataType.NUMBER
+            ],
+            mode=self.histogram_mode,
+            buckets=self.buckets,
+        )
+
+    def fetch_banners(self):
+        return BannerSerializer(banners(), many=True).data
+
+    def last_page(self, count):
+        return max(math.ceil(count / self.page_size), 1)
+
+    def build(self):
+        if not self.resolve():
+            return self.empty_payload(self.fetch_banners())
+        count = self.fetch_count()
+        page_number = min(self.page_number, self.last_page(count))
+        attributes = self.fetch_attributes()
+        return self.payload(
+            count=count,
+            page_number=page_number,
+            results=self.fetch_results(page_number),
+            brands=self.fetch_brands(),
+            attributes=attributes,
+            options=self.fetch_options(),
+            histograms=self.fetch_histograms(attributes),
+            banners=self.fetch_banners(),
+        )
+
+    async def abuild(self):
+        """
+        Same payload as ``build``. Each query runs on its own worker thread (and
+        so its own database connection); the requested page is fetched
+        alongside the count and only refetched when it turns out to be past
+        the last page.
+        """
+
+        if not await run_query(self.resolve):
+            return self.empty_payload(await run_query(self.fetch_banners))
+
+        async def attribute_facets():
+            attributes = await run_query(self.fetch_attributes)
+            histograms = await run_query(self.fetch_histograms, attributes)
+            return attributes, histograms
+
+        count, results, brands, (attributes, histograms), options, banners = await asyncio.gather(
+            run_query(self.fetch_count),
+            run_query(self.fetch_results, self.page_number),
+            run_query(self.fetch_brands),
+            attribute_facets(),
+            run_query(self.fetch_options),
+            run_query(self.fetch_banners),
+        )
+        page_number = min(self.page_number, self.last_page(count))
+        if page_number != self.page_number:
+            results = await run_query(self.fetch_results, page_number)
+        return self.payload(
+            count=count,
+            page_number=page_number,
+            results=results,
+            brands=brands,
+            attributes=attributes,
+            options=options,
+            histograms=histograms,
+            banners=banners,
+        )
+
+    def empty_payload(self, banners):
+        return {
+            "category": None,
+            "breadcrumbs": [],
+            "category_tree": [],
+            "filters": {"brands": [], "attributes": [], "price": None},
+            "products": {"count": 0, "page": 1, "page_size": 0, "results": []},
+            "banners": banners,
+        }
+
+    def payload(self, *, count, page_number, results, brands, attributes, options, histograms, banners):
+        attribute_payloads = []
+        for attribute in attributes:
+            payload = {
+                "id": attribute.id,
+                "name": attribute.name,
+                "unit": attribute.unit,
+                "data_type": attribute.data_type,
+                "filter_type": attribute.filter_type,
+                "options": [],
+                "range": None,
+                "histogram": None,
+            }
+            if attribute.data_type == CategoryAttribute.DataType.NUMBER:
+                histogram = histograms.get(attribute.id)
+                if histogram is not None:
+                    payload["range"] = {"min": histogram["min"], "max": histogram["max"]}
+                    payload["histogram"] = histogram["buckets"]
+            else:
+                payload["options"] = options.get(attribute.id, [])
+            attribute_payloads.append(payload)
+
+        category = self.category
+        return {
+            "category": {"id": category.id, "name": category.name, "slug": category.slug},
+            "breadcrumbs": self._breadcrumbs(),
+            "category_tree": self._build_tree(None),
+            "filters": {
+                "brands": brands,
+                "attributes": attribute_payloads,
+                "price": histograms.get(PRICE_FACET),
+            },
+            "products": {
+                "count": count,
+                "page": page_number,
+                "page_size": self.page_size,
+                "results": results,
+            },
+            "banners": banners,
+        }
+
+
+_executor = None
+
+
+def query_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.CATALOG_QUERY_WORKERS, thread_name_prefix="catalog-query"
+        )
+    return _executor
+
+
+def _with_connection(func, *args):
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_query(func, *args):
+    """
+    Run ``func`` on the catalog query pool. Its threads keep their own
+    database connections (subject to ``CONN_MAX_AGE``), which makes the pool
+    the per-process connection pool for concurrent catalog reads.
+    """
+
+    return await sync_to_async(_with_connection, thread_sensitive=False, executor=query_executor())(
+        func, *args
+    )
@@ -0,0 +1,100 @@
+from django.db import IntegrityError, transaction
+
+from storage import minio_client
+
+from .models import FileContent, FileRecord
+
+
+def _lock_content(owner, sha256, size, content_type):
+    contents = FileContent.objects.select_for_update().filter(owner=owner, sha256=sha256)
+    content = contents.first()
+    if content is not None:
+        return content, False
+    try:
+        with transaction.atomic():
+            content = FileContent.objects.create(
+                owner=owner,
+                sha256=sha256,
+                object_key=minio_client.make_content_key(sha256, owner.pk),
+                size=size,
+                content_type=content_type,
+            )
+    except IntegrityError:
+        return contents.get(), False
+    return content, True
+
+
+def create_file_record(*, filename, content_type="", size=0, sha256="", user=None):
+    """
+    Create a ``FileRecord`` and return ``(record, upload_url)``.
+
+    With a ``sha256`` (and a ``user``) the record links to the user's
+    ``FileContent`` for that digest; ``upload_url`` is ``None`` when the
+    bucket already holds it. Other users' content with the same digest is
+    never reused: knowing a hash must not grant access to the file.
+    """
+
+    if not sha256 or user is None:
+        key = minio_client.make_object_key(filename)
+        upload_url = minio_client.presigned_put_url(
+            key, content_type=content_type or None, expires_in=900
+        )
+        record = FileRecord.objects.create(
+            object_key=key,
+            filename=filename,
+            content_type=content_type,
+            size=size,
+            uploaded_by=user,
+        )
+        return record, upload_url
+
+    with transaction.atomic():
+        content, created = _lock_content(user, sha256, size, content_type)
+        update_fields = ["ref_count"]
+        if not created and not content.is_uploaded and minio_client.object_exists(content.object_key):
+            content.is_uploaded = True
+            update_fields.append("is_uploaded")
+        content.ref_count += 1
+        content.save(update_fields=update_fields)
+        record = FileRecord.objects.create(
+            object_key=content.object_key,
+            content=content,
+            filename=filename,
+            content_type=content_type or content.content_type,
+            size=content.size or size,
+            uploaded_by=user,
+        )
+
+    if content.is_uploaded:
+        return record, None
+    upload_url = minio_client.presigned_put_url(
+        content.object_key,
+        content_type=content.content_type or None,
+        expires_in=900,
+        sha256=sha256,
+    )
+    return record, upload_url
+
+
+def delete_file_record(record):
+    """
+    Delete ``record``; its object is removed from the bucket only when no other
+    record references the same content.
+    """
+
+    with transaction.atomic():
+        key = record.object_key
+        release = True
+        if record.content_id is None:
+            record.delete()
+        else:
+            content = FileContent.objects.select_for_update().get(pk=record.content_id)
+            record.delete()
+            content.ref_count = max(content.ref_count - 1, 0)
+            if content.ref_count:
+                content.save(update_fields=["ref_count"])
+                release = False
+            else:
+                content.delete()
+        if release:
+            transaction.on_commit(lambda: minio_client.delete_object(key))
@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from config.bootstrap import collect_static, ensure_superuser, migrate, reset_multiprocess_dir
+from minio_setup import ensure_minio_bucket
+
+ROLES = ("web", "worker")
+
+
+def _in_thread(step):
+    try:
+        return step()
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Prepare a container before its main process starts. Web containers apply "
+        "pending migrations, then collect static files, set up the MinIO bucket and "
+        "create the superuser concurrently; workers only reset their metrics directory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--role", choices=ROLES, default="web")
+
+    def handle(self, *args, **options):
+        message = reset_multiprocess_dir()
+        if message:
+            self.stdout.write(message)
+        if options["role"] == "worker":
+            return
+
+        self.stdout.write(migrate())
+        # Independent and idempotent; each thread uses its own database connection.
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="bootstrap") as pool:
+            futures = [pool.submit(_in_thread, step) for step in (collect_static, ensure_minio_bucket, ensure_superuser)]
+        for future in futures:
+            message = future.result()
+            if message:
+                self.stdout.write(message)
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.10 on 2026-10-19 08:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_filerecord_uploaded_by'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileContent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('object_key', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('content_type', models.CharField(blank=True, default='', max_length=100)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('is_uploaded', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='filerecord',
+            name='object_key',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='filerecord',
+            name='content',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='records', to='api.filecontent'),
+        ),
+        migrations.AddConstraint(
+            model_name='filerecord',
+            constraint=models.UniqueConstraint(condition=models.Q(('content__isnull', True)), fields=('object_key',), name='file_record_unique_private_key'),
+        ),
+    ]
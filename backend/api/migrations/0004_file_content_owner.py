@@ -0,0 +1,48 @@
+# Generated by Django 5.2.10 on 2026-10-19 09:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def assign_single_owners(apps, schema_editor):
+    # Content whose records all belong to one user stays reusable by that
+    # user; content already shared between users keeps no owner and is
+    # never reused again.
+    FileContent = apps.get_model("api", "FileContent")
+    owned = (
+        FileContent.objects.annotate(
+            owners=Count("records__uploaded_by", distinct=True), owner_pk=Max("records__uploaded_by")
+        )
+        .filter(owners=1)
+        .values_list("pk", "owner_pk")
+    )
+    for pk, owner_pk in owned:
+        FileContent.objects.filter(pk=pk).update(owner_id=owner_pk)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_file_content'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filecontent',
+            name='owner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='file_contents', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='filecontent',
+            name='sha256',
+            field=models.CharField(max_length=64),
+        ),
+        migrations.RunPython(assign_single_owners, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='filecontent',
+            constraint=models.UniqueConstraint(fields=('owner', 'sha256'), name='file_content_unique_owner_sha256'),
+        ),
+    ]
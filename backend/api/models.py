@@ -4,9 +4,43 @@ from django.conf import settings
 from django.db import models
 
 
+class FileContent(models.Model):
+    """
+    A content-addressed object in the bucket, shared by every ``FileRecord``
+    its owner uploaded with the same SHA-256. ``ref_count`` tracks those
+    records so the object is only removed once the last one is deleted.
+
+    Content is never shared between users: a digest alone proves nothing, so
+    another user claiming it must upload the bytes under their own key.
+    """
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="file_contents",
+    )
+    sha256 = models.CharField(max_length=64)
+    object_key = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    content_type = models.CharField(max_length=100, blank=True, default="")
+    ref_count = models.PositiveIntegerField(default=0)
+    is_uploaded = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "sha256"], name="file_content_unique_owner_sha256"),
+        ]
+
+    def __str__(self):
+        return f"{self.sha256} ({self.ref_count} refs)"
+
+
 class FileRecord(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    object_key = models.CharField(max_length=255, unique=True)
+    object_key = models.CharField(max_length=255, db_index=True)
     filename = models.CharField(max_length=255)
     content_type = models.CharField(max_length=100, blank=True, default="")
     size = models.PositiveBigIntegerField(default=0)
@@ -18,6 +52,23 @@ class FileRecord(models.Model):
         on_delete=models.SET_NULL,
         related_name="file_records",
     )
+    content = models.ForeignKey(
+        FileContent,
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+        related_name="records",
+    )
+
+    class Meta:
+        constraints = [
+            # Content-addressed records share their object; every other key stays unique.
+            models.UniqueConstraint(
+                fields=["object_key"],
+                condition=models.Q(content__isnull=True),
+                name="file_record_unique_private_key",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.filename} ({self.object_key})"
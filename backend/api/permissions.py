@@ -0,0 +1,17 @@
+from rest_framework.permissions import BasePermission
+
+from cart.guest_store import guest_carts_enabled
+
+
+class IsAuthenticatedOrGuestCart(BasePermission):
+    """
+    Authenticated users, or anonymous visitors while guest carts live in Redis
+    (``GUEST_CART_BACKEND`` "redis"); their cart is the one named by the
+    signed guest cookie.
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        if user and user.is_authenticated:
+            return True
+        return guest_carts_enabled()
@@ -10,8 +10,12 @@ from catalog.models import (
     Product,
     ProductAttributeValue,
     ProductMedia,
+    VehicleGeneration,
+    VehicleMake,
+    VehicleModel,
 )
-from orders.models import Order, OrderItem
+from catalog.popularity import record_sales
+from orders.models import ArchivedOrder, FrequentlyBoughtTogether, Order, OrderItem
 
 from .models import FileRecord
 
@@ -20,12 +24,17 @@ class PresignUploadRequestSerializer(serializers.Serializer):
     filename = serializers.CharField(max_length=255)
     content_type = serializers.CharField(max_length=100, required=False, allow_blank=True)
     size = serializers.IntegerField(required=False, min_value=0)
+    sha256 = serializers.RegexField(r"^[0-9a-fA-F]{64}$", required=False)
+
+    def validate_sha256(self, value):
+        return value.lower()
 
 
 class PresignUploadResponseSerializer(serializers.Serializer):
     id = serializers.UUIDField()
     object_key = serializers.CharField()
-    upload_url = serializers.CharField()
+    upload_url = serializers.CharField(allow_null=True)
+    already_present = serializers.BooleanField()
 
 
 class PresignDownloadResponseSerializer(serializers.Serializer):
@@ -36,9 +45,11 @@ class PresignDownloadResponseSerializer(serializers.Serializer):
 
 
 class FileRecordSerializer(serializers.ModelSerializer):
+    sha256 = serializers.CharField(source="content.sha256", read_only=True, default=None)
+
     class Meta:
         model = FileRecord
-        fields = ["id", "object_key", "filename", "content_type", "size", "created_at"]
+        fields = ["id", "object_key", "filename", "content_type", "size", "sha256", "created_at"]
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -139,15 +150,25 @@ class ProductSerializer(serializers.ModelSerializer):
             "updated_at",
             "media",
             "attributes",
+            "attribute_data",
         ]
 
 
+class BoughtTogetherSerializer(serializers.ModelSerializer):
+    stock_available = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Product
+        fields = ["id", "name", "slug", "price", "stock_available"]
+
+
 class ProductDetailSerializer(serializers.ModelSerializer):
     media = ProductMediaSerializer(many=True, read_only=True)
     attributes = ProductAttributeValueSerializer(many=True, read_only=True)
     stock_available = serializers.IntegerField(read_only=True)
     brand = BrandSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
+    bought_together = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
@@ -167,8 +188,21 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             "updated_at",
             "media",
             "attributes",
+            "attribute_data",
+            "bought_together",
         ]
 
+    def get_bought_together(self, obj):
+        # One lookup on the (product, rank) unique index.
+        recommendations = (
+            FrequentlyBoughtTogether.objects.filter(product=obj, recommended__is_active=True)
+            .select_related("recommended")
+            .order_by("rank")
+        )
+        return BoughtTogetherSerializer(
+            [item.recommended for item in recommendations], many=True
+        ).data
+
 
 class CatalogProductSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
@@ -186,15 +220,35 @@ class CatalogProductSerializer(serializers.ModelSerializer):
             "brand_name",
             "stock_available",
             "image_url",
+            "attribute_data",
         ]
 
     def get_image_url(self, obj):
-        media = obj.media.order_by("sort_order").first()
+        # Picked in Python so a prefetched ``media`` set is reused.
+        media = min(obj.media.all(), key=lambda item: (item.sort_order, item.id), default=None)
         if media and media.file_url:
             return media.file_url.url
         return ""
 
 
+class VehicleMakeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VehicleMake
+        fields = ["id", "name", "slug"]
+
+
+class VehicleModelSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VehicleModel
+        fields = ["id", "make", "name", "slug"]
+
+
+class VehicleGenerationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VehicleGeneration
+        fields = ["id", "model", "name", "year_from", "year_to"]
+
+
 class CartItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
@@ -238,6 +292,93 @@ class CartSerializer(serializers.ModelSerializer):
         return super().validate(attrs)
 
 
+class GuestCartItemSerializer(serializers.Serializer):
+    """
+    Guest cart line in the same shape as ``CartItemSerializer``; the line id is the product id.
+    Products are looked up in ``context["products"]``.
+    """
+
+    id = serializers.IntegerField(source="product_id")
+    cart = serializers.CharField(source="session_id")
+    product = serializers.SerializerMethodField()
+    quantity = serializers.IntegerField()
+    price_snapshot = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+    def get_product(self, obj):
+        product = self.context.get("products", {}).get(obj["product_id"])
+        return ProductSerializer(product).data if product else None
+
+
+class GuestCartSerializer(serializers.Serializer):
+    id = serializers.CharField(source="session_id")
+    user = serializers.IntegerField(default=None)
+    session_id = serializers.CharField()
+    created_at = serializers.DateTimeField(allow_null=True)
+    updated_at = serializers.DateTimeField(allow_null=True)
+    items = serializers.SerializerMethodField()
+
+    def get_items(self, obj):
+        lines = [
+            {**line, "session_id": obj["session_id"]} for line in obj["lines"].values()
+        ]
+        return GuestCartItemSerializer(lines, many=True, context=self.context).data
+
+
+class GuestCartItemWriteSerializer(serializers.Serializer):
+    product_id = serializers.PrimaryKeyRelatedField(
+        source="product", queryset=Product.objects.filter(is_active=True), required=False
+    )
+    quantity = serializers.IntegerField(min_value=0, default=1)
+
+
+class CartLineSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=0)
+
+
+class CartLinesSerializer(serializers.Serializer):
+    lines = CartLineSerializer(many=True, allow_empty=False, max_length=500)
+
+    def validate_lines(self, lines):
+        quantities = {line["product_id"]: line["quantity"] for line in lines}
+        prices = dict(
+            Product.objects.filter(id__in=quantities, is_active=True).values_list("id", "price")
+        )
+        missing = sorted(
+            product_id
+            for product_id, quantity in quantities.items()
+            if quantity > 0 and product_id not in prices
+        )
+        if missing:
+            raise serializers.ValidationError(
+                f"Unknown or inactive products: {', '.join(map(str, missing))}."
+            )
+        self.prices = prices
+        return quantities
+
+
+class CartSummaryLineSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    product_id = serializers.IntegerField()
+    name = serializers.CharField()
+    quantity = serializers.IntegerField()
+    price_snapshot = serializers.DecimalField(max_digits=12, decimal_places=2)
+    current_price = serializers.DecimalField(max_digits=12, decimal_places=2)
+    price_changed = serializers.BooleanField()
+    line_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    stock_available = serializers.IntegerField()
+    in_stock = serializers.BooleanField()
+
+
+class CartSummarySerializer(serializers.Serializer):
+    cart = serializers.IntegerField(allow_null=True)
+    item_count = serializers.IntegerField()
+    grand_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    has_price_changes = serializers.BooleanField()
+    all_in_stock = serializers.BooleanField()
+    lines = CartSummaryLineSerializer(many=True)
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
@@ -270,6 +411,13 @@ class OrderSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["user", "status", "created_at", "updated_at"]
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.instance is not None:
+            # Items are fixed once the order is placed; nested writes are not supported.
+            fields["items"].read_only = True
+        return fields
+
     @transaction.atomic
     def create(self, validated_data):
         items_data = validated_data.pop("items", [])
@@ -278,6 +426,7 @@ class OrderSerializer(serializers.ModelSerializer):
 
         order = Order.objects.create(**validated_data)
         subtotal = 0
+        sold = {}
 
         for item in items_data:
             product = (
@@ -300,8 +449,52 @@ class OrderSerializer(serializers.ModelSerializer):
             product.stock_quantity = product.stock_quantity - item["quantity"]
             product.save(update_fields=["stock_quantity"])
             subtotal += price_snapshot * item["quantity"]
+            sold[product.pk] = sold.get(product.pk, 0) + item["quantity"]
 
+        record_sales(sold)
         order.subtotal = subtotal
         order.grand_total = subtotal + order.shipping_total + order.tax_total - order.discount_total
         order.save(update_fields=["subtotal", "grand_total"])
         return order
+
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    """
+    Renders an archived order in the same shape as ``OrderSerializer``.
+    Products referenced by the items are expected in ``context["products"]``.
+    """
+
+    items = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedOrder
+        fields = [
+            "id",
+            "user",
+            "status",
+            "subtotal",
+            "shipping_total",
+            "tax_total",
+            "discount_total",
+            "grand_total",
+            "created_at",
+            "updated_at",
+            "items",
+        ]
+        read_only_fields = fields
+
+    def get_items(self, obj):
+        products = self.context.get("products", {})
+        items = []
+        for item in obj.items:
+            product = products.get(item["product_id"])
+            items.append(
+                {
+                    "id": item["id"],
+                    "order": obj.id,
+                    "product": ProductSerializer(product).data if product else None,
+                    "quantity": item["quantity"],
+                    "price_snapshot": item["price_snapshot"],
+                }
+            )
+        return items
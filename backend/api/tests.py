@@ -1,19 +1,77 @@
+import json
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+from datetime import timedelta
 from decimal import Decimal
-from unittest.mock import patch
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
 
+from asgiref.sync import async_to_sync
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError
-from django.test import TestCase
+from django.contrib.auth.models import AnonymousUser
+from django.core import signing
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.http import JsonResponse
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver
+from django.utils import timezone
+from redis.exceptions import RedisError, WatchError
 from rest_framework import serializers, status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
+from cart.guest_store import COOKIE_SALT, GuestCartStore
 from cart.models import Cart, CartItem
-from catalog.models import Brand, Category, CategoryAttribute, Product, ProductAttributeValue
-from orders.models import Order, OrderItem
+from catalog.attributes import refresh_attribute_data
+from catalog.cache import category_version
+from catalog.models import (
+    Banner,
+    Brand,
+    Category,
+    CategoryAttribute,
+    Product,
+    ProductAttributeValue,
+    ProductFitment,
+    ProductMedia,
+    VehicleGeneration,
+    VehicleMake,
+    VehicleModel,
+)
+from config import bootstrap, db_router, load_shedding, warmup
+from config.batching import FLUSH_MAX_RETRIES, CoalescingBatch
+from config.celery import app as celery_app, queue_prefetch_multiplier
+from config.sizing import worker_layout
+from orders.archive import archive_orders
+from orders.models import ArchivedOrder, FrequentlyBoughtTogether, Order, OrderItem
+from storage import tiered_cache
+from storage.tiered_cache import TieredCache
 
-from .models import FileRecord
+from . import urls as api_urls
+from .models import FileContent, FileRecord
+from .throttling import take_token
+from .views import AsyncCatalogPageView
 from .serializers import CartItemSerializer, CartSerializer, OrderSerializer
 
+try:
+    import fakeredis
+except ImportError:  # pragma: no cover - optional test dependency
+    fakeredis = None
+
 
 User = get_user_model()
 
@@ -83,6 +141,94 @@ class FileViewSetTests(APITestBase):
         self.assertEqual(response.json()["download_url"], "https://minio.test/download")
         self.assertEqual(response.json()["filename"], "file.csv")
 
+    @patch("api.files.minio_client.object_exists", return_value=False)
+    @patch("api.files.minio_client.presigned_put_url", return_value="https://minio.test/upload")
+    def test_presign_upload_with_known_hash_links_existing_content(self, mocked_presign, _):
+        self.client.force_authenticate(user=self.user)
+        payload = {"filename": "brochure.pdf", "size": 2048, "sha256": "AB" * 32}
+
+        first = self.client.post("/api/files/presign-upload/", payload, format="json")
+        FileContent.objects.update(is_uploaded=True)
+        payload["filename"] = "brochure-copy.pdf"
+        second = self.client.post("/api/files/presign-upload/", payload, format="json")
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(first.json()["already_present"])
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(second.json()["already_present"])
+        self.assertIsNone(second.json()["upload_url"])
+        self.assertEqual(first.json()["object_key"], second.json()["object_key"])
+        self.assertEqual(mocked_presign.call_count, 1)
+        self.assertEqual(mocked_presign.call_args.kwargs["sha256"], "ab" * 32)
+        content = FileContent.objects.get()
+        self.assertEqual(content.ref_count, 2)
+        self.assertEqual(FileRecord.objects.filter(content=content).count(), 2)
+
+    @patch("api.files.minio_client.object_exists", return_value=True)
+    @patch("api.files.minio_client.presigned_put_url", return_value="https://minio.test/upload")
+    def test_presign_upload_confirms_pending_content_in_bucket(self, mocked_presign, _):
+        self.client.force_authenticate(user=self.user)
+        payload = {"filename": "a.png", "sha256": "cd" * 32}
+
+        self.client.post("/api/files/presign-upload/", payload, format="json")
+        response = self.client.post("/api/files/presign-upload/", payload, format="json")
+
+        self.assertTrue(response.json()["already_present"])
+        self.assertTrue(FileContent.objects.get().is_uploaded)
+        self.assertEqual(mocked_presign.call_count, 1)
+
+    @patch("api.views.minio_client.presigned_get_url", return_value="https://minio.test/download")
+    @patch("api.files.minio_client.object_exists", return_value=True)
+    @patch("api.files.minio_client.presigned_put_url", return_value="https://minio.test/upload")
+    def test_known_hash_of_another_users_file_grants_no_access(self, mocked_put, _, mocked_get):
+        payload = {"filename": "contract.pdf", "sha256": "12" * 32}
+        self.client.force_authenticate(user=self.user)
+        owner = self.client.post("/api/files/presign-upload/", payload, format="json").json()
+        FileContent.objects.update(is_uploaded=True)
+
+        other = User.objects.create_user(username="other", email="other@example.com", password="password")
+        self.client.force_authenticate(user=other)
+        claim = self.client.post("/api/files/presign-upload/", payload, format="json").json()
+
+        self.assertFalse(claim["already_present"])
+        self.assertEqual(claim["upload_url"], "https://minio.test/upload")
+        self.assertNotEqual(claim["object_key"], owner["object_key"])
+        self.assertEqual(mocked_put.call_args.args[0], claim["object_key"])
+        self.assertFalse(FileContent.objects.get(owner=other).is_uploaded)
+
+        response = self.client.get(f"/api/files/{claim['id']}/presign-download/")
+        self.assertEqual(mocked_get.call_args.args[0], claim["object_key"])
+        self.assertEqual(self.client.get(f"/api/files/{owner['id']}/presign-download/").status_code, 404)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @patch("api.files.minio_client.delete_object")
+    def test_delete_removes_object_after_last_reference(self, mocked_delete):
+        content = FileContent.objects.create(
+            owner=self.user, sha256="ef" * 32, object_key="sha256/ef/x", ref_count=2, is_uploaded=True
+        )
+        records = [
+            FileRecord.objects.create(
+                object_key=content.object_key,
+                content=content,
+                filename=f"copy-{index}.txt",
+                uploaded_by=self.user,
+            )
+            for index in range(2)
+        ]
+        self.client.force_authenticate(user=self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f"/api/files/{records[0].id}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        content.refresh_from_db()
+        self.assertEqual(content.ref_count, 1)
+        mocked_delete.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/files/{records[1].id}/")
+        self.assertFalse(FileContent.objects.exists())
+        mocked_delete.assert_called_once_with("sha256/ef/x")
+
 
 class ProductViewSetTests(APITestBase):
     def test_product_filters_by_category(self):
@@ -113,11 +259,12 @@ class ProductViewSetTests(APITestBase):
             is_required=False,
             filter_type=CategoryAttribute.FilterType.CHECKBOX,
         )
-        ProductAttributeValue.objects.create(
-            product=self.product,
-            attribute=attribute,
-            value_boolean=True,
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductAttributeValue.objects.create(
+                product=self.product,
+                attribute=attribute,
+                value_boolean=True,
+            )
 
         response = self.client.get(f"/api/products/?attribute={attribute.id}:true")
 
@@ -126,6 +273,161 @@ class ProductViewSetTests(APITestBase):
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0]["id"], self.product.id)
 
+    def test_product_filters_by_attribute_range_and_value(self):
+        diameter = CategoryAttribute.objects.create(
+            category=self.category,
+            name="Diameter",
+            data_type=CategoryAttribute.DataType.NUMBER,
+            filter_type=CategoryAttribute.FilterType.RANGE,
+        )
+        color = CategoryAttribute.objects.create(
+            category=self.category,
+            name="Color",
+            data_type=CategoryAttribute.DataType.STRING,
+            filter_type=CategoryAttribute.FilterType.CHECKBOX,
+        )
+        other = Product.objects.create(
+            name="Gadget",
+            slug="gadget",
+            brand=self.brand,
+            category=self.category,
+            price=Decimal("30.00"),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            for product, size, shade in ((self.product, "280", "red"), (other, "320", "red")):
+                ProductAttributeValue.objects.create(
+                    product=product, attribute=diameter, value_number=Decimal(size)
+                )
+                ProductAttributeValue.objects.create(
+                    product=product, attribute=color, value_string=shade
+                )
+
+        response = self.client.get(
+            f"/api/products/?attribute={color.id}:red&attribute_min={diameter.id}:300"
+        )
+
+        results = response.json()
+        self.assertEqual([item["id"] for item in results], [other.id])
+        self.assertEqual(
+            results[0]["attribute_data"], {f"a{diameter.id}": 320.0, f"a{color.id}": "red"}
+        )
+
+        response = self.client.get(
+            f"/api/catalog-page/?category={self.category.id}&attribute_max={diameter.id}:300"
+        )
+
+        products = response.json()["products"]["results"]
+        self.assertEqual([item["id"] for item in products], [self.product.id])
+
+    def test_attribute_data_follows_value_changes(self):
+        attribute = CategoryAttribute.objects.create(
+            category=self.category,
+            name="Is New",
+            data_type=CategoryAttribute.DataType.BOOLEAN,
+        )
+        size = CategoryAttribute.objects.create(
+            category=self.category,
+            name="Size",
+            data_type=CategoryAttribute.DataType.NUMBER,
+        )
+        with patch(
+            "catalog.attributes.refresh_attribute_data", wraps=refresh_attribute_data
+        ) as refresh, self.captureOnCommitCallbacks(execute=True):
+            value = ProductAttributeValue.objects.create(
+                product=self.product, attribute=attribute, value_boolean=True
+            )
+            ProductAttributeValue.objects.create(
+                product=self.product, attribute=size, value_number=Decimal("4")
+            )
+            value.value_boolean = False
+            value.save()
+
+        # Once per transaction, not once per value row.
+        refresh.assert_called_once_with([self.product.id])
+        self.product.refresh_from_db()
+        self.assertEqual(
+            self.product.attribute_data, {f"a{attribute.id}": False, f"a{size.id}": 4.0}
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            value.delete()
+            self.product.attributes.filter(attribute=size).delete()
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.attribute_data, {})
+
+    def test_product_filters_by_vehicle_fitment(self):
+        make = VehicleMake.objects.create(name="Volkswagen", slug="volkswagen")
+        golf = VehicleModel.objects.create(make=make, name="Golf", slug="golf")
+        mk7 = VehicleGeneration.objects.create(model=golf, name="Mk7", year_from=2012, year_to=2019)
+        mk8 = VehicleGeneration.objects.create(model=golf, name="Mk8", year_from=2019, year_to=2024)
+        other = Product.objects.create(
+            name="Gadget",
+            slug="gadget",
+            brand=self.brand,
+            category=self.category,
+            price=Decimal("30.00"),
+        )
+        ProductFitment.objects.create(product=self.product, generation=mk7, year_from=2012, year_to=2016)
+        ProductFitment.objects.create(product=other, generation=mk7, year_from=2017, year_to=2019)
+        ProductFitment.objects.create(product=other, generation=mk8, year_from=2019, year_to=2024)
+
+        response = self.client.get(f"/api/products/?vehicle_generation={mk7.id}&vehicle_year=2018")
+        self.assertEqual([item["id"] for item in response.json()], [other.id])
+
+        response = self.client.get(f"/api/products/?vehicle_model={golf.id}")
+        self.assertEqual({item["id"] for item in response.json()}, {self.product.id, other.id})
+
+        response = self.client.get(
+            f"/api/catalog-page/?category={self.category.id}&vehicle_generation={mk7.id}&vehicle_year=2014"
+        )
+        products = response.json()["products"]["results"]
+        self.assertEqual([item["id"] for item in products], [self.product.id])
+
+        response = self.client.get(f"/api/vehicle-generations/?model={golf.id}")
+        self.assertEqual([item["name"] for item in response.json()], ["Mk7", "Mk8"])
+
+    def test_product_sort_modes(self):
+        cheap = Product.objects.create(
+            name="Zeta",
+            slug="zeta",
+            brand=self.brand,
+            category=self.category,
+            price=Decimal("5.00"),
+            popularity=3,
+        )
+
+        def ids(sort):
+            return [item["id"] for item in self.client.get(f"/api/products/?sort={sort}").json()]
+
+        self.assertEqual(ids("price_asc"), [cheap.id, self.product.id])
+        self.assertEqual(ids("price_desc"), [self.product.id, cheap.id])
+        self.assertEqual(ids("newest"), [cheap.id, self.product.id])
+        self.assertEqual(ids("popularity"), [cheap.id, self.product.id])
+        self.assertEqual(ids("unknown"), [self.product.id, cheap.id])
+
+    def test_catalog_page_returns_price_and_attribute_histograms(self):
+        diameter = CategoryAttribute.objects.create(
+            category=self.category,
+            name="Diameter",
+            data_type=CategoryAttribute.DataType.NUMBER,
+            filter_type=CategoryAttribute.FilterType.RANGE,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductAttributeValue.objects.create(
+                product=self.product, attribute=diameter, value_number=Decimal("280")
+            )
+
+        response = self.client.get(
+            f"/api/catalog-page/?category={self.category.id}&histogram=quantile&buckets=4"
+        )
+
+        filters = response.json()["filters"]
+        self.assertEqual(filters["price"]["buckets"], [{"from": 25.0, "to": 25.0, "count": 1}])
+        attribute = filters["attributes"][0]
+        self.assertEqual(attribute["range"], {"min": 280.0, "max": 280.0})
+        self.assertEqual(attribute["histogram"], [{"from": 280.0, "to": 280.0, "count": 1}])
+
     def test_product_filters_in_stock(self):
         response = self.client.get("/api/products/?in_stock=true")
 
@@ -134,6 +436,222 @@ class ProductViewSetTests(APITestBase):
         self.assertEqual(len(results), 1)
 
 
+class AsyncCatalogPageViewTests(TransactionTestCase):
+    def setUp(self):
+        brand = Brand.objects.create(name="Acme", slug="acme")
+        self.category = Category.objects.create(name="Brakes", slug="brakes")
+        material = CategoryAttribute.objects.create(
+            category=self.category, name="Material", data_type=CategoryAttribute.DataType.STRING
+        )
+        vented = CategoryAttribute.objects.create(
+            category=self.category, name="Vented", data_type=CategoryAttribute.DataType.BOOLEAN
+        )
+        diameter = CategoryAttribute.objects.create(
+            category=self.category,
+            name="Diameter",
+            data_type=CategoryAttribute.DataType.NUMBER,
+            filter_type=CategoryAttribute.FilterType.RANGE,
+        )
+        for index in range(5):
+            product = Product.objects.create(
+                name=f"Disc {index}",
+                slug=f"disc-{index}",
+                brand=brand,
+                category=self.category,
+                price=Decimal("10.00") * (index + 1),
+                stock_quantity=3,
+            )
+            ProductAttributeValue.objects.create(
+                product=product, attribute=material, value_string="steel" if index % 2 else "carbon"
+            )
+            ProductAttributeValue.objects.create(product=product, attribute=vented, value_boolean=index > 2)
+            ProductAttributeValue.objects.create(
+                product=product, attribute=diameter, value_number=Decimal(260 + index * 10)
+            )
+
+    def fetch_async(self, query):
+        request = AsyncRequestFactory().get(f"/api/catalog-page/?{query}")
+        return async_to_sync(AsyncCatalogPageView.as_view())(request)
+
+    def test_async_payload_matches_sync_view(self):
+        query = f"category={self.category.id}&page=2&page_size=2&sort=price_desc"
+
+        response = self.fetch_async(query)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        payload = json.loads(response.content)
+        self.assertEqual(payload, APIClient().get(f"/api/catalog-page/?{query}").json())
+        self.assertEqual([item["slug"] for item in payload["products"]["results"]], ["disc-2", "disc-1"])
+        options = {item["name"]: item["options"] for item in payload["filters"]["attributes"]}
+        self.assertEqual(
+            options["Material"],
+            [
+                {"value": "carbon", "label": "carbon", "count": 3},
+                {"value": "steel", "label": "steel", "count": 2},
+            ],
+        )
+        self.assertEqual([option["count"] for option in options["Vented"]], [3, 2])
+
+    def test_unknown_category_is_not_found(self):
+        inactive = Category.objects.create(name="Old", slug="old", is_active=False)
+
+        for category_id in (self.category.id + 100, inactive.id):
+            response = self.fetch_async(f"category={category_id}")
+
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(json.loads(response.content), {"detail": "Not found."})
+
+    def test_page_past_the_end_falls_back_to_last_page(self):
+        response = self.fetch_async(f"category={self.category.id}&page=9&page_size=2")
+
+        products = json.loads(response.content)["products"]
+        self.assertEqual(products["page"], 3)
+        self.assertEqual(len(products["results"]), 1)
+
+
+@override_settings(REPLICA_DATABASE_ALIASES=["replica1"])
+class ReplicaRoutingTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        db_router._health.clear()
+        cache.clear()
+        self.router = db_router.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request):
+        token = db_router._state.set(db_router.RoutingState())
+        try:
+            db_router.route_reads_to_replica(request)
+            return self.router.db_for_read(Product)
+        finally:
+            db_router._state.reset(token)
+
+    def get_request(self, user=None):
+        request = self.factory.get("/api/products/")
+        request.user = user or AnonymousUser()
+        return request
+
+    @patch("config.db_router.replica_lag", return_value=0.0)
+    def test_safe_request_reads_from_healthy_replica(self, replica_lag):
+        self.assertEqual(self.route(self.get_request()), "replica1")
+        self.assertEqual(self.route(self.get_request()), "replica1")
+        replica_lag.assert_called_once_with("replica1")
+
+    @patch("config.db_router.replica_lag", return_value=0.0)
+    def test_write_sends_remaining_reads_to_primary(self, replica_lag):
+        token = db_router._state.set(db_router.RoutingState())
+        try:
+            db_router.route_reads_to_replica(self.get_request())
+            self.assertEqual(self.router.db_for_read(Product), "replica1")
+            self.assertEqual(self.router.db_for_write(Product), "default")
+            self.assertIsNone(self.router.db_for_read(Product))
+        finally:
+            db_router._state.reset(token)
+
+    @patch("config.db_router.replica_lag", return_value=30.0)
+    def test_lagging_replica_falls_back_to_primary(self, replica_lag):
+        self.assertIsNone(self.route(self.get_request()))
+
+    @patch("config.db_router.connections")
+    @patch("config.db_router.replica_lag", side_effect=OperationalError("down"))
+    def test_unreachable_replica_falls_back_to_primary(self, replica_lag, connections):
+        self.assertIsNone(self.route(self.get_request()))
+        connections.__getitem__.return_value.close.assert_called_once_with()
+
+    @patch("config.db_router.replica_lag", return_value=0.0)
+    def test_recent_writer_is_pinned_to_primary(self, replica_lag):
+        request = self.get_request()
+        request.COOKIES[db_router.PIN_COOKIE] = str(time.time() + 10)
+        self.assertIsNone(self.route(request))
+
+        cache.set(f"{db_router.PIN_CACHE_PREFIX}:{self.user.pk}", 1)
+        self.assertIsNone(self.route(self.get_request(self.user)))
+
+    @override_settings(REPLICA_DATABASE_ALIASES=["default"])
+    def test_write_request_sets_primary_pin(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post("/api/carts/", {}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(db_router.PIN_COOKIE, response.cookies)
+        self.assertTrue(cache.get(f"{db_router.PIN_CACHE_PREFIX}:{self.user.pk}"))
+
+        response = self.client.get("/api/brands/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+
+
+class ProductBulkEditTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.other = Product.objects.create(
+            name="Gadget",
+            slug="gadget",
+            brand=self.brand,
+            category=self.category,
+            price=Decimal("30.00"),
+            stock_quantity=5,
+        )
+
+    def test_bulk_edit_requires_staff_role(self):
+        response = self.client.post(
+            "/api/products/bulk-edit/",
+            {"rows": [{"id": self.product.id, "price": "1.00"}]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_bulk_edit_applies_rows_and_bumps_category_version(self):
+        version = category_version(self.category.id)
+        self.client.force_authenticate(user=self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/products/bulk-edit/",
+                {
+                    "rows": [
+                        {"id": self.product.id, "price": "19.99", "stock_quantity": 3},
+                        {"id": self.other.id, "is_active": False},
+                    ]
+                },
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.json())
+        self.assertEqual(response.json(), {"updated": 2, "unchanged": 0})
+        self.product.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.product.price, Decimal("19.99"))
+        self.assertEqual(self.product.stock_quantity, 3)
+        self.assertFalse(self.other.is_active)
+        self.assertGreater(category_version(self.category.id), version)
+
+    def test_bulk_edit_rejects_whole_batch_on_invalid_rows(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post(
+            "/api/products/bulk-edit/",
+            {
+                "rows": [
+                    {"id": self.product.id, "price": "19.99"},
+                    {"id": self.other.id, "stock_quantity": -1},
+                    {"id": 99999, "is_active": True},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.json()["errors"]
+        self.assertEqual([error["index"] for error in errors], [1, 2])
+        self.assertIn("stock_quantity", errors[0]["errors"])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.price, Decimal("25.00"))
+
+
 class CartSerializerTests(APITestBase):
     def test_authenticated_cart_ignores_session_id(self):
         serializer = CartSerializer(
@@ -162,7 +680,7 @@ class CartSerializerTests(APITestBase):
 
 
 class CartViewSetTests(APITestBase):
-    def test_anonymous_cart_requires_session_id(self):
+    def test_anonymous_cart_requires_login(self):
         response = self.client.get("/api/carts/")
 
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -177,6 +695,137 @@ class CartViewSetTests(APITestBase):
         self.assertEqual(len(response.json()), 1)
 
 
+    def test_cart_list_query_count_does_not_grow_with_items(self):
+        cart = Cart.objects.create(user=self.user)
+        for index in range(3):
+            product = Product.objects.create(
+                name=f"Part {index}",
+                slug=f"part-{index}",
+                brand=self.brand,
+                category=self.category,
+                price=Decimal("10.00"),
+                stock_quantity=5,
+            )
+            CartItem.objects.create(
+                cart=cart, product=product, quantity=1, price_snapshot=product.price
+            )
+        self.client.force_authenticate(user=self.user)
+
+        with self.assertNumQueries(4):
+            response = self.client.get("/api/carts/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()[0]["items"]), 3)
+
+    def test_cart_summary_returns_database_totals(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(
+            cart=cart, product=self.product, quantity=2, price_snapshot=Decimal("20.00")
+        )
+        scarce = Product.objects.create(
+            name="Scarce",
+            slug="scarce",
+            brand=self.brand,
+            category=self.category,
+            price=Decimal("5.00"),
+            stock_quantity=1,
+        )
+        CartItem.objects.create(
+            cart=cart, product=scarce, quantity=3, price_snapshot=Decimal("5.00")
+        )
+        self.client.force_authenticate(user=self.user)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/carts/{cart.id}/summary/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        payload = response.json()
+        self.assertEqual(payload["item_count"], 5)
+        self.assertEqual(payload["grand_total"], "65.00")
+        self.assertTrue(payload["has_price_changes"])
+        self.assertFalse(payload["all_in_stock"])
+        first, second = payload["lines"]
+        self.assertEqual(first["current_price"], "25.00")
+        self.assertTrue(first["price_changed"])
+        self.assertTrue(first["in_stock"])
+        self.assertEqual(second["line_total"], "15.00")
+        self.assertFalse(second["in_stock"])
+
+    def test_cart_lines_upserts_and_removes_in_bulk(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(
+            cart=cart, product=self.product, quantity=1, price_snapshot=Decimal("20.00")
+        )
+        gadget = Product.objects.create(
+            name="Gadget",
+            slug="gadget",
+            brand=self.brand,
+            category=self.category,
+            price=Decimal("7.00"),
+            stock_quantity=5,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post(
+            f"/api/carts/{cart.id}/lines/",
+            {
+                "lines": [
+                    {"product_id": self.product.id, "quantity": 4},
+                    {"product_id": gadget.id, "quantity": 2},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        items = {item.product_id: item for item in cart.items.all()}
+        self.assertEqual(items[self.product.id].quantity, 4)
+        self.assertEqual(items[self.product.id].price_snapshot, Decimal("20.00"))
+        self.assertEqual(items[gadget.id].quantity, 2)
+        self.assertEqual(items[gadget.id].price_snapshot, Decimal("7.00"))
+
+        response = self.client.post(
+            f"/api/carts/{cart.id}/lines/",
+            {"lines": [{"product_id": gadget.id, "quantity": 0}]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["items"]), 1)
+
+    def test_cart_lines_rejects_unknown_products(self):
+        cart = Cart.objects.create(user=self.user)
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post(
+            f"/api/carts/{cart.id}/lines/",
+            {"lines": [{"product_id": 9999, "quantity": 1}]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(cart.items.exists())
+
+    def test_anonymous_carts_are_refused_without_guest_backend(self):
+        response = self.client.post("/api/carts/?session_id=guest-1", {}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(Cart.objects.exists())
+
+    def test_cart_summary_of_foreign_cart_is_not_found(self):
+        other_user = User.objects.create_user(
+            username="other",
+            email="other@example.com",
+            password="password",
+        )
+        cart = Cart.objects.create(user=other_user)
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(f"/api/carts/{cart.id}/summary/")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
 class CartItemViewSetTests(APITestBase):
     def test_cart_item_create_sets_price_snapshot(self):
         cart = Cart.objects.create(user=self.user)
@@ -192,6 +841,120 @@ class CartItemViewSetTests(APITestBase):
         item = CartItem.objects.get(id=response.json()["id"])
         self.assertEqual(item.price_snapshot, self.product.price)
 
+    def test_cart_item_create_rejects_duplicate_product_line(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(
+            cart=cart, product=self.product, quantity=1, price_snapshot=self.product.price
+        )
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post(
+            "/api/cart-items/",
+            {"cart": cart.id, "product_id": self.product.id, "quantity": 2},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(cart.items.count(), 1)
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+@override_settings(GUEST_CART_BACKEND="redis")
+class GuestCartAPITests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        redis_patcher = patch(
+            "cart.guest_store.get_redis",
+            return_value=fakeredis.FakeRedis(decode_responses=True),
+        )
+        redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+
+    def test_guest_cart_lines_stay_out_of_the_database(self):
+        response = self.client.post(
+            "/api/cart-items/", {"product_id": self.product.id, "quantity": 2}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["quantity"], 2)
+        self.assertEqual(response.json()["price_snapshot"], "25.00")
+        self.assertFalse(Cart.objects.exists())
+        guest_id = response.json()["cart"]
+
+        response = self.client.patch(
+            f"/api/cart-items/{self.product.id}/", {"quantity": 5}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get("/api/carts/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        cart = response.json()[0]
+        self.assertEqual(cart["id"], guest_id)
+        self.assertEqual(cart["items"][0]["quantity"], 5)
+        self.assertEqual(cart["items"][0]["product"]["id"], self.product.id)
+
+        response = self.client.get(f"/api/carts/{guest_id}/summary/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["grand_total"], "125.00")
+
+    def test_guest_cart_is_bound_to_the_signed_cookie(self):
+        response = self.client.post(
+            "/api/cart-items/", {"product_id": self.product.id, "quantity": 2}, format="json"
+        )
+        guest_id = response.json()["cart"]
+        other = APIClient()
+
+        self.assertEqual(other.get(f"/api/carts/?session_id={guest_id}").json(), [])
+        other.cookies[settings.GUEST_CART_COOKIE] = guest_id
+        self.assertEqual(other.get("/api/carts/").json(), [])
+        response = other.get(f"/api/carts/{guest_id}/summary/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_guest_cart_materializes_on_login(self):
+        self.client.post(
+            "/api/cart-items/", {"product_id": self.product.id, "quantity": 2}, format="json"
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/token/", {"username": "user", "password": "password"}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("access", response.json())
+        item = CartItem.objects.get(cart__user=self.user)
+        self.assertEqual(item.quantity, 2)
+        response = self.client.get("/api/carts/")
+        self.assertEqual(response.json(), [])
+
+    def test_guest_cart_materializes_for_checkout_and_merges_on_login(self):
+        response = self.client.post(
+            "/api/cart-items/", {"product_id": self.product.id, "quantity": 1}, format="json"
+        )
+        guest_id = response.json()["cart"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/carts/materialize/")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        cart = Cart.objects.get(session_id=guest_id)
+        self.assertEqual(response.json()["id"], cart.id)
+        self.assertEqual(cart.items.get().quantity, 1)
+
+        user_cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(
+            cart=user_cart, product=self.product, quantity=2, price_snapshot=Decimal("25.00")
+        )
+        response = self.client.post(
+            "/api/token/", {"username": "user", "password": "password"}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Cart.objects.filter(pk=cart.pk).exists())
+        self.assertEqual(CartItem.objects.get(cart=user_cart).quantity, 3)
+
 
 class OrderSerializerTests(APITestBase):
     def test_order_serializer_requires_items(self):
@@ -219,6 +982,8 @@ class OrderSerializerTests(APITestBase):
         self.assertEqual(order.subtotal, Decimal("50.00"))
         self.assertEqual(order.grand_total, Decimal("56.00"))
         self.assertEqual(self.product.stock_quantity, 8)
+        self.assertEqual(self.product.sales_score, 2)
+        self.assertEqual(self.product.popularity, 2)
 
     def test_order_serializer_blocks_insufficient_stock(self):
         serializer = OrderSerializer(
@@ -250,6 +1015,41 @@ class OrderViewSetTests(APITestBase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.json()), 1)
 
+    @override_settings(ARCHIVED_ORDERS_PAGE_SIZE=1)
+    def test_archived_orders_are_listed_on_request_and_retrievable(self):
+        older = Order.objects.create(user=self.user, status=Order.Status.DELIVERED)
+        order = Order.objects.create(user=self.user, status=Order.Status.DELIVERED)
+        OrderItem.objects.create(
+            order=order, product=self.product, quantity=1, price_snapshot=Decimal("25.00")
+        )
+        Order.objects.filter(pk__in=[older.pk, order.pk]).update(
+            created_at=timezone.now() - timedelta(days=400)
+        )
+        recent = Order.objects.create(user=self.user)
+        archive_orders(older_than_days=365)
+        self.assertTrue(ArchivedOrder.objects.filter(pk=order.pk).exists())
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get("/api/orders/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in response.json()], [recent.id])
+
+        response = self.client.get("/api/orders/?archived=1")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in response.json()], [order.id])
+        response = self.client.get(f"/api/orders/?archived=1&before={order.id}")
+        self.assertEqual([item["id"] for item in response.json()], [older.id])
+
+        response = self.client.get(f"/api/orders/{order.id}/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        payload = response.json()
+        self.assertEqual(payload["status"], Order.Status.DELIVERED)
+        self.assertEqual(payload["items"][0]["product"]["id"], self.product.id)
+        self.assertEqual(payload["items"][0]["price_snapshot"], "25.00")
+
 
 class FileRecordModelTests(TestCase):
     def test_file_record_object_key_unique(self):
@@ -274,3 +1074,729 @@ class FileRecordModelTests(TestCase):
                 size=12,
                 uploaded_by=user,
             )
+
+
+def api_routes(patterns=None, prefix=""):
+    """
+    ``(name, method)`` for every view in ``api/urls.py``; unnamed paths are
+    keyed by their route and format-suffix duplicates collapse into one entry.
+    """
+
+    if patterns is None:
+        patterns = api_urls.urlpatterns
+    routes = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            routes |= api_routes(pattern.url_patterns, prefix + str(pattern.pattern))
+            continue
+        name = pattern.name or prefix + str(pattern.pattern)
+        # HEAD and OPTIONS mirror GET or are answered without the database.
+        actions = getattr(pattern.callback, "actions", None)
+        if actions:
+            routes |= {(name, method) for method in actions if method != "head"}
+        elif hasattr(pattern.callback, "view_class"):
+            view_class = pattern.callback.view_class
+            routes |= {
+                (name, method)
+                for method in view_class.http_method_names
+                if method not in ("head", "options") and hasattr(view_class, method)
+            }
+    return routes
+
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"IN \((?:\?, )*\?\)")
+
+
+def query_signature(sql):
+    return _IN_LIST_RE.sub("IN (...)", _LITERAL_RE.sub("?", sql))
+
+
+# Queries allowed per request against the seeded catalog. A route's count
+# must not change when the catalog, the cart and the orders grow.
+ROUTE_BUDGETS = {
+    ("api-root", "get"): 0,
+    ("hello/", "get"): 0,
+    ("catalog-page/", "get"): 9,
+    ("files-list", "get"): 1,
+    ("files-detail", "get"): 1,
+    ("files-detail", "delete"): 7,
+    ("files-presign-upload", "post"): 8,
+    ("files-presign-download", "get"): 1,
+    ("categories-list", "get"): 1,
+    ("categories-detail", "get"): 1,
+    ("categories-main-categories", "get"): 1,
+    ("brands-list", "get"): 1,
+    ("brands-detail", "get"): 1,
+    ("banners-list", "get"): 1,
+    ("banners-detail", "get"): 1,
+    ("products-list", "get"): 4,
+    ("products-detail", "get"): 5,
+    ("products-by-slug", "get"): 5,
+    ("products-bulk-edit", "post"): 4,
+    ("category-attributes-list", "get"): 1,
+    ("category-attributes-detail", "get"): 1,
+    ("product-attributes-list", "get"): 1,
+    ("product-attributes-detail", "get"): 1,
+    ("carts-list", "get"): 5,
+    ("carts-list", "post"): 2,
+    ("carts-detail", "get"): 5,
+    ("carts-detail", "put"): 11,
+    ("carts-detail", "patch"): 11,
+    ("carts-detail", "delete"): 7,
+    ("carts-materialize", "post"): 11,
+    ("carts-lines", "post"): 11,
+    ("carts-summary", "get"): 2,
+    ("cart-items-list", "get"): 4,
+    ("cart-items-list", "post"): 8,
+    ("cart-items-detail", "get"): 4,
+    ("cart-items-detail", "put"): 11,
+    ("cart-items-detail", "patch"): 9,
+    ("cart-items-detail", "delete"): 5,
+    ("orders-list", "get"): 5,
+    ("orders-list", "post"): 16,
+    ("orders-detail", "get"): 5,
+    ("orders-detail", "put"): 11,
+    ("orders-detail", "patch"): 11,
+    ("orders-detail", "delete"): 9,
+    ("vehicle-makes-list", "get"): 1,
+    ("vehicle-makes-detail", "get"): 1,
+    ("vehicle-models-list", "get"): 1,
+    ("vehicle-models-detail", "get"): 1,
+    ("vehicle-generations-list", "get"): 1,
+    ("vehicle-generations-detail", "get"): 1,
+}
+
+# Status each budgeted request must answer with, so none is measured on an
+# early error; routes not listed answer 200.
+ROUTE_STATUSES = {
+    ("files-detail", "delete"): status.HTTP_204_NO_CONTENT,
+    ("files-presign-upload", "post"): status.HTTP_201_CREATED,
+    ("carts-list", "post"): status.HTTP_201_CREATED,
+    ("carts-detail", "delete"): status.HTTP_204_NO_CONTENT,
+    ("carts-materialize", "post"): status.HTTP_201_CREATED,
+    ("cart-items-list", "post"): status.HTTP_201_CREATED,
+    ("cart-items-detail", "delete"): status.HTTP_204_NO_CONTENT,
+    ("orders-list", "post"): status.HTTP_201_CREATED,
+    ("orders-detail", "delete"): status.HTTP_204_NO_CONTENT,
+}
+
+# Routes requested by an anonymous visitor with a Redis guest cart.
+GUEST_ROUTES = {("carts-materialize", "post")}
+GUEST_ID = "budget-guest"
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Hits every route in ``api/urls.py`` against a seeded catalog, then grows
+    the catalog and hits them again: a route fails when it exceeds its budget
+    in ``ROUTE_BUDGETS`` or when its query count follows the number of rows.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="manager",
+            email="manager@example.com",
+            password="password",
+            role=User.Role.MANAGER,
+        )
+        self.client.force_authenticate(user=self.user)
+        self.brand = Brand.objects.create(name="Acme", slug="acme")
+        self.root = Category.objects.create(name="Parts", slug="parts")
+        self.category = Category.objects.create(name="Brakes", slug="brakes", parent=self.root)
+        self.material = CategoryAttribute.objects.create(
+            category=self.category, name="Material", data_type=CategoryAttribute.DataType.STRING
+        )
+        self.diameter = CategoryAttribute.objects.create(
+            category=self.category,
+            name="Diameter",
+            data_type=CategoryAttribute.DataType.NUMBER,
+            filter_type=CategoryAttribute.FilterType.RANGE,
+        )
+        self.vented = CategoryAttribute.objects.create(
+            category=self.category, name="Vented", data_type=CategoryAttribute.DataType.BOOLEAN
+        )
+        make = VehicleMake.objects.create(name="Volkswagen", slug="volkswagen")
+        model = VehicleModel.objects.create(make=make, name="Golf", slug="golf")
+        self.generation = VehicleGeneration.objects.create(
+            model=model, name="Mk7", year_from=2012, year_to=2020
+        )
+        self.banner = Banner.objects.create(name="Sale", image_url="banners/sale.jpg")
+        self.spare = Product.objects.create(
+            name="Pad",
+            slug="pad",
+            brand=self.brand,
+            category=self.category,
+            price=Decimal("5.00"),
+            stock_quantity=9,
+        )
+        self.cart = Cart.objects.create(user=self.user)
+        self.order = Order.objects.create(user=self.user)
+        self.products = []
+
+        for name in ("presigned_put_url", "presigned_get_url", "delete_object"):
+            patcher = patch(f"storage.minio_client.{name}", return_value="https://minio.test/")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch("storage.minio_client.object_exists", return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.guest_client = APIClient()
+        self.guest_store = None
+        if fakeredis is not None:
+            patcher = patch(
+                "cart.guest_store.get_redis",
+                return_value=fakeredis.FakeRedis(decode_responses=True),
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+            self.guest_store = GuestCartStore()
+            signer = signing.get_cookie_signer(salt=settings.GUEST_CART_COOKIE + COOKIE_SALT)
+            self.guest_client.cookies[settings.GUEST_CART_COOKIE] = signer.sign(GUEST_ID)
+
+    def seed(self, count):
+        """
+        Add ``count`` products with media, attributes, fitments and
+        recommendations, put them in the cart, an order and an archived order.
+        """
+
+        start = len(self.products)
+        for index in range(start, start + count):
+            product = Product.objects.create(
+                name=f"Disc {index}",
+                slug=f"disc-{index}",
+                brand=self.brand,
+                category=self.category,
+                price=Decimal("10.00") + index,
+                stock_quantity=100,
+            )
+            for sort_order in range(2):
+                ProductMedia.objects.create(
+                    product=product, file_url=f"products/disc-{index}-{sort_order}.jpg", sort_order=sort_order
+                )
+            ProductAttributeValue.objects.create(
+                product=product, attribute=self.material, value_string=f"grade-{index % 3}"
+            )
+            ProductAttributeValue.objects.create(
+                product=product, attribute=self.diameter, value_number=Decimal(250 + index)
+            )
+            ProductAttributeValue.objects.create(
+                product=product, attribute=self.vented, value_boolean=index % 2 == 0
+            )
+            ProductFitment.objects.create(
+                product=product, generation=self.generation, year_from=2012, year_to=2020
+            )
+            CartItem.objects.create(cart=self.cart, product=product, quantity=1, price_snapshot=product.price)
+            if self.guest_store is not None:
+                self.guest_store.add(GUEST_ID, product, 1)
+            OrderItem.objects.create(
+                order=self.order, product=product, quantity=1, price_snapshot=product.price
+            )
+            content = FileContent.objects.create(
+                sha256=f"{index:064x}", object_key=f"sha256/{index:064x}", size=1, is_uploaded=True
+            )
+            FileRecord.objects.create(
+                object_key=content.object_key,
+                filename=f"spec-{index}.pdf",
+                size=1,
+                uploaded_by=self.user,
+                content=content,
+            )
+            self.products.append(product)
+        for rank, recommended in enumerate(self.products[1:], start=1):
+            FrequentlyBoughtTogether.objects.get_or_create(
+                product=self.products[0], rank=rank, defaults={"recommended": recommended, "score": 1.0}
+            )
+        order = Order.objects.create(user=self.user)
+        for product in self.products[start:]:
+            OrderItem.objects.create(order=order, product=product, quantity=1, price_snapshot=product.price)
+        Order.objects.filter(pk=order.pk).update(
+            status=Order.Status.DELIVERED, created_at=timezone.now() - timedelta(days=400)
+        )
+        archive_orders()
+
+    def route_requests(self):
+        product = self.products[0]
+        item = CartItem.objects.filter(cart=self.cart).order_by("id").first()
+        record = FileRecord.objects.order_by("id").first()
+        cart_item = {"cart": self.cart.id, "product_id": item.product_id, "quantity": 2}
+        return {
+            ("api-root", "get"): ("/api/", None),
+            ("hello/", "get"): ("/api/hello/", None),
+            ("catalog-page/", "get"): (
+                f"/api/catalog-page/?category={self.root.id}&page_size=50&attribute={self.vented.id}:true",
+                None,
+            ),
+            ("files-list", "get"): ("/api/files/", None),
+            ("files-detail", "get"): (f"/api/files/{record.id}/", None),
+            ("files-detail", "delete"): (f"/api/files/{record.id}/", None),
+            ("files-presign-upload", "post"): (
+                "/api/files/presign-upload/",
+                {"filename": "spec.pdf", "size": 10, "sha256": "ab" * 32},
+            ),
+            ("files-presign-download", "get"): (f"/api/files/{record.id}/presign-download/", None),
+            ("categories-list", "get"): ("/api/categories/", None),
+            ("categories-detail", "get"): (f"/api/categories/{self.category.id}/", None),
+            ("categories-main-categories", "get"): ("/api/categories/main/", None),
+            ("brands-list", "get"): ("/api/brands/", None),
+            ("brands-detail", "get"): (f"/api/brands/{self.brand.id}/", None),
+            ("banners-list", "get"): ("/api/banners/", None),
+            ("banners-detail", "get"): (f"/api/banners/{self.banner.id}/", None),
+            ("products-list", "get"): ("/api/products/", None),
+            ("products-detail", "get"): (f"/api/products/{product.id}/", None),
+            ("products-by-slug", "get"): (f"/api/products/by-slug/{product.slug}/", None),
+            ("products-bulk-edit", "post"): (
+                "/api/products/bulk-edit/",
+                {"rows": [{"id": item.id, "price": "9.99"} for item in self.products]},
+            ),
+            ("category-attributes-list", "get"): (
+                f"/api/category-attributes/?category={self.category.id}",
+                None,
+            ),
+            ("category-attributes-detail", "get"): (f"/api/category-attributes/{self.material.id}/", None),
+            ("product-attributes-list", "get"): (f"/api/product-attributes/?product={product.id}", None),
+            ("product-attributes-detail", "get"): (
+                f"/api/product-attributes/{product.attributes.order_by('id').first().id}/",
+                None,
+            ),
+            ("carts-list", "get"): ("/api/carts/", None),
+            ("carts-list", "post"): ("/api/carts/", {}),
+            ("carts-detail", "get"): (f"/api/carts/{self.cart.id}/", None),
+            ("carts-detail", "put"): (f"/api/carts/{self.cart.id}/", {}),
+            ("carts-detail", "patch"): (f"/api/carts/{self.cart.id}/", {}),
+            ("carts-detail", "delete"): (f"/api/carts/{self.cart.id}/", None),
+            ("carts-materialize", "post"): ("/api/carts/materialize/", {}),
+            ("carts-lines", "post"): (
+                f"/api/carts/{self.cart.id}/lines/",
+                {"lines": [{"product_id": product.id, "quantity": 3}]},
+            ),
+            ("carts-summary", "get"): (f"/api/carts/{self.cart.id}/summary/", None),
+            ("cart-items-list", "get"): ("/api/cart-items/", None),
+            ("cart-items-list", "post"): ("/api/cart-items/", {**cart_item, "product_id": self.spare.id}),
+            ("cart-items-detail", "get"): (f"/api/cart-items/{item.id}/", None),
+            ("cart-items-detail", "put"): (f"/api/cart-items/{item.id}/", cart_item),
+            ("cart-items-detail", "patch"): (f"/api/cart-items/{item.id}/", {"quantity": 2}),
+            ("cart-items-detail", "delete"): (f"/api/cart-items/{item.id}/", None),
+            ("orders-list", "get"): ("/api/orders/", None),
+            ("orders-list", "post"): ("/api/orders/", {"items": [{"product_id": product.id, "quantity": 1}]}),
+            ("orders-detail", "get"): (f"/api/orders/{self.order.id}/", None),
+            ("orders-detail", "put"): (
+                f"/api/orders/{self.order.id}/",
+                {"shipping_total": "5.00", "tax_total": "0.00", "discount_total": "1.00"},
+            ),
+            ("orders-detail", "patch"): (f"/api/orders/{self.order.id}/", {"discount_total": "1.00"}),
+            ("orders-detail", "delete"): (f"/api/orders/{self.order.id}/", None),
+            ("vehicle-makes-list", "get"): ("/api/vehicle-makes/", None),
+            ("vehicle-makes-detail", "get"): (f"/api/vehicle-makes/{self.generation.model.make_id}/", None),
+            ("vehicle-models-list", "get"): ("/api/vehicle-models/", None),
+            ("vehicle-models-detail", "get"): (f"/api/vehicle-models/{self.generation.model_id}/", None),
+            ("vehicle-generations-list", "get"): ("/api/vehicle-generations/", None),
+            ("vehicle-generations-detail", "get"): (f"/api/vehicle-generations/{self.generation.id}/", None),
+        }
+
+    def measure(self):
+        """
+        Run every route request inside a rolled-back savepoint and return
+        ``{route: (status, queries)}``.
+        """
+
+        results = {}
+        for (name, method), (path, data) in self.route_requests().items():
+            cache.clear()
+            guest = (name, method) in GUEST_ROUTES
+            client = self.guest_client if guest else self.client
+            backend = "redis" if guest else settings.GUEST_CART_BACKEND
+            with transaction.atomic(), override_settings(GUEST_CART_BACKEND=backend):
+                with CaptureQueriesContext(connection) as captured:
+                    response = getattr(client, method)(path, data, format="json")
+                transaction.set_rollback(True)
+            results[(name, method)] = (response.status_code, [query["sql"] for query in captured])
+        return results
+
+    def describe(self, queries):
+        repeated = Counter(query_signature(sql) for sql in queries)
+        lines = [f"{count}x {signature}" for signature, count in repeated.most_common() if count > 1]
+        return "\n".join(lines) or "(no repeated statements)"
+
+    def test_every_route_has_a_budget(self):
+        self.assertEqual(api_routes(), set(ROUTE_BUDGETS))
+        self.seed(1)
+        self.assertEqual(set(self.route_requests()), set(ROUTE_BUDGETS))
+
+    def test_routes_stay_within_budget_and_do_not_grow_with_rows(self):
+        self.seed(2)
+        small = self.measure()
+        self.seed(6)
+        large = self.measure()
+
+        for route, budget in ROUTE_BUDGETS.items():
+            with self.subTest(route=route):
+                if route in GUEST_ROUTES and fakeredis is None:
+                    self.skipTest("fakeredis is not installed")
+                status_code, queries = large[route]
+                self.assertEqual(status_code, ROUTE_STATUSES.get(route, status.HTTP_200_OK))
+                self.assertEqual(small[route][0], status_code)
+                self.assertLessEqual(
+                    len(queries),
+                    budget,
+                    f"{route} ran {len(queries)} queries (budget {budget}):\n{self.describe(queries)}",
+                )
+                self.assertEqual(
+                    len(small[route][1]),
+                    len(queries),
+                    f"{route} grew from {len(small[route][1])} to {len(queries)} queries "
+                    f"with more rows:\n{self.describe(queries)}",
+                )
+
+
+class BootstrapTests(TestCase):
+    def test_migrations_are_skipped_when_the_plan_is_applied(self):
+        self.assertEqual(bootstrap.pending_migrations(), [])
+        self.assertEqual(bootstrap.migrate(), "Migrations: up to date")
+
+    def test_collectstatic_runs_only_when_sources_change(self):
+        with tempfile.TemporaryDirectory() as static_root, override_settings(STATIC_ROOT=static_root):
+            self.assertEqual(bootstrap.collect_static(), "Static files: collected")
+            self.assertTrue(os.path.exists(os.path.join(static_root, "admin", "css", "base.css")))
+            self.assertEqual(bootstrap.collect_static(), "Static files: unchanged")
+
+            with open(os.path.join(static_root, bootstrap.STATIC_DIGEST_FILE), "w") as stream:
+                stream.write("stale")
+            self.assertEqual(bootstrap.collect_static(), "Static files: collected")
+
+    def test_superuser_is_created_once(self):
+        env = {
+            "DJANGO_SUPERUSER_USERNAME": "root",
+            "DJANGO_SUPERUSER_EMAIL": "root@example.com",
+            "DJANGO_SUPERUSER_PASSWORD": "secret-pass",
+        }
+        with patch.dict(os.environ, env):
+            self.assertEqual(bootstrap.ensure_superuser(), "Superuser 'root' created")
+            self.assertEqual(bootstrap.ensure_superuser(), "Superuser 'root' already exists; skipping creation")
+
+        user = get_user_model().objects.get(username="root")
+        self.assertTrue(user.is_superuser)
+        self.assertTrue(user.check_password("secret-pass"))
+
+    def test_worker_role_only_resets_the_metrics_directory(self):
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            stale = os.path.join(metrics_dir, "counter_1.db")
+            open(stale, "w").close()
+            with patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": metrics_dir}), patch(
+                "api.management.commands.bootstrap.migrate"
+            ) as migrate:
+                call_command("bootstrap", role="worker", stdout=StringIO())
+
+            self.assertFalse(os.path.exists(stale))
+            self.assertTrue(os.path.isdir(metrics_dir))
+            migrate.assert_not_called()
+
+
+class GunicornSizingTests(TestCase):
+    def test_workers_follow_cores_until_memory_runs_out(self):
+        self.assertEqual(worker_layout(4, 16384), (9, 2))
+        # Room for three workers: the rest of the concurrency goes to threads.
+        self.assertEqual(worker_layout(4, 1024), (3, 6))
+        self.assertEqual(worker_layout(16, 512), (1, 8))
+
+    def test_warm_process_builds_caches_and_closes_connections(self):
+        results = warmup.warm_process()
+
+        self.assertEqual(set(results), {warmer.__name__ for warmer in warmup.WARMERS})
+        self.assertGreater(results["warm_serializers"], 0)
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class CoalescingBatchTests(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        self.handled = []
+        self.batch = CoalescingBatch(
+            self.handled.append, name="tests.coalescing-batch", window=5, max_size=3
+        )
+
+    def test_ids_are_deduplicated_and_flushed_once_per_window(self):
+        with patch.object(self.batch.flush_task, "apply_async") as apply_async:
+            self.batch.add(2, 1, client=self.redis)
+            self.batch.add(1, client=self.redis)
+
+        apply_async.assert_called_once_with(countdown=5, queue=None)
+        self.assertEqual(self.batch.flush(client=self.redis), 2)
+        self.assertEqual(self.handled, [[1, 2]])
+        self.assertEqual(self.batch.flush(client=self.redis), 0)
+
+        with patch.object(self.batch.flush_task, "apply_async") as apply_async:
+            self.batch.add(3, client=self.redis)
+        apply_async.assert_called_once_with(countdown=5, queue=None)
+
+    def test_full_buffer_is_flushed_immediately_in_chunks(self):
+        with patch.object(self.batch.flush_task, "apply_async") as apply_async:
+            self.batch.add(*range(1, 6), client=self.redis)
+
+        self.assertEqual(
+            [call.kwargs["countdown"] for call in apply_async.call_args_list], [5, None]
+        )
+        self.batch.flush(client=self.redis)
+        self.assertEqual(self.handled, [[1, 2, 3], [4, 5]])
+
+    def test_failed_flush_keeps_its_ids_for_the_retry(self):
+        self.redis.sadd(self.batch.pending_key, 7)
+        self.batch.handler = lambda ids: 1 / 0
+        with self.assertRaises(ZeroDivisionError):
+            self.batch.flush(client=self.redis)
+        self.redis.sadd(self.batch.pending_key, 8)
+
+        self.batch.handler = self.handled.append
+        self.assertEqual(self.batch.flush(client=self.redis), 2)
+        self.assertEqual(self.handled, [[7], [8]])
+        self.assertEqual(self.batch.flush(client=self.redis), 0)
+
+    def test_batch_failing_every_retry_is_dead_lettered_without_blocking(self):
+        def handler(ids):
+            if 7 in ids:
+                raise ValueError("poison")
+            self.handled.append(ids)
+
+        self.batch.handler = handler
+        self.redis.sadd(self.batch.pending_key, 7)
+        with self.assertRaises(ValueError):
+            self.batch.flush(client=self.redis)
+        self.redis.sadd(self.batch.pending_key, 8)
+        for _ in range(FLUSH_MAX_RETRIES - 1):
+            with self.assertRaises(ValueError):
+                self.batch.flush(client=self.redis)
+
+        with self.assertLogs("config.batching", "ERROR"):
+            self.assertEqual(self.batch.flush(client=self.redis), 1)
+        self.assertEqual(self.handled, [[8]])
+        self.assertEqual(self.redis.smembers(self.batch.dead_key), {"7"})
+
+        self.batch.handler = self.handled.append
+        with patch.object(self.batch.flush_task, "apply_async"):
+            self.assertEqual(self.batch.requeue_dead_letters(client=self.redis), 1)
+        self.assertEqual(self.batch.flush(client=self.redis), 1)
+        self.assertEqual(self.handled, [[8], [7]])
+
+    def test_concurrent_flush_reschedules_itself(self):
+        self.redis.set(self.batch.lock_key, "other")
+        with patch.object(self.batch.flush_task, "apply_async") as apply_async:
+            self.assertIsNone(self.batch.flush(client=self.redis))
+        apply_async.assert_called_once_with(countdown=5, queue=None)
+
+
+class CeleryQueueTests(TestCase):
+    def test_workload_classes_have_their_own_queues(self):
+        router = celery_app.amqp.router
+        self.assertEqual(router.route({}, "catalog.tasks.generate_catalog_feed")["queue"].name, "exports")
+        self.assertEqual(router.route({}, "catalog.tasks.ingest_product_images")["queue"].name, "media")
+        self.assertEqual(router.route({}, "orders.tasks.archive_old_orders")["queue"].name, "default")
+
+    def test_prefetch_is_the_lowest_of_the_consumed_queues(self):
+        prefetch = {"default": 4, "media": 1, "indexing": 8}
+        self.assertEqual(queue_prefetch_multiplier(["indexing"], prefetch), 8)
+        self.assertEqual(queue_prefetch_multiplier(["default", "media"], prefetch), 1)
+        self.assertIsNone(queue_prefetch_multiplier(["other"], prefetch))
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.loads = []
+        self.tiered = TieredCache("tests-tiered", maxsize=2)
+        self.addCleanup(tiered_cache._registry.pop, "tests-tiered", None)
+        self.addCleanup(cache.clear)
+
+    def load(self, value):
+        def loader():
+            self.loads.append(value)
+            return value
+
+        return loader
+
+    def test_l1_hit_does_not_touch_l2(self):
+        self.assertEqual(self.tiered.get("a", self.load(1)), 1)
+        with patch.object(tiered_cache, "cache") as l2:
+            self.assertEqual(self.tiered.get("a", self.load(2)), 1)
+        l2.get.assert_not_called()
+        self.assertEqual(self.loads, [1])
+
+    def test_l1_miss_is_filled_from_l2(self):
+        self.tiered.get("a", self.load(1))
+        self.tiered.evict()
+        self.assertEqual(self.tiered.get("a", self.load(2)), 1)
+        self.assertEqual(self.loads, [1])
+
+    def test_l1_keeps_the_most_recently_used_keys(self):
+        self.tiered.get("a", self.load(1))
+        self.tiered.get("b", self.load(2))
+        self.tiered.get("a", self.load(1))
+        self.tiered.get("c", self.load(3))
+        self.assertEqual(list(self.tiered._entries), ["a", "c"])
+
+    def test_invalidate_drops_a_key_or_the_namespace_from_both_tiers(self):
+        self.tiered.get("a", self.load(1))
+        self.tiered.get("b", self.load(2))
+
+        self.tiered.invalidate("a")
+        self.assertEqual(self.tiered.get("a", self.load(10)), 10)
+        self.assertEqual(self.tiered.get("b", self.load(20)), 2)
+
+        self.tiered.invalidate()
+        self.assertEqual(self.tiered.get("b", self.load(20)), 20)
+
+    @override_settings(TIERED_CACHE_BROADCAST=True)
+    def test_invalidation_is_broadcast_and_evicts_other_processes_l1(self):
+        # The listener thread would subscribe to a real Redis.
+        patch.object(tiered_cache, "ensure_listener").start()
+        redis = patch.object(tiered_cache, "get_redis").start()
+        self.addCleanup(patch.stopall)
+        self.tiered.get("a", self.load(1))
+
+        self.tiered.invalidate("a")
+        channel, data = redis.return_value.publish.call_args.args
+        self.assertEqual(channel, tiered_cache.CHANNEL)
+
+        # Another process only has the L1 entry; the message evicts it.
+        self.tiered._entries["a"] = (time.monotonic() + 60, 1)
+        tiered_cache.handle_message(data)
+        self.assertNotIn("a", self.tiered._entries)
+
+    def test_both_tiers_are_bypassed_inside_a_transaction(self):
+        with patch.object(tiered_cache.connections[tiered_cache.DEFAULT_DB_ALIAS], "in_atomic_block", True):
+            self.assertEqual(self.tiered.get("a", self.load(1)), 1)
+        self.assertEqual(self.tiered._entries, {})
+        self.assertEqual(self.tiered.get("a", self.load(2)), 2)
+
+
+@override_settings(
+    LOAD_SHEDDING_ENABLED=True,
+    LOAD_SHEDDING_MAX_CONCURRENCY=1,
+    LOAD_SHEDDING_TARGET_LATENCY_MS=100,
+    LOAD_SHEDDING_CRITICAL_LATENCY_MS=500,
+)
+class LoadSheddingTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def request(self, path, **extra):
+        request = self.factory.get(path, **extra)
+        request.user = AnonymousUser()
+        return request
+
+    def test_anonymous_catalog_and_search_reads_are_low_priority(self):
+        token = str(AccessToken())
+        self.assertEqual(load_shedding.route_class(self.request("/api/catalog-page/")), load_shedding.LOW)
+        self.assertEqual(load_shedding.route_class(self.request("/api/products/?search=bolt")), load_shedding.LOW)
+        self.assertEqual(load_shedding.route_class(self.request("/api/products/")), load_shedding.DEFAULT)
+        self.assertEqual(
+            load_shedding.route_class(self.request("/api/catalog-page/", HTTP_AUTHORIZATION=f"Bearer {token}")),
+            load_shedding.DEFAULT,
+        )
+        self.assertEqual(
+            load_shedding.route_class(self.request("/api/catalog-page/", HTTP_AUTHORIZATION="Bearer forged")),
+            load_shedding.LOW,
+        )
+        self.assertEqual(load_shedding.route_class(self.request("/api/orders/")), load_shedding.CRITICAL)
+
+    def test_low_priority_requests_beyond_the_limit_are_shed(self):
+        inner = []
+
+        def get_response(request):
+            if not inner:
+                inner.append(middleware(self.request("/api/catalog-page/")))
+                inner.append(middleware(self.request("/api/orders/")))
+            return JsonResponse({})
+
+        middleware = load_shedding.LoadSheddingMiddleware(get_response)
+        self.assertEqual(middleware(self.request("/api/catalog-page/")).status_code, 200)
+        shed, critical = inner
+        self.assertEqual(shed.status_code, 503)
+        self.assertEqual(shed["Retry-After"], "2")
+        self.assertEqual(critical.status_code, 200)
+        self.assertEqual(middleware.classes[load_shedding.LOW].in_flight, 0)
+
+    def test_low_priority_requests_are_shed_while_checkout_is_slow(self):
+        middleware = load_shedding.LoadSheddingMiddleware(lambda request: JsonResponse({}))
+        critical = middleware.classes[load_shedding.CRITICAL]
+        critical.acquire()
+        critical.release(2.0)
+
+        self.assertEqual(middleware(self.request("/api/catalog-page/")).status_code, 503)
+        self.assertEqual(middleware(self.request("/api/products/")).status_code, 200)
+
+    def test_limit_backs_off_on_slow_responses_and_recovers(self):
+        route = load_shedding.RouteClass("low", target=0.1, minimum=1, maximum=4)
+        for _ in range(20):
+            route.acquire()
+            route.release(1.0)
+        self.assertEqual(route.limit, 1)
+        for _ in range(20):
+            route.acquire()
+            route.release(0.01)
+        self.assertEqual(route.limit, 4)
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class TokenBucketThrottleTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        patch("api.throttling.get_redis", return_value=self.redis).start()
+        self.addCleanup(patch.stopall)
+        rates = override_settings(
+            REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {"catalog": "2/min"}}
+        )
+        rates.enable()
+        self.addCleanup(rates.disable)
+
+    def test_bucket_allows_bursts_and_refills_over_time(self):
+        take = lambda now: take_token(self.redis, "bucket", 2, 0.5, now=now)
+        self.assertEqual(take(100), (True, 0))
+        self.assertEqual(take(100), (True, 0))
+        self.assertEqual(take(100), (False, 2.0))
+        self.assertEqual(take(101), (False, 1.0))
+        self.assertEqual(take(102), (True, 0))
+
+    def test_contention_alone_does_not_deny_a_request(self):
+        pipe = MagicMock()
+        pipe.__enter__.return_value = pipe
+        pipe.hmget.return_value = [None, None]
+        pipe.execute.side_effect = WatchError
+        with patch.object(self.redis, "pipeline", return_value=pipe):
+            self.assertEqual(take_token(self.redis, "bucket", 2, 0.5, now=100), (True, 0))
+
+    def test_product_writes_are_not_throttled(self):
+        self.client.force_authenticate(self.user)
+        for _ in range(3):
+            response = self.client.post(
+                "/api/products/bulk-edit/",
+                {"rows": [{"id": self.product.id, "stock_quantity": 3}]},
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [self.client.get("/api/products/").status_code for _ in range(3)], [200, 200, 429]
+        )
+
+    def test_scoped_views_answer_429_per_client_once_the_bucket_is_empty(self):
+        statuses = [self.client.get("/api/catalog-page/").status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertIn("Retry-After", self.client.get("/api/catalog-page/"))
+
+        other = APIClient(REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(other.get("/api/catalog-page/").status_code, 200)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get("/api/catalog-page/").status_code, 200)
+        # Searches have no rate configured.
+        for _ in range(3):
+            self.assertEqual(APIClient().get("/api/products/?search=widget").status_code, 200)
+
+    def test_requests_pass_when_redis_is_unavailable(self):
+        with patch.object(self.redis, "pipeline", side_effect=RedisError("down")), self.assertLogs(
+            "api.throttling", "WARNING"
+        ):
+            statuses = [self.client.get("/api/catalog-page/").status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 200])
@@ -0,0 +1,92 @@
+import logging
+import math
+import time
+
+from redis.exceptions import RedisError, WatchError
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from storage.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+
+
+def take_token(client, key, capacity, refill_rate, now=None):
+    """
+    Take one token from the bucket at ``key`` (a hash of ``tokens`` and
+    ``ts``), refilled at ``refill_rate`` tokens per second up to ``capacity``.
+    Returns ``(allowed, wait)``, ``wait`` being the seconds until a token is
+    available again. A request that keeps losing the race for the bucket is
+    let through rather than denied for contention alone.
+    """
+
+    for _ in range(MAX_ATTEMPTS):
+        current = time.time() if now is None else now
+        with client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                tokens, stamp = pipe.hmget(key, "tokens", "ts")
+                if tokens is None:
+                    tokens = capacity
+                else:
+                    elapsed = max(current - float(stamp), 0)
+                    tokens = min(capacity, float(tokens) + elapsed * refill_rate)
+                allowed = tokens >= 1
+                if allowed:
+                    tokens -= 1
+                pipe.multi()
+                pipe.hset(key, mapping={"tokens": tokens, "ts": current})
+                pipe.expire(key, math.ceil(capacity / refill_rate) + 1)
+                pipe.execute()
+            except WatchError:
+                continue
+        return allowed, 0 if allowed else (1 - tokens) / refill_rate
+    # Every attempt raced another request for the same client (parallel XHRs,
+    # a shared NAT): those requests did take their tokens, so let this one by.
+    return True, 0
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket in Redis, shared by all workers, per user or (anonymous)
+    client IP. The view's ``throttle_scope`` picks the rate from
+    ``DEFAULT_THROTTLE_RATES``: "<n>/<period>" allows bursts of ``n``
+    requests, refilled at ``n`` per period. Scopes without a rate are not
+    throttled, and requests are let through when Redis is unavailable.
+    """
+
+    cache_format = "throttle:%(scope)s:%(ident)s"
+
+    def __init__(self):
+        # The rate depends on the view, see ``allow_request``.
+        self.wait_seconds = None
+
+    def get_cache_key(self, request, view):
+        user = getattr(request, "user", None)
+        if user and user.is_authenticated:
+            ident = f"user:{user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, "throttle_scope", None)
+        # Read per request (not the class-level copy) so settings overrides apply.
+        self.rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope) if self.scope else None
+        if not self.rate:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.key = self.get_cache_key(request, view)
+        try:
+            allowed, self.wait_seconds = take_token(
+                get_redis(), self.key, self.num_requests, self.num_requests / self.duration
+            )
+        except RedisError:
+            logger.warning("Throttle %s skipped: Redis unavailable", self.scope, exc_info=True)
+            return True
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
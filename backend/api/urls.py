@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
@@ -11,9 +12,13 @@ from .views import (
     FileViewSet,
     HelloView,
     CatalogPageView,
+    AsyncCatalogPageView,
     OrderViewSet,
     ProductAttributeValueViewSet,
     ProductViewSet,
+    VehicleGenerationViewSet,
+    VehicleMakeViewSet,
+    VehicleModelViewSet,
 )
 
 router = DefaultRouter()
@@ -27,9 +32,15 @@ router.register(r"product-attributes", ProductAttributeValueViewSet, basename="p
 router.register(r"carts", CartViewSet, basename="carts")
 router.register(r"cart-items", CartItemViewSet, basename="cart-items")
 router.register(r"orders", OrderViewSet, basename="orders")
+router.register(r"vehicle-makes", VehicleMakeViewSet, basename="vehicle-makes")
+router.register(r"vehicle-models", VehicleModelViewSet, basename="vehicle-models")
+router.register(r"vehicle-generations", VehicleGenerationViewSet, basename="vehicle-generations")
 
 urlpatterns = [
     path("hello/", HelloView.as_view()),
-    path("catalog-page/", CatalogPageView.as_view()),
+    path(
+        "catalog-page/",
+        (AsyncCatalogPageView if settings.ASYNC_CATALOG_VIEWS else CatalogPageView).as_view(),
+    ),
     path("", include(router.urls)),
 ]
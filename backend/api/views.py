@@ -1,26 +1,67 @@
-from django.core.paginator import Paginator
-from django.db.models import Q, F, Count, Min, Max
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.db.models import Q, F, DecimalField, ExpressionWrapper, Prefetch, Sum, Value, Window
+from django.db.models.functions import Greatest
 from django.shortcuts import get_object_or_404
-from rest_framework import status, viewsets
+from django.views import View
+from rest_framework import generics, mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from cart.guest_store import (
+    GuestCartStore,
+    guest_carts_enabled,
+    new_guest_id,
+    read_guest_id,
+    set_guest_cookie,
+)
+from cart.lines import merge_session_cart, set_cart_lines
 from cart.models import Cart, CartItem
-from catalog.models import Banner, Brand, Category, CategoryAttribute, Product, ProductAttributeValue
-from orders.models import Order
+from catalog.attributes import filter_by_attributes
+from catalog.bulk import apply_bulk_changes, validate_bulk_rows
+from catalog.fitment import filter_by_vehicle
+from catalog.metadata import banners, brands, categories, category_attributes
+from catalog.models import (
+    Banner,
+    Brand,
+    Category,
+    CategoryAttribute,
+    Product,
+    ProductAttributeValue,
+    VehicleGeneration,
+    VehicleMake,
+    VehicleModel,
+)
+from catalog.popularity import record_product_view, sort_products
+from config.db_router import route_reads_to_replica
+from orders.models import ArchivedOrder, Order, OrderItem
+from users.permissions import IsAdmin, IsManager
 
+from .catalog_page import CatalogPage
+from .files import create_file_record, delete_file_record
 from .models import FileRecord
+from .permissions import IsAuthenticatedOrGuestCart
 from .serializers import (
+    ArchivedOrderSerializer,
     BrandSerializer,
     BannerSerializer,
     CartItemSerializer,
+    CartLinesSerializer,
     CartSerializer,
-    CatalogProductSerializer,
+    CartSummarySerializer,
     CategoryAttributeSerializer,
     CategorySerializer,
     FileRecordSerializer,
+    GuestCartItemSerializer,
+    GuestCartItemWriteSerializer,
+    GuestCartSerializer,
     MainCategorySerializer,
     OrderSerializer,
     PresignDownloadResponseSerializer,
@@ -29,10 +70,25 @@ from .serializers import (
     ProductAttributeValueSerializer,
     ProductDetailSerializer,
     ProductSerializer,
+    VehicleGenerationSerializer,
+    VehicleMakeSerializer,
+    VehicleModelSerializer,
 )
+from .throttling import TokenBucketThrottle
 from storage import minio_client
 
 
+class ReplicaReadMixin:
+    """
+    Safe requests to this view may read from a database replica; see
+    ``config.db_router``.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        route_reads_to_replica(request)
+
+
 class HelloView(APIView):
     permission_classes = [AllowAny]
 
@@ -40,13 +96,13 @@ class HelloView(APIView):
         return Response({"message": "Hello, DRF!"})
 
 
-class FileViewSet(viewsets.ReadOnlyModelViewSet):
+class FileViewSet(mixins.DestroyModelMixin, viewsets.ReadOnlyModelViewSet):
     """
     Minimal file endpoints for testing with MinIO.
     """
 
     permission_classes = [IsAuthenticated]
-    queryset = FileRecord.objects.all().order_by("-created_at")
+    queryset = FileRecord.objects.select_related("content").order_by("-created_at")
     serializer_class = FileRecordSerializer
 
     def get_queryset(self):
@@ -60,22 +116,26 @@ class FileViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = PresignUploadRequestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
-        key = minio_client.make_object_key(data["filename"])
-        upload_url = minio_client.presigned_put_url(
-            key, content_type=data.get("content_type"), expires_in=900
-        )
-        record = FileRecord.objects.create(
-            object_key=key,
+        record, upload_url = create_file_record(
             filename=data["filename"],
             content_type=data.get("content_type", ""),
             size=data.get("size") or 0,
-            uploaded_by=request.user if request.user.is_authenticated else None,
+            sha256=data.get("sha256", ""),
+            user=request.user if request.user.is_authenticated else None,
         )
         response = PresignUploadResponseSerializer(
-            {"id": record.id, "object_key": key, "upload_url": upload_url}
+            {
+                "id": record.id,
+                "object_key": record.object_key,
+                "upload_url": upload_url,
+                "already_present": upload_url is None,
+            }
         )
         return Response(response.data, status=status.HTTP_201_CREATED)
 
+    def perform_destroy(self, instance):
+        delete_file_record(instance)
+
     @action(detail=True, methods=["get"], permission_classes=[IsAuthenticated], url_path="presign-download")
     def presign_download(self, request, pk=None):
         record = self.get_object()
@@ -91,36 +151,53 @@ class FileViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(response.data)
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
     queryset = Category.objects.filter(is_active=True).order_by("sort_order", "name")
     serializer_class = CategorySerializer
 
+    def list(self, request, *args, **kwargs):
+        return Response(self.get_serializer(categories(), many=True).data)
+
     @action(detail=False, methods=["get"], permission_classes=[AllowAny], url_path="main")
     def main_categories(self, request):
-        queryset = Category.objects.filter(
-            is_active=True,
-            parent__isnull=True,
-        ).order_by("sort_order", "name")
-        serializer = MainCategorySerializer(queryset, many=True)
+        main = [category for category in categories() if category.parent_id is None]
+        serializer = MainCategorySerializer(main, many=True)
         return Response(serializer.data)
 
 
-class BrandViewSet(viewsets.ReadOnlyModelViewSet):
+class BrandViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
     queryset = Brand.objects.all().order_by("name")
     serializer_class = BrandSerializer
 
+    def list(self, request, *args, **kwargs):
+        return Response(self.get_serializer(brands(), many=True).data)
+
 
-class BannerViewSet(viewsets.ReadOnlyModelViewSet):
+class BannerViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
     queryset = Banner.objects.all().order_by("name")
     serializer_class = BannerSerializer
 
+    def list(self, request, *args, **kwargs):
+        return Response(self.get_serializer(banners(), many=True).data)
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+
+class ProductViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
     serializer_class = ProductSerializer
+    throttle_classes = [TokenBucketThrottle]
+
+    @property
+    def throttle_scope(self):
+        return "search" if self.request.query_params.get("search") else "catalog"
+
+    def get_throttles(self):
+        # Catalog reads only; managers' bulk edits are not rate limited.
+        if self.request.method not in SAFE_METHODS:
+            return []
+        return super().get_throttles()
 
     def get_queryset(self):
         queryset = Product.objects.filter(is_active=True).select_related(
@@ -149,48 +226,48 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         if in_stock in {"1", "true", "yes"}:
             queryset = queryset.filter(stock_quantity__gt=F("stock_reserved"))
 
-        for entry in attribute_filters:
-            if ":" not in entry:
-                continue
-            attribute_id, raw_value = entry.split(":", 1)
-            if not attribute_id:
-                continue
+        queryset = filter_by_attributes(
+            queryset,
+            attribute_filters,
+            self.request.query_params.getlist("attribute_min"),
+            self.request.query_params.getlist("attribute_max"),
+        )
+        queryset = filter_by_vehicle(queryset, self.request.query_params)
 
-            value = raw_value.strip()
-            if value.lower() in {"true", "false"}:
-                queryset = queryset.filter(
-                    attributes__attribute_id=attribute_id,
-                    attributes__value_boolean=value.lower() == "true",
-                )
-            else:
-                try:
-                    number_value = float(value)
-                except ValueError:
-                    queryset = queryset.filter(
-                        attributes__attribute_id=attribute_id,
-                        attributes__value_string=value,
-                    )
-                else:
-                    queryset = queryset.filter(
-                        attributes__attribute_id=attribute_id,
-                        attributes__value_number=number_value,
-                    )
-
-        return queryset.order_by("name").distinct()
+        return sort_products(queryset, self.request.query_params.get("sort"))
 
     def get_serializer_class(self):
         if self.action in {"retrieve", "by_slug"}:
             return ProductDetailSerializer
         return ProductSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        record_product_view(response.data["id"])
+        return response
+
     @action(detail=False, methods=["get"], permission_classes=[AllowAny], url_path=r"by-slug/(?P<slug>[^/.]+)")
     def by_slug(self, request, slug=None):
         product = get_object_or_404(self.get_queryset(), slug=slug)
         serializer = self.get_serializer(product)
+        record_product_view(product.id)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["post"], permission_classes=[IsManager | IsAdmin], url_path="bulk-edit")
+    def bulk_edit(self, request):
+        """
+        Apply ``{"rows": [{id, price, stock_quantity, is_active}, ...]}`` all-or-nothing.
+        """
+
+        rows = request.data.get("rows") if isinstance(request.data, dict) else None
+        changes, errors = validate_bulk_rows(rows)
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+        updated = apply_bulk_changes(changes)
+        return Response({"updated": updated, "unchanged": len(rows) - updated})
 
-class CategoryAttributeViewSet(viewsets.ReadOnlyModelViewSet):
+
+class CategoryAttributeViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
     serializer_class = CategoryAttributeSerializer
 
@@ -201,8 +278,14 @@ class CategoryAttributeViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(category_id=category)
         return queryset.order_by("name")
 
+    def list(self, request, *args, **kwargs):
+        category = request.query_params.get("category", "")
+        if not category.isdigit():
+            return super().list(request, *args, **kwargs)
+        return Response(self.get_serializer(category_attributes(int(category)), many=True).data)
+
 
-class ProductAttributeValueViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductAttributeValueViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
     serializer_class = ProductAttributeValueSerializer
 
@@ -214,243 +297,165 @@ class ProductAttributeValueViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
 
-class CatalogPageView(APIView):
+class VehicleMakeViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
+    queryset = VehicleMake.objects.all().order_by("name")
+    serializer_class = VehicleMakeSerializer
 
-    def get(self, request):
-        categories = list(
-            Category.objects.filter(is_active=True).order_by("sort_order", "name")
-        )
-        if not categories:
-            return Response(
-                {
-                    "category": None,
-                    "breadcrumbs": [],
-                    "category_tree": [],
-                    "filters": {"brands": [], "attributes": []},
-                    "products": {
-                        "count": 0,
-                        "page": 1,
-                        "page_size": 0,
-                        "results": [],
-                    },
-                    "banners": BannerSerializer(Banner.objects.all().order_by("name"), many=True).data,
-                }
-            )
 
-        category_id = request.query_params.get("category")
-        if category_id:
-            category = get_object_or_404(Category, pk=category_id, is_active=True)
-        else:
-            category = categories[0]
-
-        categories_by_parent = {}
-        for item in categories:
-            parent_id = item.parent_id
-            categories_by_parent.setdefault(parent_id, []).append(item)
-
-        def build_tree(parent_id=None):
-            tree = []
-            for item in categories_by_parent.get(parent_id, []):
-                tree.append(
-                    {
-                        "id": item.id,
-                        "name": item.name,
-                        "slug": item.slug,
-                        "image_url": item.image_url.url if item.image_url else "",
-                        "children": build_tree(item.id),
-                    }
-                )
-            return tree
-
-        def collect_descendant_ids(start_id):
-            ids = []
-            stack = [start_id]
-            while stack:
-                current_id = stack.pop()
-                ids.append(current_id)
-                for child in categories_by_parent.get(current_id, []):
-                    stack.append(child.id)
-            return ids
-
-        breadcrumbs = []
-        current = category
-        while current:
-            breadcrumbs.append({"id": current.id, "name": current.name, "slug": current.slug})
-            current = current.parent
-        breadcrumbs.reverse()
-
-        descendant_ids = collect_descendant_ids(category.id)
-        base_products = (
-            Product.objects.filter(is_active=True, category_id__in=descendant_ids)
-            .select_related("brand", "category")
-            .prefetch_related("media", "attributes", "attributes__attribute")
-        )
+class VehicleModelViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    permission_classes = [AllowAny]
+    serializer_class = VehicleModelSerializer
 
-        filtered_products = base_products
-        brands = request.query_params.getlist("brand")
-        search = request.query_params.get("search")
-        min_price = request.query_params.get("min_price")
-        max_price = request.query_params.get("max_price")
-        in_stock = request.query_params.get("in_stock")
-        attribute_filters = request.query_params.getlist("attribute")
+    def get_queryset(self):
+        queryset = VehicleModel.objects.all()
+        make = self.request.query_params.get("make")
+        if make:
+            queryset = queryset.filter(make_id=make)
+        return queryset.order_by("name")
 
-        if brands:
-            filtered_products = filtered_products.filter(brand_id__in=brands)
-        if search:
-            filtered_products = filtered_products.filter(
-                Q(name__icontains=search) | Q(description__icontains=search)
-            )
-        if min_price:
-            filtered_products = filtered_products.filter(price__gte=min_price)
-        if max_price:
-            filtered_products = filtered_products.filter(price__lte=max_price)
-        if in_stock in {"1", "true", "yes"}:
-            filtered_products = filtered_products.filter(stock_quantity__gt=F("stock_reserved"))
 
-        for entry in attribute_filters:
-            if ":" not in entry:
-                continue
-            attribute_id, raw_value = entry.split(":", 1)
-            if not attribute_id:
-                continue
+class VehicleGenerationViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    permission_classes = [AllowAny]
+    serializer_class = VehicleGenerationSerializer
 
-            value = raw_value.strip()
-            if value.lower() in {"true", "false"}:
-                filtered_products = filtered_products.filter(
-                    attributes__attribute_id=attribute_id,
-                    attributes__value_boolean=value.lower() == "true",
-                )
-            else:
-                try:
-                    number_value = float(value)
-                except ValueError:
-                    filtered_products = filtered_products.filter(
-                        attributes__attribute_id=attribute_id,
-                        attributes__value_string=value,
-                    )
-                else:
-                    filtered_products = filtered_products.filter(
-                        attributes__attribute_id=attribute_id,
-                        attributes__value_number=number_value,
-                    )
-
-        filtered_products = filtered_products.order_by("name").distinct()
+    def get_queryset(self):
+        queryset = VehicleGeneration.objects.all()
+        model = self.request.query_params.get("model")
+        if model:
+            queryset = queryset.filter(model_id=model)
+        return queryset.order_by("year_from", "name")
 
+
+class CatalogPageView(ReplicaReadMixin, APIView):
+    permission_classes = [AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "catalog"
+
+    def get(self, request):
+        return Response(CatalogPage(request.query_params).build())
+
+
+class AsyncCatalogPageView(View):
+    """
+    ``CatalogPageView`` for ASGI workers: the page, count and facet queries run
+    concurrently, so latency follows the slowest query instead of their sum.
+    """
+
+    throttle_scope = CatalogPageView.throttle_scope
+
+    async def get(self, request):
+        throttle = TokenBucketThrottle()
+        if not await sync_to_async(throttle.allow_request)(request, self):
+            response = JsonResponse({"detail": "Request was throttled."}, status=429)
+            response["Retry-After"] = str(math.ceil(throttle.wait()))
+            return response
+        await sync_to_async(route_reads_to_replica)(request)
         try:
-            page_number = int(request.query_params.get("page", 1))
-        except (TypeError, ValueError):
-            page_number = 1
-        try:
-            page_size = int(request.query_params.get("page_size", 9))
-        except (TypeError, ValueError):
-            page_size = 9
-        paginator = Paginator(filtered_products, page_size)
-        page_obj = paginator.get_page(page_number)
-
-        brand_filters = (
-            base_products.values("brand_id", "brand__name")
-            .annotate(count=Count("id"))
-            .order_by("brand__name")
+            payload = await CatalogPage(request.GET).abuild()
+        except Http404:
+            # Same body as DRF's 404 from the sync view.
+            return JsonResponse({"detail": "Not found."}, status=404)
+        return JsonResponse(payload, json_dumps_params={"ensure_ascii": False})
+
+
+ITEM_PRODUCT_PREFETCHES = (
+    "product__media",
+    "product__attributes__attribute",
+)
+
+
+class GuestCartMixin:
+    """
+    Serves anonymous requests from the Redis guest cart store when
+    ``GUEST_CART_BACKEND`` is "redis". The guest id is issued by the server on
+    the first write and travels in a signed cookie, refreshed on every
+    response; everything else goes to the database.
+    """
+
+    guest_id = None
+
+    def guest_session_id(self, issue=False):
+        request = self.request
+        if request.user.is_authenticated or not guest_carts_enabled():
+            return None
+        if self.guest_id is None:
+            self.guest_id = read_guest_id(request)
+        if self.guest_id is None and issue:
+            self.guest_id = new_guest_id()
+        return self.guest_id
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.guest_id:
+            set_guest_cookie(response, request, self.guest_id)
+        return response
+
+    def get_guest_store(self):
+        return GuestCartStore()
+
+    def get_guest_products(self, guest):
+        return (
+            Product.objects.filter(id__in=guest["lines"])
+            .prefetch_related("media", "attributes__attribute")
+            .in_bulk()
         )
 
-        attribute_filters_payload = []
-        for attribute in CategoryAttribute.objects.filter(
-            category=category, is_filterable=True
-        ).order_by("name"):
-            values_queryset = ProductAttributeValue.objects.filter(
-                product__in=base_products, attribute=attribute
-            )
-            payload = {
-                "id": attribute.id,
-                "name": attribute.name,
-                "unit": attribute.unit,
-                "data_type": attribute.data_type,
-                "filter_type": attribute.filter_type,
-                "options": [],
-                "range": None,
-            }
+    def list(self, request, *args, **kwargs):
+        session_id = self.guest_session_id()
+        if session_id:
+            return self.guest_list(request, session_id)
+        return super().list(request, *args, **kwargs)
 
-            if attribute.data_type == CategoryAttribute.DataType.BOOLEAN:
-                options = (
-                    values_queryset.exclude(value_boolean__isnull=True)
-                    .values("value_boolean")
-                    .annotate(count=Count("id"))
-                    .order_by("value_boolean")
-                )
-                payload["options"] = [
-                    {
-                        "value": str(option["value_boolean"]).lower(),
-                        "label": "Да" if option["value_boolean"] else "Нет",
-                        "count": option["count"],
-                    }
-                    for option in options
-                ]
-            elif attribute.data_type == CategoryAttribute.DataType.NUMBER:
-                range_values = values_queryset.aggregate(
-                    min_value=Min("value_number"), max_value=Max("value_number")
-                )
-                if range_values["min_value"] is not None:
-                    payload["range"] = {
-                        "min": float(range_values["min_value"]),
-                        "max": float(range_values["max_value"]),
-                    }
-            else:
-                options = (
-                    values_queryset.exclude(value_string="")
-                    .values("value_string")
-                    .annotate(count=Count("id"))
-                    .order_by("value_string")
-                )
-                payload["options"] = [
-                    {
-                        "value": option["value_string"],
-                        "label": option["value_string"],
-                        "count": option["count"],
-                    }
-                    for option in options
-                ]
-
-            attribute_filters_payload.append(payload)
-
-        response_payload = {
-            "category": {"id": category.id, "name": category.name, "slug": category.slug},
-            "breadcrumbs": breadcrumbs,
-            "category_tree": build_tree(None),
-            "filters": {
-                "brands": [
-                    {
-                        "id": item["brand_id"],
-                        "name": item["brand__name"],
-                        "count": item["count"],
-                    }
-                    for item in brand_filters
-                ],
-                "attributes": attribute_filters_payload,
-            },
-            "products": {
-                "count": paginator.count,
-                "page": page_obj.number,
-                "page_size": page_size,
-                "results": CatalogProductSerializer(page_obj.object_list, many=True).data,
-            },
-            "banners": BannerSerializer(Banner.objects.all().order_by("name"), many=True).data,
-        }
-        return Response(response_payload)
+    def retrieve(self, request, *args, **kwargs):
+        session_id = self.guest_session_id()
+        if session_id:
+            return self.guest_retrieve(request, session_id, kwargs["pk"])
+        return super().retrieve(request, *args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        session_id = self.guest_session_id(issue=True)
+        if session_id:
+            return self.guest_create(request, session_id)
+        return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        session_id = self.guest_session_id()
+        if session_id:
+            return self.guest_update(request, session_id, kwargs["pk"])
+        return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        session_id = self.guest_session_id()
+        if session_id:
+            return self.guest_destroy(request, session_id, kwargs["pk"])
+        return super().destroy(request, *args, **kwargs)
 
 
-class CartViewSet(viewsets.ModelViewSet):
+class CartViewSet(GuestCartMixin, viewsets.ModelViewSet):
+    permission_classes = [IsAuthenticatedOrGuestCart]
     serializer_class = CartSerializer
 
-    def get_queryset(self):
+    def get_owned_queryset(self):
         queryset = Cart.objects.all()
         if self.request.user.is_authenticated:
             return queryset.filter(user=self.request.user)
-        session_id = self.request.query_params.get("session_id")
-        if session_id:
-            return queryset.filter(session_id=session_id)
+        guest_id = self.guest_session_id()
+        if guest_id:
+            # The guest's cart once materialized for checkout.
+            return queryset.filter(user__isnull=True, session_id=guest_id)
         return queryset.none()
 
+    def get_queryset(self):
+        return self.get_owned_queryset().prefetch_related(
+            Prefetch(
+                "items",
+                queryset=CartItem.objects.select_related("product").prefetch_related(
+                    *ITEM_PRODUCT_PREFETCHES
+                ),
+            )
+        )
+
     def perform_create(self, serializer):
         user = self.request.user
         if user.is_authenticated:
@@ -458,34 +463,334 @@ class CartViewSet(viewsets.ModelViewSet):
         else:
             serializer.save()
 
+    def perform_update(self, serializer):
+        # The mixin drops the saved cart's prefetches; render a fresh, prefetched copy.
+        super().perform_update(serializer)
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
+
+    def serialize_guest_cart(self, guest):
+        context = {**self.get_serializer_context(), "products": self.get_guest_products(guest)}
+        return GuestCartSerializer(guest, context=context).data
+
+    def get_guest_cart(self, session_id, pk):
+        guest = self.get_guest_store().get(session_id)
+        if guest is None or str(pk) != session_id:
+            raise Http404
+        return guest
+
+    def guest_list(self, request, session_id):
+        guest = self.get_guest_store().get(session_id)
+        return Response([self.serialize_guest_cart(guest)] if guest else [])
+
+    def guest_retrieve(self, request, session_id, pk):
+        return Response(self.serialize_guest_cart(self.get_guest_cart(session_id, pk)))
+
+    def guest_create(self, request, session_id):
+        guest = self.get_guest_store().create(session_id)
+        return Response(self.serialize_guest_cart(guest), status=status.HTTP_201_CREATED)
+
+    def guest_update(self, request, session_id, pk):
+        # A guest cart has no writable fields of its own; lines go through cart-items.
+        return Response(self.serialize_guest_cart(self.get_guest_cart(session_id, pk)))
+
+    def guest_destroy(self, request, session_id, pk):
+        self.get_guest_cart(session_id, pk)
+        self.get_guest_store().delete(session_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def guest_summary(self, session_id, pk):
+        guest = self.get_guest_cart(session_id, pk)
+        products = {
+            product["id"]: product
+            for product in Product.objects.filter(id__in=guest["lines"]).values(
+                "id", "name", "price", "stock_quantity", "stock_reserved", "is_active"
+            )
+        }
+        lines = []
+        for product_id, line in sorted(guest["lines"].items()):
+            product = products.get(product_id)
+            if product is None:
+                continue
+            stock_available = max(0, product["stock_quantity"] - product["stock_reserved"])
+            lines.append(
+                {
+                    "id": product_id,
+                    "product_id": product_id,
+                    "name": product["name"],
+                    "quantity": line["quantity"],
+                    "price_snapshot": line["price_snapshot"],
+                    "current_price": product["price"],
+                    "price_changed": product["price"] != line["price_snapshot"],
+                    "line_total": product["price"] * line["quantity"],
+                    "stock_available": stock_available,
+                    "in_stock": product["is_active"] and stock_available >= line["quantity"],
+                }
+            )
+        payload = {
+            "cart": None,
+            "item_count": sum(line["quantity"] for line in lines),
+            "grand_total": sum((line["line_total"] for line in lines), 0),
+            "has_price_changes": any(line["price_changed"] for line in lines),
+            "all_in_stock": all(line["in_stock"] for line in lines),
+            "lines": lines,
+        }
+        return Response(CartSummarySerializer(payload).data)
+
+    @action(detail=False, methods=["post"], url_path="materialize")
+    def materialize(self, request):
+        """
+        Persist the current guest cart as a ``Cart`` row (used before checkout).
+        """
+
+        session_id = self.guest_session_id()
+        if not session_id:
+            return Response(
+                {"detail": "Only guest carts can be materialized."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        cart = self.get_guest_store().materialize(session_id)
+        if cart is None:
+            raise Http404
+        cart = self.get_queryset().get(pk=cart.pk)
+        return Response(self.get_serializer(cart).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["post"], url_path="lines")
+    def lines(self, request, pk=None):
+        """
+        Set many line quantities in one request; a quantity of 0 removes the line.
+        """
+
+        serializer = CartLinesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        quantities = serializer.validated_data["lines"]
 
-class CartItemViewSet(viewsets.ModelViewSet):
+        session_id = self.guest_session_id()
+        if session_id:
+            self.get_guest_cart(session_id, pk)
+            store = self.get_guest_store()
+            store.set_quantities(session_id, quantities, serializer.prices)
+            return Response(self.serialize_guest_cart(store.get(session_id)))
+
+        cart = generics.get_object_or_404(self.get_owned_queryset(), pk=pk)
+        set_cart_lines(cart, quantities, serializer.prices)
+        return Response(self.get_serializer(self.get_queryset().get(pk=cart.pk)).data)
+
+    @action(detail=True, methods=["get"], url_path="summary")
+    def summary(self, request, pk=None):
+        session_id = self.guest_session_id()
+        if session_id:
+            return self.guest_summary(session_id, pk)
+        cart = generics.get_object_or_404(self.get_owned_queryset(), pk=pk)
+        money = DecimalField(max_digits=12, decimal_places=2)
+        line_total = ExpressionWrapper(F("quantity") * F("product__price"), output_field=money)
+        lines = list(
+            CartItem.objects.filter(cart=cart)
+            .annotate(
+                name=F("product__name"),
+                current_price=F("product__price"),
+                line_total=line_total,
+                stock_available=Greatest(
+                    F("product__stock_quantity") - F("product__stock_reserved"), Value(0)
+                ),
+                is_active=F("product__is_active"),
+                item_count=Window(Sum("quantity")),
+                grand_total=Window(Sum(line_total, output_field=money)),
+            )
+            .order_by("id")
+            .values(
+                "id",
+                "product_id",
+                "name",
+                "quantity",
+                "price_snapshot",
+                "current_price",
+                "line_total",
+                "stock_available",
+                "is_active",
+                "item_count",
+                "grand_total",
+            )
+        )
+        for line in lines:
+            line["price_changed"] = line["current_price"] != line["price_snapshot"]
+            line["in_stock"] = line["is_active"] and line["stock_available"] >= line["quantity"]
+        payload = {
+            "cart": cart.id,
+            "item_count": lines[0]["item_count"] if lines else 0,
+            "grand_total": lines[0]["grand_total"] if lines else 0,
+            "has_price_changes": any(line["price_changed"] for line in lines),
+            "all_in_stock": all(line["in_stock"] for line in lines),
+            "lines": lines,
+        }
+        return Response(CartSummarySerializer(payload).data)
+
+
+class CartItemViewSet(GuestCartMixin, viewsets.ModelViewSet):
+    permission_classes = [IsAuthenticatedOrGuestCart]
     serializer_class = CartItemSerializer
 
+    def serialize_guest_lines(self, guest, lines):
+        context = {**self.get_serializer_context(), "products": self.get_guest_products(guest)}
+        lines = [{**line, "session_id": guest["session_id"]} for line in lines]
+        return GuestCartItemSerializer(lines, many=True, context=context).data
+
+    def get_guest_line(self, session_id, pk):
+        guest = self.get_guest_store().get(session_id)
+        try:
+            line = guest["lines"][int(pk)] if guest else None
+        except (KeyError, ValueError):
+            line = None
+        if line is None:
+            raise Http404
+        return guest, line
+
+    def guest_list(self, request, session_id):
+        guest = self.get_guest_store().get(session_id)
+        if guest is None:
+            return Response([])
+        return Response(self.serialize_guest_lines(guest, guest["lines"].values()))
+
+    def guest_retrieve(self, request, session_id, pk):
+        guest, line = self.get_guest_line(session_id, pk)
+        return Response(self.serialize_guest_lines(guest, [line])[0])
+
+    def guest_create(self, request, session_id):
+        serializer = GuestCartItemWriteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        product = serializer.validated_data.get("product")
+        if product is None:
+            return Response(
+                {"product_id": ["This field is required."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        store = self.get_guest_store()
+        store.add(session_id, product, max(1, serializer.validated_data["quantity"]))
+        guest = store.get(session_id)
+        line = guest["lines"][product.id]
+        return Response(
+            self.serialize_guest_lines(guest, [line])[0], status=status.HTTP_201_CREATED
+        )
+
+    def guest_update(self, request, session_id, pk):
+        guest, line = self.get_guest_line(session_id, pk)
+        serializer = GuestCartItemWriteSerializer(data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        quantity = serializer.validated_data.get("quantity", line["quantity"])
+        self.get_guest_store().set_quantity(session_id, line["product_id"], quantity)
+        line = {**line, "quantity": quantity}
+        return Response(self.serialize_guest_lines(guest, [line])[0])
+
+    def guest_destroy(self, request, session_id, pk):
+        guest, line = self.get_guest_line(session_id, pk)
+        self.get_guest_store().remove(session_id, line["product_id"])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     def get_queryset(self):
-        queryset = CartItem.objects.select_related("cart", "product")
+        queryset = CartItem.objects.select_related("cart", "product").prefetch_related(
+            *ITEM_PRODUCT_PREFETCHES
+        )
         cart_id = self.request.query_params.get("cart")
-        if self.request.user.is_authenticated:
-            queryset = queryset.filter(cart__user=self.request.user)
-        else:
-            session_id = self.request.query_params.get("session_id")
-            if session_id:
-                queryset = queryset.filter(cart__session_id=session_id)
-            else:
-                return queryset.none()
+        if not self.request.user.is_authenticated:
+            return queryset.none()
+        queryset = queryset.filter(cart__user=self.request.user)
         if cart_id:
             queryset = queryset.filter(cart_id=cart_id)
         return queryset
 
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
+
 
 class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
 
     def get_queryset(self):
-        queryset = Order.objects.prefetch_related("items")
+        queryset = Order.objects.prefetch_related(
+            Prefetch(
+                "items",
+                queryset=OrderItem.objects.select_related("product").prefetch_related(
+                    *ITEM_PRODUCT_PREFETCHES
+                ),
+            )
+        ).order_by("-created_at")
         if self.request.user.is_authenticated:
             return queryset.filter(user=self.request.user)
         return queryset.none()
 
+    def get_archived_queryset(self):
+        queryset = ArchivedOrder.objects.order_by("-created_at")
+        if self.request.user.is_authenticated:
+            return queryset.filter(user=self.request.user)
+        return queryset.none()
+
+    def serialize_archived(self, orders):
+        product_ids = {item["product_id"] for order in orders for item in order.items}
+        products = (
+            Product.objects.filter(id__in=product_ids)
+            .prefetch_related("media", "attributes", "attributes__attribute")
+            .in_bulk()
+        )
+        context = {**self.get_serializer_context(), "products": products}
+        return ArchivedOrderSerializer(orders, many=True, context=context).data
+
+    def list(self, request, *args, **kwargs):
+        """
+        Current orders; ``?archived=1`` lists archived ones instead, newest
+        first, ``ARCHIVED_ORDERS_PAGE_SIZE`` at a time: pass the last id seen
+        as ``?before=`` for the next page.
+        """
+
+        if request.query_params.get("archived") not in ("1", "true"):
+            return super().list(request, *args, **kwargs)
+        # Ids follow creation order, so they double as the cursor.
+        queryset = self.get_archived_queryset().order_by("-id")
+        before = request.query_params.get("before")
+        if before:
+            try:
+                queryset = queryset.filter(id__lt=int(before))
+            except ValueError:
+                return Response(
+                    {"before": ["A valid integer is required."]},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        archived = list(queryset[:settings.ARCHIVED_ORDERS_PAGE_SIZE])
+        return Response(self.serialize_archived(archived))
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            archived = generics.get_object_or_404(
+                self.get_archived_queryset(), pk=kwargs[self.lookup_field]
+            )
+            return Response(self.serialize_archived([archived])[0])
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
+
+
+class CartMergingTokenObtainPairView(TokenObtainPairView):
+    """
+    Issues JWT tokens and folds the visitor's guest cart (signed guest cookie)
+    into the user's cart, including one already materialized for checkout.
+    """
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as exc:
+            raise InvalidToken(exc.args[0])
+
+        guest_id = read_guest_id(request) if guest_carts_enabled() else None
+        response = Response(serializer.validated_data, status=status.HTTP_200_OK)
+        if guest_id:
+            GuestCartStore().materialize(guest_id, user=serializer.user)
+            merge_session_cart(guest_id, serializer.user)
+            response.delete_cookie(settings.GUEST_CART_COOKIE)
+        return response
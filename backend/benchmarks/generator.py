@@ -0,0 +1,303 @@
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from cart.models import Cart, CartItem
+from catalog.attributes import refresh_attribute_data
+from catalog.models import (
+    Brand,
+    Category,
+    CategoryAttribute,
+    DeletedProduct,
+    Product,
+    ProductAttributeValue,
+    ProductMedia,
+)
+from catalog.signals import reference_data_changed
+from orders.models import Order, OrderItem
+
+DEFAULT_PREFIX = "bench"
+GENERATOR_CHUNK_SIZE = 2000
+STRING_OPTIONS = 8
+ORDER_STATUSES = [
+    Order.Status.PENDING,
+    Order.Status.PAID,
+    Order.Status.SHIPPED,
+    Order.Status.DELIVERED,
+    Order.Status.CANCELED,
+]
+
+
+class DatasetExists(Exception):
+    pass
+
+
+def bench_username(prefix):
+    return f"{prefix}-user"
+
+
+def product_slug(prefix, number):
+    return f"{prefix}-p{number}"
+
+
+def _chunks(total, size):
+    start = 0
+    while start < total:
+        yield start, min(start + size, total)
+        start += size
+
+
+def _build_categories(prefix, depth, fanout):
+    """
+    Create a ``fanout``-ary category tree ``depth`` levels deep, one
+    ``bulk_create`` per level. Returns the leaf categories.
+    """
+
+    parents = [(None, "")]
+    for level in range(depth):
+        level_categories = []
+        suffixes = []
+        for parent, parent_suffix in parents:
+            for position in range(fanout):
+                suffix = f"{parent_suffix}-{position}" if parent else str(position)
+                suffixes.append(suffix)
+                level_categories.append(
+                    Category(
+                        name=f"Category {suffix}",
+                        slug=f"{prefix}-c{suffix}",
+                        parent=parent,
+                        sort_order=position,
+                    )
+                )
+        parents = list(zip(Category.objects.bulk_create(level_categories), suffixes))
+    return [category for category, _ in parents]
+
+
+def _build_attributes(leaves, per_category):
+    """
+    Give every leaf category ``per_category`` filterable attributes, cycling
+    through number (range), string (checkbox) and boolean types.
+    """
+
+    kinds = [
+        (CategoryAttribute.DataType.NUMBER, CategoryAttribute.FilterType.RANGE, "mm"),
+        (CategoryAttribute.DataType.STRING, CategoryAttribute.FilterType.CHECKBOX, ""),
+        (CategoryAttribute.DataType.BOOLEAN, CategoryAttribute.FilterType.CHECKBOX, ""),
+    ]
+    attributes = []
+    for category in leaves:
+        for index in range(per_category):
+            data_type, filter_type, unit = kinds[index % len(kinds)]
+            attributes.append(
+                CategoryAttribute(
+                    category=category,
+                    name=f"Attribute {index}",
+                    data_type=data_type,
+                    filter_type=filter_type,
+                    unit=unit,
+                )
+            )
+    by_category = {}
+    for attribute in CategoryAttribute.objects.bulk_create(attributes):
+        by_category.setdefault(attribute.category_id, []).append(attribute)
+    return by_category
+
+
+def _attribute_value(rng, product, attribute):
+    value = ProductAttributeValue(product=product, attribute=attribute)
+    if attribute.data_type == CategoryAttribute.DataType.NUMBER:
+        value.value_number = Decimal(rng.randint(10, 5000)) / 10
+    elif attribute.data_type == CategoryAttribute.DataType.BOOLEAN:
+        value.value_boolean = rng.random() < 0.5
+    else:
+        value.value_string = f"Option {rng.randint(1, STRING_OPTIONS)}"
+    return value
+
+
+def _build_products(rng, prefix, leaves, brands, attributes_by_category, total, media, chunk_size, progress):
+    stats = {"products": 0, "attribute_values": 0, "media": 0}
+    product_ids = []
+    for start, end in _chunks(total, chunk_size):
+        with transaction.atomic():
+            products = []
+            for number in range(start, end):
+                products.append(
+                    Product(
+                        name=f"Product {number}",
+                        slug=product_slug(prefix, number),
+                        description=f"Synthetic benchmark product {number}",
+                        brand=rng.choice(brands),
+                        category=rng.choice(leaves),
+                        price=Decimal(rng.randint(100, 500000)) / 100,
+                        stock_quantity=rng.randint(0, 500),
+                        popularity=rng.random() * 100,
+                        sales_score=rng.random() * 50,
+                    )
+                )
+            products = Product.objects.bulk_create(products)
+
+            values = [
+                _attribute_value(rng, product, attribute)
+                for product in products
+                for attribute in attributes_by_category.get(product.category_id, [])
+            ]
+            ProductAttributeValue.objects.bulk_create(values, batch_size=chunk_size)
+            ProductMedia.objects.bulk_create(
+                [
+                    ProductMedia(
+                        product=product,
+                        file_url=f"products/{product.slug}/{position}.jpg",
+                        alt_text=product.name,
+                        sort_order=position,
+                    )
+                    for product in products
+                    for position in range(media)
+                ],
+                batch_size=chunk_size,
+            )
+            chunk_ids = [product.id for product in products]
+            refresh_attribute_data(chunk_ids)
+
+        product_ids.extend(chunk_ids)
+        stats["products"] += len(products)
+        stats["attribute_values"] += len(values)
+        stats["media"] += len(products) * media
+        if progress:
+            progress(f"products: {stats['products']}/{total}")
+    return product_ids, stats
+
+
+def _build_orders(rng, prefix, user, product_ids, total, items_per_order, chunk_size, progress):
+    prices = dict(
+        Product.objects.filter(slug__startswith=f"{prefix}-").values_list("id", "price").iterator()
+    )
+    created_items = 0
+    for start, end in _chunks(total, chunk_size):
+        orders = []
+        lines = []
+        for _ in range(start, end):
+            order_lines = [
+                (product_id, rng.randint(1, 3))
+                for product_id in rng.sample(product_ids, min(items_per_order, len(product_ids)))
+            ]
+            subtotal = sum((prices[product_id] * quantity for product_id, quantity in order_lines), Decimal("0"))
+            orders.append(
+                Order(user=user, status=rng.choice(ORDER_STATUSES), subtotal=subtotal, grand_total=subtotal)
+            )
+            lines.append(order_lines)
+        with transaction.atomic():
+            orders = Order.objects.bulk_create(orders)
+            items = [
+                OrderItem(order=order, product_id=product_id, quantity=quantity, price_snapshot=prices[product_id])
+                for order, order_lines in zip(orders, lines)
+                for product_id, quantity in order_lines
+            ]
+            OrderItem.objects.bulk_create(items, batch_size=chunk_size)
+        created_items += len(items)
+        if progress:
+            progress(f"orders: {end}/{total}")
+    return created_items
+
+
+def generate_catalog(
+    *,
+    depth=3,
+    fanout=5,
+    brands=200,
+    products=100_000,
+    attributes=10,
+    media=2,
+    orders=20_000,
+    items_per_order=3,
+    cart_items=20,
+    seed=42,
+    prefix=DEFAULT_PREFIX,
+    chunk_size=GENERATOR_CHUNK_SIZE,
+    progress=None,
+):
+    """
+    Fill the database with a deterministic synthetic catalog: a ``fanout``-ary
+    category tree ``depth`` levels deep with products on the leaves,
+    ``attributes`` EAV values and ``media`` images per product, plus a
+    benchmark user with ``orders`` past orders and a cart. Rows are written
+    with ``bulk_create`` in chunks of ``chunk_size``; every slug starts with
+    ``prefix`` so ``clear_dataset`` can remove them again.
+    """
+
+    if Category.objects.filter(slug__startswith=f"{prefix}-").exists():
+        raise DatasetExists(f"Benchmark data with prefix '{prefix}' already exists.")
+    if depth < 1 or fanout < 1 or brands < 1 or products < 1:
+        raise ValueError("depth, fanout, brands and products must be positive.")
+
+    rng = random.Random(seed)
+    with transaction.atomic():
+        leaves = _build_categories(prefix, depth, fanout)
+        brand_objects = Brand.objects.bulk_create(
+            [Brand(name=f"Brand {number}", slug=f"{prefix}-b{number}") for number in range(brands)]
+        )
+        attributes_by_category = _build_attributes(leaves, attributes)
+        reference_data_changed.send(sender=CategoryAttribute)
+        reference_data_changed.send(sender=Brand)
+    if progress:
+        progress(f"categories: {sum(fanout ** level for level in range(1, depth + 1))}, brands: {brands}")
+
+    product_ids, stats = _build_products(
+        rng, prefix, leaves, brand_objects, attributes_by_category, products, media, chunk_size, progress
+    )
+
+    user, _ = get_user_model().objects.get_or_create(
+        username=bench_username(prefix), defaults={"email": f"{prefix}@example.com"}
+    )
+    order_items = _build_orders(rng, prefix, user, product_ids, orders, items_per_order, chunk_size, progress)
+
+    cart = Cart.objects.create(user=user)
+    cart_products = rng.sample(product_ids, min(cart_items, len(product_ids)))
+    CartItem.objects.bulk_create(
+        [
+            CartItem(cart=cart, product_id=product_id, quantity=1, price_snapshot=price)
+            for product_id, price in Product.objects.filter(id__in=cart_products).values_list("id", "price")
+        ]
+    )
+
+    return {
+        "categories": sum(fanout ** level for level in range(1, depth + 1)),
+        "brands": brands,
+        "attributes": sum(len(items) for items in attributes_by_category.values()),
+        **stats,
+        "orders": orders,
+        "order_items": order_items,
+        "cart_items": len(cart_products),
+    }
+
+
+def clear_dataset(prefix=DEFAULT_PREFIX):
+    """
+    Remove everything ``generate_catalog`` created for ``prefix``.
+    """
+
+    products = Product.objects.filter(slug__startswith=f"{prefix}-")
+    with transaction.atomic():
+        user = get_user_model().objects.filter(username=bench_username(prefix)).first()
+        if user is not None:
+            Order.objects.filter(user=user).delete()
+            Cart.objects.filter(user=user).delete()
+            user.delete()
+        # Raw delete: the per-row ``attribute_data`` sync signal would refresh
+        # each product right before the product itself is removed.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM {value} WHERE product_id IN (SELECT id FROM {product} WHERE slug LIKE %s)".format(
+                    value=connection.ops.quote_name(ProductAttributeValue._meta.db_table),
+                    product=connection.ops.quote_name(Product._meta.db_table),
+                ),
+                [f"{prefix}-%"],
+            )
+        deleted = products.count()
+        products.delete()
+        # Synthetic products never were in a published feed.
+        DeletedProduct.objects.filter(slug__startswith=f"{prefix}-").delete()
+        Category.objects.filter(slug__startswith=f"{prefix}-").delete()
+        Brand.objects.filter(slug__startswith=f"{prefix}-").delete()
+    return deleted
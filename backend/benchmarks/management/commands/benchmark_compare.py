@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.runner import DEFAULT_THRESHOLD, MIN_LATENCY_DELTA_MS, compare_reports, load_report
+
+
+class Command(BaseCommand):
+    help = "Compare two benchmark_run reports; exits with an error when the second one regressed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("baseline")
+        parser.add_argument("current")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=DEFAULT_THRESHOLD,
+            help="Allowed relative growth of latency and peak memory (0.1 = 10%%).",
+        )
+        parser.add_argument("--min-delta-ms", type=float, default=MIN_LATENCY_DELTA_MS)
+
+    def handle(self, *args, **options):
+        try:
+            baseline = load_report(options["baseline"])
+            current = load_report(options["current"])
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        rows = compare_reports(
+            baseline, current, threshold=options["threshold"], min_delta_ms=options["min_delta_ms"]
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{'REGRESSION' if row['regression'] else 'ok':<10} {row['scenario']:<24} "
+                f"{row['metric']:<15} {row['baseline']:>10} -> {row['current']:<10} ({row['change']:+.1%})"
+            )
+        regressions = [row for row in rows if row["regression"]]
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+        self.stdout.write(f"No regressions in {len(rows)} metrics")
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.generator import DEFAULT_PREFIX
+from benchmarks.runner import (
+    DEFAULT_ITERATIONS,
+    DEFAULT_WARMUP,
+    ScenarioFailed,
+    run_benchmarks,
+    save_report,
+)
+from benchmarks.scenarios import SCENARIOS, DatasetMissing
+
+
+class Command(BaseCommand):
+    help = "Run the benchmark scenarios against the benchmark_seed data and write a JSON report."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default="benchmark.json")
+        parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), dest="scenarios")
+        parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+        parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default=DEFAULT_PREFIX)
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be positive.")
+
+        def progress(name, result):
+            self.stdout.write(
+                f"{name}: p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, "
+                f"{result['queries']} queries, peak {result['peak_memory_kb']} KiB"
+            )
+
+        try:
+            report = run_benchmarks(
+                options["scenarios"],
+                prefix=options["prefix"],
+                iterations=options["iterations"],
+                warmup=options["warmup"],
+                seed=options["seed"],
+                progress=progress,
+            )
+        except (DatasetMissing, ScenarioFailed) as exc:
+            raise CommandError(str(exc))
+        save_report(report, options["output"])
+        self.stdout.write(f"Wrote {options['output']}")
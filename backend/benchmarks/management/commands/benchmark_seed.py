@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.generator import (
+    DEFAULT_PREFIX,
+    GENERATOR_CHUNK_SIZE,
+    DatasetExists,
+    clear_dataset,
+    generate_catalog,
+)
+
+
+class Command(BaseCommand):
+    help = "Generate a deterministic synthetic catalog (categories, products, attributes, media, orders) for benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--depth", type=int, default=3, help="Category tree depth.")
+        parser.add_argument("--fanout", type=int, default=5, help="Children per category.")
+        parser.add_argument("--brands", type=int, default=200)
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--attributes", type=int, default=10, help="Attributes per leaf category.")
+        parser.add_argument("--media", type=int, default=2, help="Images per product.")
+        parser.add_argument("--orders", type=int, default=20_000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--prefix", default=DEFAULT_PREFIX)
+        parser.add_argument("--chunk-size", type=int, default=GENERATOR_CHUNK_SIZE)
+        parser.add_argument("--reset", action="store_true", help="Delete existing data with this prefix first.")
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            deleted = clear_dataset(options["prefix"])
+            self.stdout.write(f"Removed {deleted} benchmark products")
+        try:
+            stats = generate_catalog(
+                depth=options["depth"],
+                fanout=options["fanout"],
+                brands=options["brands"],
+                products=options["products"],
+                attributes=options["attributes"],
+                media=options["media"],
+                orders=options["orders"],
+                seed=options["seed"],
+                prefix=options["prefix"],
+                chunk_size=options["chunk_size"],
+                progress=self.stdout.write,
+            )
+        except DatasetExists as exc:
+            raise CommandError(f"{exc} Pass --reset to regenerate it.")
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(", ".join(f"{key}: {value}" for key, value in stats.items()))
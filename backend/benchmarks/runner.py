@@ -0,0 +1,229 @@
+import json
+import math
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from storage.tiered_cache import evict_all
+
+from .scenarios import SCENARIOS, Dataset
+
+DEFAULT_ITERATIONS = 50
+DEFAULT_WARMUP = 5
+MEMORY_SAMPLES = 5
+DEFAULT_THRESHOLD = 0.10
+# Latency changes below this many milliseconds are noise, whatever the ratio.
+MIN_LATENCY_DELTA_MS = 1.0
+LATENCY_METRICS = ("p50_ms", "p95_ms")
+
+
+class ScenarioFailed(Exception):
+    pass
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of ``values``.
+    """
+
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def _private_caches(prefix):
+    return {
+        alias: {**config, "KEY_PREFIX": ":".join(filter(None, (config.get("KEY_PREFIX"), prefix)))}
+        for alias, config in settings.CACHES.items()
+    }
+
+
+def _delete_prefixed():
+    # LocMem caches belong to this process and go away with it.
+    for alias in settings.CACHES:
+        backend = caches[alias]
+        if isinstance(backend, RedisCache):
+            client = backend._cache.get_client(write=True)
+            keys = list(client.scan_iter(match=f"{backend.key_prefix}:*"))
+            if keys:
+                client.delete(*keys)
+
+
+def _server_name():
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != "*" and not host.startswith(".")]
+    return hosts[0] if hosts else "localhost"
+
+
+class ScenarioRunner:
+    """
+    Replays scenario requests in-process through the full middleware stack.
+    Requests of a scenario are generated up front from ``seed``, so two runs
+    against the same dataset issue exactly the same calls.
+    """
+
+    def __init__(self, dataset, *, iterations=DEFAULT_ITERATIONS, warmup=DEFAULT_WARMUP, seed=0):
+        self.dataset = dataset
+        self.iterations = iterations
+        self.warmup = warmup
+        self.seed = seed
+        self.anonymous = APIClient(SERVER_NAME=_server_name())
+        self.authenticated = APIClient(SERVER_NAME=_server_name())
+        self.authenticated.force_authenticate(user=dataset.user)
+
+    def execute(self, request):
+        client = self.authenticated if request.authenticated else self.anonymous
+        if not request.mutates:
+            return getattr(client, request.method)(request.path, request.data)
+        with transaction.atomic():
+            response = getattr(client, request.method)(request.path, request.data, format="json")
+            transaction.set_rollback(True)
+        return response
+
+    def run(self, name):
+        build = SCENARIOS[name]
+        rng = random.Random(f"{self.seed}:{name}")
+        requests = [build(self.dataset, rng) for _ in range(self.warmup + self.iterations)]
+        # Each scenario starts cold under a key prefix of its own, which is
+        # deleted afterwards: the cache may be shared with live processes, so
+        # clearing it is not an option.
+        prefix = f"bench:{uuid.uuid4().hex}"
+        with override_settings(CACHES=_private_caches(prefix)):
+            evict_all()
+            try:
+                return self.measure(name, requests)
+            finally:
+                _delete_prefixed()
+                evict_all()
+
+    def measure(self, name, requests):
+        timings = []
+        queries = []
+        for index, request in enumerate(requests):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = self.execute(request)
+                elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise ScenarioFailed(
+                    f"{name}: {request.method.upper()} {request.path} returned {response.status_code}"
+                )
+            if index >= self.warmup:
+                timings.append(elapsed * 1000)
+                queries.append(len(captured))
+
+        # Separate pass: tracing allocations slows everything down too much
+        # to share it with the timed one.
+        peak = 0
+        tracemalloc.start()
+        try:
+            for request in requests[self.warmup:self.warmup + MEMORY_SAMPLES]:
+                tracemalloc.reset_peak()
+                self.execute(request)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "iterations": len(timings),
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p95_ms": round(percentile(timings, 95), 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "max_ms": round(max(timings), 3),
+            "queries": max(queries),
+            "queries_mean": round(statistics.fmean(queries), 2),
+            "peak_memory_kb": round(peak / 1024, 1),
+        }
+
+
+def run_benchmarks(names=None, *, prefix, iterations=DEFAULT_ITERATIONS, warmup=DEFAULT_WARMUP, seed=0, progress=None):
+    """
+    Run the named scenarios (all by default) and return a JSON-serializable
+    report with per-scenario latency percentiles, query counts and peak memory.
+    """
+
+    dataset = Dataset(prefix)
+    runner = ScenarioRunner(dataset, iterations=iterations, warmup=warmup, seed=seed)
+    results = {}
+    # Measure the views, not the protection against crawler bursts, and keep
+    # synthetic page views out of the live popularity counters.
+    with override_settings(
+        LOAD_SHEDDING_ENABLED=False,
+        REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}},
+        PRODUCT_VIEWS_BACKEND="off",
+    ):
+        for name in names or SCENARIOS:
+            results[name] = runner.run(name)
+            if progress:
+                progress(name, results[name])
+    return {
+        "meta": {
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "prefix": prefix,
+            "iterations": iterations,
+            "warmup": warmup,
+            "seed": seed,
+            "dataset": dataset.summary(),
+        },
+        "scenarios": results,
+    }
+
+
+def compare_reports(baseline, current, *, threshold=DEFAULT_THRESHOLD, min_delta_ms=MIN_LATENCY_DELTA_MS):
+    """
+    Compare two ``run_benchmarks`` reports scenario by scenario. Returns rows
+    of ``{"scenario", "metric", "baseline", "current", "change", "regression"}``;
+    latency and peak memory regress when they grow by more than ``threshold``
+    (latency also by more than ``min_delta_ms``), query counts on any increase.
+    """
+
+    rows = []
+    for name, before in baseline.get("scenarios", {}).items():
+        after = current.get("scenarios", {}).get(name)
+        if after is None:
+            continue
+        for metric in (*LATENCY_METRICS, "queries", "peak_memory_kb"):
+            old, new = before.get(metric), after.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else (0.0 if new == old else math.inf)
+            if metric == "queries":
+                regression = new > old
+            elif metric in LATENCY_METRICS:
+                regression = change > threshold and new - old > min_delta_ms
+            else:
+                regression = change > threshold
+            rows.append(
+                {
+                    "scenario": name,
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "change": change,
+                    "regression": regression,
+                }
+            )
+    return rows
+
+
+def load_report(path):
+    with open(path, encoding="utf-8") as stream:
+        return json.load(stream)
+
+
+def save_report(report, path):
+    with open(path, "w", encoding="utf-8") as stream:
+        json.dump(report, stream, indent=2)
+        stream.write("\n")
@@ -0,0 +1,132 @@
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+
+from cart.models import Cart
+from catalog.models import Brand, Category, CategoryAttribute, Product
+
+from .generator import DEFAULT_PREFIX, bench_username
+
+SAMPLE_PRODUCTS = 1000
+
+# One HTTP call of a scenario. ``mutates`` requests run in a transaction
+# that is rolled back, so every iteration sees the same data.
+BenchRequest = namedtuple("BenchRequest", "method path data authenticated mutates")
+
+
+class DatasetMissing(Exception):
+    pass
+
+
+class Dataset:
+    """
+    Ids the scenarios pick their parameters from, loaded once from the data
+    ``generate_catalog`` created for ``prefix``.
+    """
+
+    def __init__(self, prefix=DEFAULT_PREFIX):
+        self.prefix = prefix
+        self.user = get_user_model().objects.filter(username=bench_username(prefix)).first()
+        cart = Cart.objects.filter(user=self.user).first() if self.user else None
+        if cart is None:
+            raise DatasetMissing(f"No benchmark data with prefix '{prefix}'; run benchmark_seed first.")
+        self.cart_id = cart.id
+
+        categories = list(Category.objects.filter(slug__startswith=f"{prefix}-").values("id", "parent_id"))
+        parent_ids = {item["parent_id"] for item in categories}
+        self.roots = [item["id"] for item in categories if item["parent_id"] is None]
+        self.leaves = [item["id"] for item in categories if item["id"] not in parent_ids]
+        self.brands = list(Brand.objects.filter(slug__startswith=f"{prefix}-").values_list("id", flat=True))
+        self.attributes = {}
+        for attribute in CategoryAttribute.objects.filter(category_id__in=self.leaves).values(
+            "id", "category_id", "data_type"
+        ):
+            self.attributes.setdefault(attribute["category_id"], []).append(attribute)
+        products = list(
+            Product.objects.filter(slug__startswith=f"{prefix}-", is_active=True, stock_quantity__gte=10)
+            .order_by("id")
+            .values_list("id", "slug")[:SAMPLE_PRODUCTS]
+        )
+        self.product_ids = [product_id for product_id, _ in products]
+        self.product_slugs = [slug for _, slug in products]
+
+    def summary(self):
+        return {
+            "root_categories": len(self.roots),
+            "leaf_categories": len(self.leaves),
+            "brands": len(self.brands),
+            "products": Product.objects.filter(slug__startswith=f"{self.prefix}-").count(),
+        }
+
+    def attribute_of(self, rng, category_id, data_type):
+        candidates = [item for item in self.attributes.get(category_id, []) if item["data_type"] == data_type]
+        return rng.choice(candidates)["id"] if candidates else None
+
+
+def catalog_page(dataset, rng):
+    return BenchRequest(
+        "get",
+        "/api/catalog-page/",
+        {"category": rng.choice(dataset.roots), "sort": "popularity", "page": rng.randint(1, 3)},
+        False,
+        False,
+    )
+
+
+def catalog_page_filtered(dataset, rng):
+    category = rng.choice(dataset.leaves)
+    params = {
+        "category": category,
+        "brand": rng.sample(dataset.brands, min(3, len(dataset.brands))),
+        "min_price": rng.randint(1, 500),
+        "sort": "price_asc",
+    }
+    attribute = dataset.attribute_of(rng, category, CategoryAttribute.DataType.STRING)
+    if attribute:
+        params["attribute"] = f"{attribute}:Option {rng.randint(1, 8)}"
+    return BenchRequest("get", "/api/catalog-page/", params, False, False)
+
+
+def product_filter(dataset, rng):
+    category = rng.choice(dataset.leaves)
+    params = {"category": category, "sort": rng.choice(["name", "price_asc", "popularity"])}
+    attribute = dataset.attribute_of(rng, category, CategoryAttribute.DataType.STRING)
+    if attribute:
+        params["attribute"] = f"{attribute}:Option {rng.randint(1, 8)}"
+    attribute = dataset.attribute_of(rng, category, CategoryAttribute.DataType.NUMBER)
+    if attribute:
+        params["attribute_min"] = f"{attribute}:{rng.randint(1, 250)}"
+    return BenchRequest("get", "/api/products/", params, False, False)
+
+
+def product_detail(dataset, rng):
+    return BenchRequest(
+        "get", f"/api/products/by-slug/{rng.choice(dataset.product_slugs)}/", None, False, False
+    )
+
+
+def cart_detail(dataset, rng):
+    return BenchRequest("get", f"/api/carts/{dataset.cart_id}/", None, True, False)
+
+
+def cart_summary(dataset, rng):
+    return BenchRequest("get", f"/api/carts/{dataset.cart_id}/summary/", None, True, False)
+
+
+def order_create(dataset, rng):
+    items = [
+        {"product_id": product_id, "quantity": rng.randint(1, 3)}
+        for product_id in rng.sample(dataset.product_ids, min(3, len(dataset.product_ids)))
+    ]
+    return BenchRequest("post", "/api/orders/", {"items": items}, True, True)
+
+
+SCENARIOS = {
+    "catalog_page": catalog_page,
+    "catalog_page_filtered": catalog_page_filtered,
+    "product_filter": product_filter,
+    "product_detail": product_detail,
+    "cart_detail": cart_detail,
+    "cart_summary": cart_summary,
+    "order_create": order_create,
+}
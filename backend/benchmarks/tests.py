@@ -0,0 +1,100 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from catalog.models import Category, Product, ProductAttributeValue
+from orders.models import Order
+
+from .generator import DatasetExists, clear_dataset, generate_catalog
+from .runner import compare_reports, percentile, run_benchmarks
+from .scenarios import SCENARIOS
+
+
+def small_catalog(**overrides):
+    options = {
+        "depth": 2,
+        "fanout": 2,
+        "brands": 3,
+        "products": 40,
+        "attributes": 3,
+        "media": 1,
+        "orders": 5,
+        "cart_items": 3,
+        "chunk_size": 15,
+    }
+    options.update(overrides)
+    return generate_catalog(**options)
+
+
+class GeneratorTests(TestCase):
+    def test_generates_a_consistent_deterministic_catalog(self):
+        stats = small_catalog()
+
+        self.assertEqual(stats["categories"], 6)
+        self.assertEqual(stats["products"], 40)
+        self.assertEqual(stats["attribute_values"], 120)
+        self.assertEqual(ProductAttributeValue.objects.count(), 120)
+        self.assertEqual(Order.objects.count(), 5)
+        leaf_ids = set(Category.objects.filter(parent__isnull=False).values_list("id", flat=True))
+        products = Product.objects.all()
+        self.assertTrue(all(product.category_id in leaf_ids for product in products))
+        self.assertTrue(all(len(product.attribute_data) == 3 for product in products))
+        first_prices = list(products.order_by("slug").values_list("price", flat=True))
+
+        with self.assertRaises(DatasetExists):
+            small_catalog()
+        clear_dataset()
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(Category.objects.exists())
+
+        small_catalog()
+        self.assertEqual(list(Product.objects.order_by("slug").values_list("price", flat=True)), first_prices)
+
+
+class RunnerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_every_scenario_runs_and_is_reported(self):
+        small_catalog()
+        cache.set("unrelated", "kept")
+
+        report = run_benchmarks(prefix="bench", iterations=3, warmup=1)
+
+        self.assertEqual(set(report["scenarios"]), set(SCENARIOS))
+        for result in report["scenarios"].values():
+            self.assertEqual(result["iterations"], 3)
+            self.assertLessEqual(result["p50_ms"], result["p95_ms"])
+            self.assertGreater(result["queries"], 0)
+            self.assertGreater(result["peak_memory_kb"], 0)
+        # Order creation is rolled back after each iteration.
+        self.assertEqual(Order.objects.count(), 5)
+        # Scenarios use keys of their own instead of clearing the shared cache.
+        self.assertEqual(cache.get("unrelated"), "kept")
+
+    @override_settings(PRODUCT_VIEWS_BACKEND="redis")
+    def test_scenarios_do_not_count_product_views(self):
+        small_catalog()
+
+        with patch("catalog.popularity.get_redis") as get_redis:
+            run_benchmarks(names=["product_detail"], prefix="bench", iterations=2, warmup=1)
+
+        get_redis.assert_not_called()
+
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_compare_flags_slower_heavier_and_chattier_scenarios(self):
+        baseline = {"scenarios": {"page": {"p50_ms": 10.0, "p95_ms": 20.0, "queries": 5, "peak_memory_kb": 100}}}
+        current = {"scenarios": {"page": {"p50_ms": 10.5, "p95_ms": 30.0, "queries": 6, "peak_memory_kb": 105}}}
+
+        rows = {row["metric"]: row for row in compare_reports(baseline, current, threshold=0.1)}
+
+        self.assertFalse(rows["p50_ms"]["regression"])
+        self.assertTrue(rows["p95_ms"]["regression"])
+        self.assertTrue(rows["queries"]["regression"])
+        self.assertFalse(rows["peak_memory_kb"]["regression"])
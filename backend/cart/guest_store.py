@@ -0,0 +1,170 @@
+import secrets
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from catalog.models import Product
+from storage.redis_client import get_redis
+
+from .lines import add_cart_lines, user_cart
+from .models import Cart
+
+KEY_PREFIX = "guest-cart"
+QUANTITY_PREFIX = "q:"
+PRICE_PREFIX = "p:"
+COOKIE_SALT = "cart.guest"
+
+
+def guest_carts_enabled() -> bool:
+    return settings.GUEST_CART_BACKEND == "redis"
+
+
+def new_guest_id() -> str:
+    return secrets.token_urlsafe(24)
+
+
+def read_guest_id(request):
+    """
+    The guest cart id from the signed ``GUEST_CART_COOKIE``, or ``None`` when
+    it is missing, tampered with or older than ``GUEST_CART_TTL``.
+    """
+
+    return request.get_signed_cookie(
+        settings.GUEST_CART_COOKIE, default=None, salt=COOKIE_SALT, max_age=settings.GUEST_CART_TTL
+    )
+
+
+def set_guest_cookie(response, request, guest_id: str) -> None:
+    response.set_signed_cookie(
+        settings.GUEST_CART_COOKIE,
+        guest_id,
+        salt=COOKIE_SALT,
+        max_age=settings.GUEST_CART_TTL,
+        secure=request.is_secure(),
+        httponly=True,
+        samesite="Lax",
+    )
+
+
+class GuestCartStore:
+    """
+    Anonymous carts kept in one Redis hash per session with a sliding TTL.
+    Fields: ``q:<product_id>`` (quantity), ``p:<product_id>`` (price snapshot),
+    ``created_at`` and ``updated_at``.
+    """
+
+    def __init__(self, client=None, ttl=None):
+        self.client = client or get_redis()
+        self.ttl = ttl or settings.GUEST_CART_TTL
+
+    def key(self, session_id: str) -> str:
+        return f"{KEY_PREFIX}:{session_id}"
+
+    def _touch(self, pipe, session_id: str) -> None:
+        key = self.key(session_id)
+        now = timezone.now().isoformat()
+        pipe.hsetnx(key, "created_at", now)
+        pipe.hset(key, "updated_at", now)
+        pipe.expire(key, self.ttl)
+
+    def get(self, session_id: str):
+        raw = self.client.hgetall(self.key(session_id))
+        if not raw:
+            return None
+        lines = {}
+        for field, value in raw.items():
+            if not field.startswith(QUANTITY_PREFIX):
+                continue
+            product_id = int(field[len(QUANTITY_PREFIX):])
+            lines[product_id] = {
+                "product_id": product_id,
+                "quantity": int(value),
+                "price_snapshot": Decimal(raw.get(f"{PRICE_PREFIX}{product_id}", "0")),
+            }
+        return {
+            "session_id": session_id,
+            "created_at": raw.get("created_at"),
+            "updated_at": raw.get("updated_at"),
+            "lines": lines,
+        }
+
+    def create(self, session_id: str):
+        pipe = self.client.pipeline()
+        self._touch(pipe, session_id)
+        pipe.execute()
+        return self.get(session_id)
+
+    def add(self, session_id: str, product: Product, quantity: int) -> None:
+        key = self.key(session_id)
+        pipe = self.client.pipeline()
+        pipe.hincrby(key, f"{QUANTITY_PREFIX}{product.id}", quantity)
+        pipe.hset(key, f"{PRICE_PREFIX}{product.id}", str(product.price))
+        self._touch(pipe, session_id)
+        pipe.execute()
+
+    def set_quantity(self, session_id: str, product_id: int, quantity: int) -> None:
+        self.set_quantities(session_id, {product_id: quantity}, {})
+
+    def set_quantities(self, session_id: str, quantities, prices) -> None:
+        """
+        Set many lines in one round trip; a quantity of 0 removes the line and
+        ``prices`` provides snapshots for products not yet in the cart.
+        """
+
+        key = self.key(session_id)
+        pipe = self.client.pipeline()
+        for product_id, quantity in quantities.items():
+            if quantity <= 0:
+                pipe.hdel(key, f"{QUANTITY_PREFIX}{product_id}", f"{PRICE_PREFIX}{product_id}")
+                continue
+            pipe.hset(key, f"{QUANTITY_PREFIX}{product_id}", quantity)
+            if product_id in prices:
+                pipe.hsetnx(key, f"{PRICE_PREFIX}{product_id}", str(prices[product_id]))
+        self._touch(pipe, session_id)
+        pipe.execute()
+
+    def remove(self, session_id: str, product_id: int) -> None:
+        pipe = self.client.pipeline()
+        pipe.hdel(
+            self.key(session_id),
+            f"{QUANTITY_PREFIX}{product_id}",
+            f"{PRICE_PREFIX}{product_id}",
+        )
+        self._touch(pipe, session_id)
+        pipe.execute()
+
+    def delete(self, session_id: str) -> None:
+        self.client.delete(self.key(session_id))
+
+    def materialize(self, session_id: str, user=None):
+        """
+        Turn the guest cart into ``Cart``/``CartItem`` rows and drop it from Redis.
+        With a ``user`` the lines are merged into that user's latest cart.
+        """
+
+        guest = self.get(session_id)
+        if guest is None:
+            return None
+
+        known_products = set(
+            Product.objects.filter(id__in=guest["lines"]).values_list("id", flat=True)
+        )
+        with transaction.atomic():
+            cart = user_cart(user) if user is not None else None
+            if cart is None:
+                cart = Cart.objects.create(
+                    user=user, session_id="" if user is not None else session_id
+                )
+            add_cart_lines(
+                cart,
+                (
+                    (product_id, line["quantity"], line["price_snapshot"])
+                    for product_id, line in guest["lines"].items()
+                    if product_id in known_products
+                ),
+            )
+            cart.save(update_fields=["updated_at"])
+            transaction.on_commit(lambda: self.delete(session_id))
+        return cart
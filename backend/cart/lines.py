@@ -0,0 +1,111 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Cart, CartItem
+
+
+def set_cart_lines(cart, quantities, prices):
+    """
+    Set many line quantities at once. ``quantities`` maps product id to quantity
+    (0 removes the line); ``prices`` maps product id to the current price used as
+    snapshot for new lines. Existing lines keep their snapshot.
+    """
+
+    upserts = [
+        CartItem(
+            cart=cart,
+            product_id=product_id,
+            quantity=quantity,
+            price_snapshot=prices[product_id],
+        )
+        for product_id, quantity in quantities.items()
+        if quantity > 0
+    ]
+    removed = [product_id for product_id, quantity in quantities.items() if quantity <= 0]
+
+    with transaction.atomic():
+        if upserts:
+            CartItem.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=["cart", "product"],
+                update_fields=["quantity"],
+            )
+        if removed:
+            CartItem.objects.filter(cart=cart, product_id__in=removed).delete()
+        Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now())
+
+
+def _quoted_item_table():
+    return connection.ops.quote_name(CartItem._meta.db_table)
+
+
+def add_cart_lines(cart, lines):
+    """
+    Add ``(product_id, quantity, price_snapshot)`` lines to ``cart`` in one
+    upsert, summing quantities with lines the cart already has.
+    """
+
+    lines = list(lines)
+    if not lines:
+        return
+    table = _quoted_item_table()
+    values = ", ".join(["(%s, %s, %s, %s)"] * len(lines))
+    params = []
+    for product_id, quantity, price_snapshot in lines:
+        params.extend([cart.pk, product_id, quantity, price_snapshot])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (cart_id, product_id, quantity, price_snapshot) "
+            f"VALUES {values} "
+            f"ON CONFLICT (cart_id, product_id) "
+            f"DO UPDATE SET quantity = {table}.quantity + excluded.quantity",
+            params,
+        )
+
+
+def merge_carts(source, target):
+    """
+    Fold every line of ``source`` into ``target`` with a single
+    ``INSERT ... SELECT ... ON CONFLICT`` statement, then drop ``source``.
+    """
+
+    table = _quoted_item_table()
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (cart_id, product_id, quantity, price_snapshot) "
+                f"SELECT %s, product_id, quantity, price_snapshot FROM {table} "
+                f"WHERE cart_id = %s "
+                f"ON CONFLICT (cart_id, product_id) "
+                f"DO UPDATE SET quantity = {table}.quantity + excluded.quantity",
+                [target.pk, source.pk],
+            )
+        source.delete()
+        Cart.objects.filter(pk=target.pk).update(updated_at=timezone.now())
+    return target
+
+
+def user_cart(user):
+    return Cart.objects.filter(user=user).order_by("-updated_at").first()
+
+
+def merge_session_cart(session_id, user):
+    """
+    Hand the anonymous database cart(s) of ``session_id`` over to ``user`` at login.
+    """
+
+    sources = list(
+        Cart.objects.filter(session_id=session_id, user__isnull=True).order_by("-updated_at")
+    )
+    if not sources:
+        return None
+    target = user_cart(user)
+    if target is None:
+        target = sources.pop(0)
+        target.user = user
+        target.session_id = ""
+        target.save(update_fields=["user", "session_id", "updated_at"])
+    for source in sources:
+        merge_carts(source, target)
+    return target
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cart',
+            name='session_id',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.10 on 2026-10-19 08:18
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_lines(apps, schema_editor):
+    CartItem = apps.get_model("cart", "CartItem")
+    duplicates = (
+        CartItem.objects.values("cart_id", "product_id")
+        .annotate(lines=Count("id"), keep_id=Min("id"), total=Sum("quantity"))
+        .filter(lines__gt=1)
+    )
+    for row in duplicates:
+        CartItem.objects.filter(pk=row["keep_id"]).update(quantity=row["total"])
+        CartItem.objects.filter(
+            cart_id=row["cart_id"], product_id=row["product_id"]
+        ).exclude(pk=row["keep_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0002_cart_session_id_index'),
+        ('catalog', '0003_alter_banner_image_url_alter_category_image_url_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='cart_item_unique_product'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from catalog.models import Brand, Category, Product
+
+from .guest_store import GuestCartStore
+from .models import Cart, CartItem
+
+try:
+    import fakeredis
+except ImportError:  # pragma: no cover - optional test dependency
+    fakeredis = None
+
+
+User = get_user_model()
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class GuestCartStoreTests(TestCase):
+    def setUp(self):
+        self.store = GuestCartStore(client=fakeredis.FakeRedis(decode_responses=True), ttl=60)
+        brand = Brand.objects.create(name="Acme", slug="acme")
+        category = Category.objects.create(name="Widgets", slug="widgets")
+        self.product = Product.objects.create(
+            name="Widget",
+            slug="widget",
+            brand=brand,
+            category=category,
+            price=Decimal("25.00"),
+            stock_quantity=10,
+        )
+        self.user = User.objects.create_user(
+            username="user",
+            email="user@example.com",
+            password="password",
+        )
+
+    def test_add_accumulates_quantity_and_sets_ttl(self):
+        self.store.add("session-1", self.product, 1)
+        self.store.add("session-1", self.product, 2)
+
+        guest = self.store.get("session-1")
+        self.assertEqual(guest["lines"][self.product.id]["quantity"], 3)
+        self.assertEqual(guest["lines"][self.product.id]["price_snapshot"], Decimal("25.00"))
+        self.assertGreater(self.store.client.ttl(self.store.key("session-1")), 0)
+        self.assertFalse(Cart.objects.exists())
+
+    def test_set_quantity_zero_removes_line(self):
+        self.store.add("session-1", self.product, 2)
+        self.store.set_quantity("session-1", self.product.id, 0)
+
+        self.assertEqual(self.store.get("session-1")["lines"], {})
+
+    def test_materialize_merges_into_user_cart(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(
+            cart=cart, product=self.product, quantity=1, price_snapshot=Decimal("25.00")
+        )
+        self.store.add("session-1", self.product, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.store.materialize("session-1", user=self.user)
+
+        self.assertEqual(result, cart)
+        self.assertEqual(CartItem.objects.get(cart=cart).quantity, 3)
+        self.assertIsNone(self.store.get("session-1"))
@@ -1,6 +1,135 @@
-from django.contrib import admin
+import json
+from decimal import Decimal
 
-from .models import Banner, Brand, Category, Product, ProductMedia
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.models.functions import Round
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import (
+    Banner,
+    Brand,
+    CatalogFeed,
+    Category,
+    Product,
+    ProductFitment,
+    ProductMedia,
+    VehicleGeneration,
+    VehicleMake,
+    VehicleModel,
+)
+from .signals import products_changed
+
+# Below this many planner-estimated rows the changelist still runs an exact COUNT.
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+def estimated_count(queryset):
+    """
+    The planner's row estimate for ``queryset`` on Postgres, ``None`` elsewhere.
+    """
+
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is not None and estimate >= ESTIMATED_COUNT_THRESHOLD:
+            return estimate
+        return super().count
+
+
+class AutocompleteListFilter(admin.RelatedFieldListFilter):
+    """
+    Related-field filter backed by the admin autocomplete view, so the sidebar
+    never loads every brand or category. The target admin needs ``search_fields``.
+    """
+
+    template = "admin/catalog/autocomplete_filter.html"
+
+    def field_choices(self, field, request, model_admin):
+        return []
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        selected = None
+        if self.lookup_val:
+            selected = (
+                self.field.remote_field.model._default_manager.filter(
+                    **{self.field.target_field.name: self.lookup_val[0]}
+                ).first()
+            )
+        yield {
+            "selected": selected,
+            "app_label": self.field.model._meta.app_label,
+            "model_name": self.field.model._meta.model_name,
+            "field_name": self.field.name,
+            "query_param": self.lookup_kwarg,
+            "base_query": changelist.get_query_string(
+                remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]
+            ),
+        }
+
+
+class AutocompleteFilterMixin:
+    """
+    Loads the select2 assets ``AutocompleteListFilter`` needs on the changelist.
+    """
+
+    @property
+    def media(self):
+        extra = "" if settings.DEBUG else ".min"
+        return super().media + forms.Media(
+            js=[
+                f"admin/js/vendor/jquery/jquery{extra}.js",
+                f"admin/js/vendor/select2/select2.full{extra}.js",
+                "admin/js/jquery.init.js",
+                "admin/js/autocomplete.js",
+                "admin/catalog/js/autocomplete_filter.js",
+            ],
+            css={
+                "screen": [
+                    f"admin/css/vendor/select2/select2{extra}.css",
+                    "admin/css/autocomplete.css",
+                ]
+            },
+        )
+
+
+class ProductActionParamsForm(forms.Form):
+    percent = forms.DecimalField(
+        required=False,
+        max_digits=6,
+        decimal_places=2,
+        min_value=Decimal("-99.99"),
+        help_text="Reprice: percentage change, e.g. 10 or -5.",
+    )
+    category_id = forms.IntegerField(
+        required=False, min_value=1, help_text="Move: target category id."
+    )
+
+
+class ProductActionForm(ActionForm, ProductActionParamsForm):
+    pass
 
 
 class ProductMediaInline(admin.TabularInline):
@@ -9,17 +138,77 @@ class ProductMediaInline(admin.TabularInline):
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ("name", "brand", "category", "price", "is_active")
-    list_filter = ("is_active", "brand", "category")
+    list_filter = (
+        "is_active",
+        ("brand", AutocompleteListFilter),
+        ("category", AutocompleteListFilter),
+    )
+    list_select_related = ("brand", "category")
     search_fields = ("name", "slug")
+    autocomplete_fields = ("brand", "category")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    action_form = ProductActionForm
+    actions = ("activate", "deactivate", "reprice", "move_to_category")
     inlines = [ProductMediaInline]
 
+    def _bulk_update(self, request, queryset, message, **values):
+        """
+        Apply ``values`` to the selection with one UPDATE and notify caches once.
+        """
+
+        with transaction.atomic():
+            category_ids = set(queryset.order_by().values_list("category_id", flat=True).distinct())
+            product_ids = list(queryset.values_list("id", flat=True))
+            updated = queryset.update(updated_at=timezone.now(), **values)
+            if "category_id" in values:
+                category_ids.add(values["category_id"])
+            transaction.on_commit(
+                lambda: products_changed.send(
+                    sender=Product, product_ids=product_ids, category_ids=category_ids
+                )
+            )
+        self.message_user(request, message.format(count=updated), messages.SUCCESS)
+
+    @admin.action(description="Activate selected products", permissions=["change"])
+    def activate(self, request, queryset):
+        self._bulk_update(request, queryset, "{count} products activated.", is_active=True)
+
+    @admin.action(description="Deactivate selected products", permissions=["change"])
+    def deactivate(self, request, queryset):
+        self._bulk_update(request, queryset, "{count} products deactivated.", is_active=False)
+
+    @admin.action(description="Reprice selected products by percent", permissions=["change"])
+    def reprice(self, request, queryset):
+        form = ProductActionParamsForm(request.POST)
+        if not form.is_valid() or form.cleaned_data["percent"] is None:
+            self.message_user(request, "Enter a valid percentage to reprice.", messages.ERROR)
+            return
+        factor = 1 + form.cleaned_data["percent"] / 100
+        self._bulk_update(
+            request, queryset, "{count} products repriced.", price=Round(F("price") * factor, 2)
+        )
+
+    @admin.action(description="Move selected products to category", permissions=["change"])
+    def move_to_category(self, request, queryset):
+        form = ProductActionParamsForm(request.POST)
+        category_id = form.cleaned_data["category_id"] if form.is_valid() else None
+        if category_id is None or not Category.objects.filter(id=category_id).exists():
+            self.message_user(request, "Enter an existing category id to move to.", messages.ERROR)
+            return
+        self._bulk_update(
+            request, queryset, "{count} products moved.", category_id=category_id
+        )
+
 
 @admin.register(ProductMedia)
-class ProductMediaAdmin(admin.ModelAdmin):
+class ProductMediaAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ("product", "file_url", "sort_order")
-    list_filter = ("product",)
+    list_filter = (("product", AutocompleteListFilter),)
+    list_select_related = ("product",)
+    autocomplete_fields = ("product",)
     ordering = ("product", "sort_order")
 
 
@@ -27,6 +216,7 @@ class ProductMediaAdmin(admin.ModelAdmin):
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ("name", "slug", "parent", "is_active", "sort_order")
     list_filter = ("is_active",)
+    list_select_related = ("parent",)
     search_fields = ("name", "slug")
     ordering = ("sort_order", "name")
 
@@ -40,3 +230,42 @@ class BannerAdmin(admin.ModelAdmin):
 class BrandAdmin(admin.ModelAdmin):
     list_display = ("name", "slug")
     search_fields = ("name", "slug")
+
+
+@admin.register(CatalogFeed)
+class CatalogFeedAdmin(admin.ModelAdmin):
+    list_display = ("object_key", "format", "is_delta", "product_count", "started_at")
+    list_filter = ("format", "is_delta")
+    ordering = ("-started_at",)
+
+
+@admin.register(VehicleMake)
+class VehicleMakeAdmin(admin.ModelAdmin):
+    list_display = ("name", "slug")
+    search_fields = ("name", "slug")
+
+
+@admin.register(VehicleModel)
+class VehicleModelAdmin(admin.ModelAdmin):
+    list_display = ("name", "make", "slug")
+    list_select_related = ("make",)
+    search_fields = ("name", "make__name")
+    autocomplete_fields = ("make",)
+
+
+@admin.register(VehicleGeneration)
+class VehicleGenerationAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "year_from", "year_to")
+    list_select_related = ("model__make",)
+    search_fields = ("name", "model__name", "model__make__name")
+    autocomplete_fields = ("model",)
+
+
+@admin.register(ProductFitment)
+class ProductFitmentAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
+    list_display = ("product", "generation", "year_from", "year_to")
+    list_filter = (("generation", AutocompleteListFilter),)
+    list_select_related = ("product", "generation__model__make")
+    autocomplete_fields = ("product", "generation")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
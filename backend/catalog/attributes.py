@@ -0,0 +1,130 @@
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Product, ProductAttributeValue
+
+# One UPDATE rebuilds the denormalized JSON for a batch of products.
+_POSTGRES_REFRESH_SQL = """
+UPDATE {product} AS p SET attribute_data = COALESCE(
+    (
+        SELECT jsonb_object_agg(
+            'a' || v.attribute_id::text,
+            CASE
+                WHEN v.value_number IS NOT NULL THEN to_jsonb(v.value_number)
+                WHEN v.value_boolean IS NOT NULL THEN to_jsonb(v.value_boolean)
+                ELSE to_jsonb(v.value_string)
+            END
+        )
+        FROM {value} AS v
+        WHERE v.product_id = p.id
+          AND (v.value_number IS NOT NULL OR v.value_boolean IS NOT NULL OR v.value_string <> '')
+    ),
+    '{{}}'::jsonb
+),
+content_changed_at = %s
+WHERE p.id = ANY(%s)
+"""
+
+
+def attribute_key(attribute_id):
+    # Purely numeric keys would be read as array indexes by JSON key lookups.
+    return f"a{attribute_id}"
+
+
+def attribute_json_value(value):
+    """
+    The JSON form of one ``ProductAttributeValue``, or ``None`` when it is empty.
+    """
+
+    if value.value_number is not None:
+        return float(value.value_number)
+    if value.value_boolean is not None:
+        return value.value_boolean
+    return value.value_string or None
+
+
+def refresh_attribute_data(product_ids):
+    """
+    Rebuild ``Product.attribute_data`` (``{"a<attribute_id>": value}``) from the
+    EAV rows of ``product_ids``. Does not touch ``updated_at``; stamps
+    ``content_changed_at`` so delta feeds pick the change up.
+    """
+
+    product_ids = list(set(product_ids))
+    if not product_ids:
+        return
+    now = timezone.now()
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _POSTGRES_REFRESH_SQL.format(
+                    product=connection.ops.quote_name(Product._meta.db_table),
+                    value=connection.ops.quote_name(ProductAttributeValue._meta.db_table),
+                ),
+                [now, product_ids],
+            )
+        return
+
+    data = {product_id: {} for product_id in product_ids}
+    for value in ProductAttributeValue.objects.filter(product_id__in=product_ids).only(
+        "product_id", "attribute_id", "value_string", "value_number", "value_boolean"
+    ):
+        json_value = attribute_json_value(value)
+        if json_value is not None:
+            data[value.product_id][attribute_key(value.attribute_id)] = json_value
+    Product.objects.bulk_update(
+        [
+            Product(id=product_id, attribute_data=values, content_changed_at=now)
+            for product_id, values in data.items()
+        ],
+        ["attribute_data", "content_changed_at"],
+        batch_size=1000,
+    )
+
+
+def _parse_filter(entry):
+    attribute_id, _, raw_value = entry.partition(":")
+    attribute_id = attribute_id.strip()
+    if not attribute_id.isdigit() or not raw_value.strip():
+        return None, None
+    return attribute_key(attribute_id), raw_value.strip()
+
+
+def attribute_value_q(key, raw_value):
+    value = raw_value
+    if raw_value.lower() in {"true", "false"}:
+        value = raw_value.lower() == "true"
+    else:
+        try:
+            value = float(raw_value)
+        except ValueError:
+            pass
+    if connection.vendor == "postgresql":
+        # Served by the GIN (jsonb_path_ops) index on attribute_data.
+        return Q(attribute_data__contains={key: value})
+    return Q(**{f"attribute_data__{key}": value})
+
+
+def filter_by_attributes(queryset, values=(), minimums=(), maximums=()):
+    """
+    Apply ``attribute=<id>:<value>`` equality and ``attribute_min`` /
+    ``attribute_max=<id>:<number>`` range filters on ``attribute_data``.
+    Malformed entries are ignored.
+    """
+
+    for entry in values:
+        key, raw_value = _parse_filter(entry)
+        if key is not None:
+            queryset = queryset.filter(attribute_value_q(key, raw_value))
+    for entries, lookup in ((minimums, "gte"), (maximums, "lte")):
+        for entry in entries:
+            key, raw_value = _parse_filter(entry)
+            if key is None:
+                continue
+            try:
+                bound = float(raw_value)
+            except ValueError:
+                continue
+            queryset = queryset.filter(**{f"attribute_data__{key}__{lookup}": bound})
+    return queryset
@@ -0,0 +1,167 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Product
+from .signals import products_changed
+
+BULK_EDIT_FIELDS = ("price", "stock_quantity", "is_active")
+BULK_EDIT_MAX_ROWS = 10000
+BULK_EDIT_CHUNK_SIZE = 1000
+
+_PRICE_LIMIT = Decimal("10") ** 10
+
+
+def _parse_price(value):
+    try:
+        price = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None, "A valid number is required."
+    if not price.is_finite() or price < 0 or price >= _PRICE_LIMIT:
+        return None, "Must be a non-negative amount below 10^10."
+    return price.quantize(Decimal("0.01")), None
+
+
+def _parse_stock(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        return None, "A valid integer is required."
+    if value < 0:
+        return None, "Must be zero or greater."
+    return value, None
+
+
+def _parse_flag(value):
+    if not isinstance(value, bool):
+        return None, "Must be a boolean."
+    return value, None
+
+
+_PARSERS = {
+    "price": _parse_price,
+    "stock_quantity": _parse_stock,
+    "is_active": _parse_flag,
+}
+
+
+def validate_bulk_rows(rows):
+    """
+    Validate ``[{id, price?, stock_quantity?, is_active?}, ...]`` in one pass
+    plus a single query for the current values.
+
+    Returns ``(changes, errors)`` where ``changes`` maps product id to the full
+    new ``(price, stock_quantity, is_active)`` tuple for rows that change
+    something, and ``errors`` is a list of ``{"index", "id", "errors"}`` dicts.
+    """
+
+    errors = []
+    if not isinstance(rows, list) or not rows:
+        return {}, [{"index": None, "id": None, "errors": {"rows": "A non-empty list is required."}}]
+    if len(rows) > BULK_EDIT_MAX_ROWS:
+        return {}, [
+            {
+                "index": None,
+                "id": None,
+                "errors": {"rows": f"At most {BULK_EDIT_MAX_ROWS} rows per request."},
+            }
+        ]
+
+    parsed = {}
+    for index, row in enumerate(rows):
+        row_errors = {}
+        product_id = row.get("id") if isinstance(row, dict) else None
+        if isinstance(product_id, bool) or not isinstance(product_id, int):
+            errors.append({"index": index, "id": product_id, "errors": {"id": "A valid id is required."}})
+            continue
+        values = {}
+        for field in BULK_EDIT_FIELDS:
+            if field not in row:
+                continue
+            value, error = _PARSERS[field](row[field])
+            if error:
+                row_errors[field] = error
+            else:
+                values[field] = value
+        unknown = set(row) - {"id", *BULK_EDIT_FIELDS}
+        if unknown:
+            row_errors["non_field_errors"] = f"Unknown fields: {', '.join(sorted(unknown))}."
+        if not values and not row_errors:
+            row_errors["non_field_errors"] = "Nothing to update."
+        if product_id in parsed:
+            row_errors["id"] = "Duplicate id in this batch."
+        if row_errors:
+            errors.append({"index": index, "id": product_id, "errors": row_errors})
+        else:
+            parsed[product_id] = (index, values)
+
+    current = {
+        row[0]: row[1:]
+        for row in Product.objects.filter(id__in=parsed).values_list(
+            "id", *BULK_EDIT_FIELDS
+        )
+    }
+    changes = {}
+    for product_id, (index, values) in parsed.items():
+        if product_id not in current:
+            errors.append({"index": index, "id": product_id, "errors": {"id": "Product not found."}})
+            continue
+        new = tuple(
+            values.get(field, old) for field, old in zip(BULK_EDIT_FIELDS, current[product_id])
+        )
+        if new != current[product_id]:
+            changes[product_id] = new
+    errors.sort(key=lambda error: error["index"])
+    return changes, errors
+
+
+def _update_from_values(chunk, now):
+    table = connection.ops.quote_name(Product._meta.db_table)
+    values = ", ".join(["(%s, %s::numeric, %s::integer, %s::boolean)"] * len(chunk))
+    params = []
+    for product_id, (price, stock_quantity, is_active) in chunk:
+        params.extend([product_id, price, stock_quantity, is_active])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} AS p SET price = v.price, stock_quantity = v.stock_quantity, "
+            f"is_active = v.is_active, updated_at = %s "
+            f"FROM (VALUES {values}) AS v(id, price, stock_quantity, is_active) "
+            f"WHERE p.id = v.id",
+            [now, *params],
+        )
+
+
+def _bulk_update(chunk, now):
+    Product.objects.bulk_update(
+        [
+            Product(
+                id=product_id,
+                price=price,
+                stock_quantity=stock_quantity,
+                is_active=is_active,
+                updated_at=now,
+            )
+            for product_id, (price, stock_quantity, is_active) in chunk
+        ],
+        [*BULK_EDIT_FIELDS, "updated_at"],
+    )
+
+
+def apply_bulk_changes(changes, chunk_size=BULK_EDIT_CHUNK_SIZE):
+    """
+    Write validated changes in chunks without per-object saves or signals, then
+    send one ``products_changed`` notification for the whole batch.
+    """
+
+    if not changes:
+        return 0
+    items = sorted(changes.items())
+    now = timezone.now()
+    writer = _update_from_values if connection.vendor == "postgresql" else _bulk_update
+    with transaction.atomic():
+        for start in range(0, len(items), chunk_size):
+            writer(items[start:start + chunk_size], now)
+        product_ids = [product_id for product_id, _ in items]
+        transaction.on_commit(
+            lambda: products_changed.send(sender=Product, product_ids=product_ids)
+        )
+    return len(items)
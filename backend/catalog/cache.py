@@ -0,0 +1,41 @@
+from django.core.cache import cache
+
+VERSION_KEY = "catalog:version:category:{}"
+
+
+def category_version(category_id) -> int:
+    """
+    Current cache version of a category's listing data; part of every cache key
+    derived from it so a bump invalidates them all at once.
+    """
+
+    key = VERSION_KEY.format(category_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def category_versions(category_ids) -> dict:
+    """
+    ``category_version`` for many categories with one cache round trip.
+    """
+
+    keys = {VERSION_KEY.format(category_id): category_id for category_id in set(category_ids)}
+    found = cache.get_many(list(keys))
+    versions = {category_id: found.get(key) for key, category_id in keys.items()}
+    for category_id, version in versions.items():
+        if version is None:
+            versions[category_id] = category_version(category_id)
+    return versions
+
+
+def bump_category_versions(category_ids) -> None:
+    for category_id in set(category_ids):
+        key = VERSION_KEY.format(category_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 2, timeout=None)
+
@@ -0,0 +1,129 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import F, FloatField
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast
+
+from .attributes import attribute_key
+from .cache import category_versions
+
+HISTOGRAM_MODES = ("equal", "quantile")
+DEFAULT_BUCKETS = 10
+MAX_BUCKETS = 50
+PRICE_FACET = "price"
+
+
+def _bucket_sql(vendor, buckets):
+    if vendor == "postgresql":
+        return f"LEAST(width_bucket(v, lo, hi, {buckets}), {buckets}) - 1"
+    # v >= lo, so the cast truncates towards zero like floor().
+    return f"MIN(CAST((v - lo) * {buckets} / (hi - lo) AS INTEGER), {buckets - 1})"
+
+
+def _facet_sql(mode, vendor, buckets):
+    if mode == "quantile":
+        return (
+            "SELECT %s AS facet, tile - 1 AS bucket, MIN(v), MAX(v), COUNT(*), NULL, NULL FROM ("
+            f"SELECT v, NTILE({buckets}) OVER (ORDER BY v) AS tile FROM ({{inner}}) AS s"
+            ") AS t GROUP BY tile"
+        )
+    return (
+        "SELECT %s AS facet, bucket, MIN(v), MAX(v), COUNT(*), lo, hi FROM ("
+        f"SELECT v, lo, hi, CASE WHEN hi = lo THEN 0 ELSE {_bucket_sql(vendor, buckets)} END AS bucket "
+        "FROM (SELECT v, MIN(v) OVER () AS lo, MAX(v) OVER () AS hi FROM ({inner}) AS s) AS w"
+        ") AS b GROUP BY bucket, lo, hi"
+    )
+
+
+def numeric_histograms(products, attribute_ids=(), mode="equal", buckets=DEFAULT_BUCKETS):
+    """
+    Histograms for price and each numeric attribute over ``products`` in one
+    ``UNION ALL`` statement. ``equal`` splits [min, max] into equal-width
+    buckets; ``quantile`` makes buckets with (nearly) equal counts.
+
+    Returns ``{facet: {"min", "max", "buckets": [{"from", "to", "count"}]}}``
+    keyed by ``"price"`` and attribute id; facets without values are omitted.
+    """
+
+    facets = [(PRICE_FACET, Cast(F("price"), FloatField()))]
+    for attribute_id in attribute_ids:
+        facets.append(
+            (
+                str(attribute_id),
+                Cast(KeyTextTransform(attribute_key(attribute_id), "attribute_data"), FloatField()),
+            )
+        )
+
+    connection = connections[products.db]
+    template = _facet_sql(mode, connection.vendor, buckets)
+    parts, params = [], []
+    for name, expression in facets:
+        inner = (
+            products.order_by()
+            .annotate(v=expression)
+            .filter(v__isnull=False)
+            .values_list("v")
+        )
+        inner_sql, inner_params = inner.query.sql_with_params()
+        parts.append(template.format(inner=inner_sql))
+        params.extend([name, *inner_params])
+
+    rows_by_facet = {}
+    with connection.cursor() as cursor:
+        cursor.execute(" UNION ALL ".join(parts), params)
+        for facet, bucket, low, high, count, lo, hi in cursor.fetchall():
+            rows_by_facet.setdefault(facet, []).append((int(bucket), low, high, count, lo, hi))
+
+    histograms = {}
+    for name, _ in facets:
+        rows = sorted(rows_by_facet.get(name, []))
+        if not rows:
+            continue
+        if mode == "quantile":
+            histogram_buckets = [
+                {"from": float(low), "to": float(high), "count": count}
+                for _, low, high, count, _, _ in rows
+            ]
+            lo, hi = rows[0][1], rows[-1][2]
+        else:
+            lo, hi = float(rows[0][4]), float(rows[0][5])
+            counts = {bucket: count for bucket, _, _, count, _, _ in rows}
+            size = buckets if hi > lo else 1
+            width = (hi - lo) / size
+            histogram_buckets = [
+                {
+                    "from": lo + index * width,
+                    "to": hi if index == size - 1 else lo + (index + 1) * width,
+                    "count": counts.get(index, 0),
+                }
+                for index in range(size)
+            ]
+        key = name if name == PRICE_FACET else int(name)
+        histograms[key] = {"min": float(lo), "max": float(hi), "buckets": histogram_buckets}
+    return histograms
+
+
+def cached_category_histograms(
+    category_ids, products, attribute_ids=(), mode="equal", buckets=DEFAULT_BUCKETS
+):
+    """
+    ``numeric_histograms`` cached under the versions of every category in
+    ``category_ids``. Product and attribute value saves and deletes bump them
+    on commit, as do bulk writers through ``products_changed``, so a change
+    to any product in the subtree invalidates it.
+    """
+
+    versions = category_versions(category_ids)
+    fingerprint = hashlib.sha1(
+        ",".join(f"{category_id}:{versions[category_id]}" for category_id in sorted(versions)).encode()
+        + f"|{sorted(attribute_ids)}".encode()
+    ).hexdigest()
+    key = f"catalog:histograms:{min(category_ids)}:{mode}:{buckets}:{fingerprint}"
+    histograms = cache.get(key)
+    if histograms is None:
+        histograms = numeric_histograms(products, attribute_ids, mode, buckets)
+        cache.set(key, histograms, settings.FACET_CACHE_TIMEOUT)
+    return histograms
@@ -0,0 +1,248 @@
+import csv
+import gzip
+import io
+import tempfile
+from datetime import timedelta
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+
+from storage import minio_client
+
+from .models import CatalogFeed, Category, DeletedProduct, Product, ProductMedia
+
+FEED_CHUNK_SIZE = 2000
+# A delta chain with a longer gap than this misses deletions; run a full feed.
+DELETED_PRODUCT_RETENTION = timedelta(days=30)
+
+CSV_COLUMNS = [
+    "id",
+    "slug",
+    "name",
+    "url",
+    "price",
+    "currency",
+    "available",
+    "stock_available",
+    "brand",
+    "category_id",
+    "category",
+    "image_url",
+    "description",
+    "attributes",
+]
+
+
+def feed_products(since=None, chunk_size=FEED_CHUNK_SIZE):
+    """
+    Stream products for a feed with a server-side cursor; media and attributes
+    are prefetched per chunk of ``chunk_size`` rows rather than per product.
+    A delta feed (``since``) selects products whose row, attributes or media
+    changed, deactivated ones included (as unavailable offers).
+    """
+
+    queryset = Product.objects.select_related("brand", "category")
+    if since is None:
+        queryset = queryset.filter(is_active=True)
+    else:
+        queryset = queryset.filter(Q(updated_at__gte=since) | Q(content_changed_at__gte=since))
+    return (
+        queryset.prefetch_related(
+            Prefetch("media", queryset=ProductMedia.objects.order_by("sort_order", "id")),
+            "attributes__attribute",
+        )
+        .order_by("id")
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def deleted_products(since):
+    """
+    Products deleted since ``since`` (none for a full feed).
+    """
+
+    if since is None:
+        return DeletedProduct.objects.none()
+    return DeletedProduct.objects.filter(deleted_at__gte=since).order_by("product_id")
+
+
+def product_url(slug, product_id):
+    return settings.FEED_PRODUCT_URL_TEMPLATE.format(slug=slug, id=product_id)
+
+
+def primary_image_url(product):
+    media = product.media.all()
+    if media and media[0].file_url:
+        return media[0].file_url.url
+    return ""
+
+
+def attribute_pairs(product):
+    pairs = []
+    for value in product.attributes.all():
+        attribute = value.attribute
+        if value.value_number is not None:
+            raw = format(value.value_number.normalize(), "f")
+        elif value.value_boolean is not None:
+            raw = "true" if value.value_boolean else "false"
+        else:
+            raw = value.value_string
+        if raw != "":
+            pairs.append((attribute.name, attribute.unit, raw))
+    return pairs
+
+
+def is_available(product):
+    return product.is_active and product.stock_available > 0
+
+
+def write_csv(stream, products, removed=()):
+    writer = csv.writer(stream)
+    writer.writerow(CSV_COLUMNS)
+    count = 0
+    for product in products:
+        writer.writerow(
+            [
+                product.id,
+                product.slug,
+                product.name,
+                product_url(product.slug, product.id),
+                product.price,
+                settings.FEED_CURRENCY,
+                "true" if is_available(product) else "false",
+                product.stock_available,
+                product.brand.name,
+                product.category_id,
+                product.category.name,
+                primary_image_url(product),
+                product.description,
+                "; ".join(
+                    f"{name}={value}{f' {unit}' if unit else ''}"
+                    for name, unit, value in attribute_pairs(product)
+                ),
+            ]
+        )
+        count += 1
+    for deleted in removed:
+        writer.writerow(
+            [
+                deleted.product_id,
+                deleted.slug,
+                deleted.name,
+                product_url(deleted.slug, deleted.product_id),
+                deleted.price,
+                settings.FEED_CURRENCY,
+                "false",
+                0,
+                deleted.brand_name,
+                deleted.category_id,
+                "",
+                "",
+                "",
+                "",
+            ]
+        )
+        count += 1
+    return count
+
+
+def write_yml(stream, products, generated_at, removed=()):
+    """
+    Write a Yandex Market Language (YML) catalog; ``removed`` (deleted
+    products) are written as unavailable offers.
+    """
+
+    stream.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    stream.write(f"<yml_catalog date={quoteattr(generated_at.strftime('%Y-%m-%dT%H:%M%z'))}>\n<shop>\n")
+    stream.write(f"<name>{escape(settings.FEED_SHOP_NAME)}</name>\n")
+    stream.write(f"<company>{escape(settings.FEED_SHOP_COMPANY)}</company>\n")
+    stream.write(f"<url>{escape(settings.FEED_SHOP_URL)}</url>\n")
+    stream.write(f'<currencies><currency id={quoteattr(settings.FEED_CURRENCY)} rate="1"/></currencies>\n')
+    stream.write("<categories>\n")
+    for category_id, parent_id, name in (
+        Category.objects.filter(is_active=True).order_by("id").values_list("id", "parent_id", "name")
+    ):
+        parent = f" parentId={quoteattr(str(parent_id))}" if parent_id else ""
+        stream.write(f"<category id={quoteattr(str(category_id))}{parent}>{escape(name)}</category>\n")
+    stream.write("</categories>\n<offers>\n")
+
+    count = 0
+    for product in products:
+        available = "true" if is_available(product) else "false"
+        stream.write(f"<offer id={quoteattr(str(product.id))} available={quoteattr(available)}>")
+        stream.write(f"<url>{escape(product_url(product.slug, product.id))}</url>")
+        stream.write(f"<price>{product.price}</price>")
+        stream.write(f"<currencyId>{escape(settings.FEED_CURRENCY)}</currencyId>")
+        stream.write(f"<categoryId>{product.category_id}</categoryId>")
+        image_url = primary_image_url(product)
+        if image_url:
+            stream.write(f"<picture>{escape(image_url)}</picture>")
+        stream.write(f"<name>{escape(product.name)}</name>")
+        stream.write(f"<vendor>{escape(product.brand.name)}</vendor>")
+        if product.description:
+            stream.write(f"<description>{escape(product.description)}</description>")
+        for name, unit, value in attribute_pairs(product):
+            unit_attr = f" unit={quoteattr(unit)}" if unit else ""
+            stream.write(f"<param name={quoteattr(name)}{unit_attr}>{escape(value)}</param>")
+        stream.write("</offer>\n")
+        count += 1
+    for deleted in removed:
+        stream.write(f"<offer id={quoteattr(str(deleted.product_id))} available=\"false\">")
+        stream.write(f"<url>{escape(product_url(deleted.slug, deleted.product_id))}</url>")
+        stream.write(f"<price>{deleted.price}</price>")
+        stream.write(f"<currencyId>{escape(settings.FEED_CURRENCY)}</currencyId>")
+        stream.write(f"<categoryId>{deleted.category_id}</categoryId>")
+        stream.write(f"<name>{escape(deleted.name)}</name>")
+        stream.write(f"<vendor>{escape(deleted.brand_name)}</vendor>")
+        stream.write("</offer>\n")
+        count += 1
+    stream.write("</offers>\n</shop>\n</yml_catalog>\n")
+    return count
+
+
+def feed_object_key(fmt, is_delta, generated_at):
+    if is_delta:
+        return f"feeds/delta/catalog-{generated_at:%Y%m%dT%H%M%S}.{fmt}.gz"
+    return f"feeds/catalog.{fmt}.gz"
+
+
+def generate_feed(fmt=CatalogFeed.Format.YML, delta=False):
+    """
+    Render the feed into a gzip-compressed temporary file and upload it to MinIO
+    (multipart for large files). A delta feed only re-emits products changed
+    or deleted since the previous feed of the same format.
+    """
+
+    started_at = timezone.now()
+    since = None
+    if delta:
+        previous = CatalogFeed.objects.filter(format=fmt).order_by("-started_at").first()
+        since = previous.started_at if previous else None
+    is_delta = since is not None
+
+    products = feed_products(since=since)
+    removed = deleted_products(since).iterator()
+    with tempfile.TemporaryFile() as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as compressed:
+            stream = io.TextIOWrapper(compressed, encoding="utf-8", newline="")
+            if fmt == CatalogFeed.Format.CSV:
+                count = write_csv(stream, products, removed)
+            else:
+                count = write_yml(stream, products, started_at, removed)
+            stream.flush()
+            stream.detach()
+        raw.seek(0)
+        key = feed_object_key(fmt, is_delta, started_at)
+        minio_client.upload_fileobj(raw, key, content_type="application/gzip")
+
+    DeletedProduct.objects.filter(deleted_at__lt=started_at - DELETED_PRODUCT_RETENTION).delete()
+    return CatalogFeed.objects.create(
+        format=fmt,
+        is_delta=is_delta,
+        since=since,
+        started_at=started_at,
+        object_key=key,
+        product_count=count,
+    )
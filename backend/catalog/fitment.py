@@ -0,0 +1,233 @@
+import csv
+import json
+
+from django.db import transaction
+from django.db.models import Case, Exists, OuterRef, PositiveSmallIntegerField, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils.text import slugify
+
+from .importer import IMPORT_CHUNK_SIZE, RowError, chunked
+from .models import Product, ProductFitment, VehicleGeneration, VehicleMake, VehicleModel
+from .signals import products_changed
+
+
+def _normalize(record):
+    return {
+        "product_slug": (record.get("product_slug") or record.get("slug") or "").strip(),
+        "make": (record.get("make") or "").strip(),
+        "model": (record.get("model") or "").strip(),
+        "generation": (record.get("generation") or "").strip(),
+        "year_from": record.get("year_from"),
+        "year_to": record.get("year_to"),
+    }
+
+
+def read_fitment_rows(stream, fmt):
+    """
+    Lazily yield supplier compatibility rows: ``product_slug, make, model,
+    generation, year_from, year_to`` from ``csv`` or ``jsonl``.
+    """
+
+    if fmt == "csv":
+        for record in csv.DictReader(stream):
+            yield _normalize(record)
+    elif fmt == "jsonl":
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield _normalize(json.loads(line))
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _as_year(value):
+    try:
+        year = int(str(value).strip())
+    except (TypeError, ValueError):
+        raise RowError(f"Not a year: {value!r}")
+    if not 1900 <= year <= 2100:
+        raise RowError(f"Not a year: {value!r}")
+    return year
+
+
+class FitmentLoader:
+    """
+    Chunked loader for vehicle compatibility data. Makes, models and
+    generations are created on first sight and cached by natural key; each
+    chunk costs a fixed number of queries.
+    """
+
+    def __init__(self):
+        self.make_ids = {}
+        self.model_ids = {}
+        self.generation_ids = {}
+        self.stats = {"rows": 0, "fitments": 0, "errors": []}
+
+    def _parse(self, rows, first_row_number):
+        parsed = []
+        for offset, row in enumerate(rows):
+            try:
+                if not row["product_slug"] or not row["make"] or not row["model"]:
+                    raise RowError("product_slug, make and model are required")
+                year_from = _as_year(row["year_from"])
+                year_to = _as_year(row["year_to"]) if row["year_to"] not in (None, "") else year_from
+                if year_from > year_to:
+                    raise RowError("year_from is after year_to")
+                make_slug = slugify(row["make"])
+                model_slug = slugify(row["model"])
+                if not make_slug or not model_slug:
+                    raise RowError("make and model need a latin name")
+            except RowError as exc:
+                self.stats["errors"].append({"row": first_row_number + offset, "error": str(exc)})
+                continue
+            parsed.append(
+                (first_row_number + offset, row, make_slug, model_slug, year_from, year_to)
+            )
+        return parsed
+
+    def ensure_vehicles(self, parsed):
+        makes = {make_slug: row["make"] for _, row, make_slug, *_ in parsed}
+        missing = [slug for slug in makes if slug not in self.make_ids]
+        if missing:
+            VehicleMake.objects.bulk_create(
+                [VehicleMake(slug=slug, name=makes[slug]) for slug in missing], ignore_conflicts=True
+            )
+            self.make_ids.update(
+                VehicleMake.objects.filter(slug__in=missing).values_list("slug", "id")
+            )
+
+        vehicle_models = {}
+        for _, row, make_slug, model_slug, *_ in parsed:
+            vehicle_models[(self.make_ids[make_slug], model_slug)] = row["model"]
+        missing = [key for key in vehicle_models if key not in self.model_ids]
+        if missing:
+            VehicleModel.objects.bulk_create(
+                [
+                    VehicleModel(make_id=make_id, slug=slug, name=vehicle_models[(make_id, slug)])
+                    for make_id, slug in missing
+                ],
+                ignore_conflicts=True,
+            )
+            for make_id, slug, model_id in VehicleModel.objects.filter(
+                make_id__in={make_id for make_id, _ in missing},
+                slug__in={slug for _, slug in missing},
+            ).values_list("make_id", "slug", "id"):
+                self.model_ids[(make_id, slug)] = model_id
+
+        generations = {}
+        for _, row, make_slug, model_slug, year_from, year_to in parsed:
+            key = (self.model_ids[(self.make_ids[make_slug], model_slug)], row["generation"])
+            low, high = generations.get(key, (year_from, year_to))
+            generations[key] = (min(low, year_from), max(high, year_to))
+        missing = [key for key in generations if key not in self.generation_ids]
+        if missing:
+            VehicleGeneration.objects.bulk_create(
+                [
+                    VehicleGeneration(
+                        model_id=model_id,
+                        name=name,
+                        year_from=generations[(model_id, name)][0],
+                        year_to=generations[(model_id, name)][1],
+                    )
+                    for model_id, name in missing
+                ],
+                ignore_conflicts=True,
+            )
+            for model_id, name, generation_id in VehicleGeneration.objects.filter(
+                model_id__in={model_id for model_id, _ in missing},
+                name__in={name for _, name in missing},
+            ).values_list("model_id", "name", "id"):
+                self.generation_ids[(model_id, name)] = generation_id
+
+        # Generations created by earlier chunks or imports only cover the years
+        # seen then; widen them to this chunk's rows (a no-op for new ones).
+        ranges = {self.generation_ids[key]: years for key, years in generations.items()}
+
+        def year(index):
+            return Case(
+                *[When(id=generation_id, then=Value(years[index])) for generation_id, years in ranges.items()],
+                output_field=PositiveSmallIntegerField(),
+            )
+
+        VehicleGeneration.objects.filter(id__in=ranges).update(
+            year_from=Least(Coalesce("year_from", year(0)), year(0)),
+            year_to=Greatest(Coalesce("year_to", year(1)), year(1)),
+        )
+
+    def load_chunk(self, rows, first_row_number=1):
+        self.stats["rows"] += len(rows)
+        parsed = self._parse(rows, first_row_number)
+        if not parsed:
+            return
+        product_ids = dict(
+            Product.objects.filter(
+                slug__in={row["product_slug"] for _, row, *_ in parsed}
+            ).values_list("slug", "id")
+        )
+
+        with transaction.atomic():
+            self.ensure_vehicles(parsed)
+            fitments = []
+            for row_number, row, make_slug, model_slug, year_from, year_to in parsed:
+                product_id = product_ids.get(row["product_slug"])
+                if product_id is None:
+                    self.stats["errors"].append(
+                        {"row": row_number, "error": f"Unknown product {row['product_slug']!r}"}
+                    )
+                    continue
+                model_id = self.model_ids[(self.make_ids[make_slug], model_slug)]
+                fitments.append(
+                    ProductFitment(
+                        product_id=product_id,
+                        generation_id=self.generation_ids[(model_id, row["generation"])],
+                        year_from=year_from,
+                        year_to=year_to,
+                    )
+                )
+            ProductFitment.objects.bulk_create(fitments, ignore_conflicts=True)
+            ids = list({fitment.product_id for fitment in fitments})
+            transaction.on_commit(
+                lambda: products_changed.send(sender=Product, product_ids=ids)
+            )
+        self.stats["fitments"] += len(fitments)
+
+
+def load_fitment(stream, fmt, chunk_size=IMPORT_CHUNK_SIZE):
+    loader = FitmentLoader()
+    row_number = 1
+    for rows in chunked(read_fitment_rows(stream, fmt), chunk_size):
+        loader.load_chunk(rows, row_number)
+        row_number += len(rows)
+    return loader.stats
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def filter_by_vehicle(queryset, query_params):
+    """
+    Keep products that fit ``vehicle_generation`` (or any generation of
+    ``vehicle_model``), optionally in ``vehicle_year``. Each product is probed
+    with an EXISTS on the fitment interval index.
+    """
+
+    generation_id = _as_int(query_params.get("vehicle_generation"))
+    model_id = _as_int(query_params.get("vehicle_model"))
+    year = _as_int(query_params.get("vehicle_year"))
+
+    fitments = ProductFitment.objects.filter(product=OuterRef("pk"))
+    if generation_id is not None:
+        fitments = fitments.filter(generation_id=generation_id)
+    elif model_id is not None:
+        fitments = fitments.filter(
+            generation_id__in=VehicleGeneration.objects.filter(model_id=model_id).values("id")
+        )
+    else:
+        return queryset
+    if year is not None:
+        fitments = fitments.filter(year_from__lte=year, year_to__gte=year)
+    return queryset.filter(Exists(fitments))
@@ -0,0 +1,362 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.utils.text import slugify
+
+from .attributes import refresh_attribute_data
+from .models import Brand, Category, CategoryAttribute, Product, ProductAttributeValue
+from .signals import reference_data_changed, products_changed
+
+IMPORT_CHUNK_SIZE = 1000
+ATTRIBUTE_COLUMN_PREFIX = "attr:"
+TRUE_VALUES = {"1", "true", "yes"}
+FALSE_VALUES = {"0", "false", "no"}
+
+PRODUCT_UPDATE_FIELDS = [
+    "name",
+    "description",
+    "brand",
+    "category",
+    "price",
+    "stock_quantity",
+    "is_active",
+    "updated_at",
+]
+
+
+class RowError(ValueError):
+    pass
+
+
+def _normalize(record):
+    """
+    Map a CSV or JSONL record onto one flat shape. Attributes come either from an
+    ``attributes`` object (JSONL) or from ``attr:<name>`` columns (CSV).
+    """
+
+    attributes = dict(record.get("attributes") or {})
+    for key, value in record.items():
+        # Fields beyond the CSV header end up under ``None``.
+        if isinstance(key, str) and key.startswith(ATTRIBUTE_COLUMN_PREFIX) and value not in (None, ""):
+            attributes[key[len(ATTRIBUTE_COLUMN_PREFIX):]] = value
+    return {
+        "slug": (record.get("slug") or "").strip(),
+        "name": (record.get("name") or "").strip(),
+        "description": record.get("description") or "",
+        "price": record.get("price"),
+        "stock_quantity": record.get("stock_quantity") or 0,
+        "is_active": True if record.get("is_active") in (None, "") else record["is_active"],
+        "brand_slug": (record.get("brand_slug") or slugify(record.get("brand_name") or "")).strip(),
+        "brand_name": (record.get("brand_name") or record.get("brand_slug") or "").strip(),
+        "category_slug": (
+            record.get("category_slug") or slugify(record.get("category_name") or "")
+        ).strip(),
+        "category_name": (record.get("category_name") or record.get("category_slug") or "").strip(),
+        "category_parent": (record.get("category_parent") or "").strip(),
+        "attributes": attributes,
+    }
+
+
+def _invalid(message):
+    row = _normalize({})
+    row["error"] = message
+    return row
+
+
+def read_rows(stream, fmt):
+    """
+    Lazily yield normalized rows from a text stream in ``csv`` or ``jsonl`` format.
+    Records that cannot be read yield a row carrying only an ``error``, which
+    the importer reports like any other bad row.
+    """
+
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            if None in record:
+                yield _invalid(f"Line {reader.line_num}: more fields than the header")
+            else:
+                yield _normalize(record)
+    elif fmt == "jsonl":
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield _invalid(f"Line {line_number}: invalid JSON ({exc.msg})")
+                continue
+            if not isinstance(record, dict):
+                yield _invalid(f"Line {line_number}: expected a JSON object")
+                continue
+            try:
+                row = _normalize(record)
+            except (AttributeError, TypeError, ValueError):
+                row = _invalid(f"Line {line_number}: malformed record")
+            yield row
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def detect_format(path):
+    return "jsonl" if str(path).endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def open_source(path):
+    return open(path, encoding="utf-8", newline="")
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _as_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise RowError(f"Not a boolean: {value!r}")
+
+
+def _as_decimal(value):
+    try:
+        number = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        raise RowError(f"Not a number: {value!r}")
+    if not number.is_finite():
+        raise RowError(f"Not a number: {value!r}")
+    return number
+
+
+def _infer_data_type(value):
+    if isinstance(value, bool):
+        return CategoryAttribute.DataType.BOOLEAN
+    if isinstance(value, (int, float)):
+        return CategoryAttribute.DataType.NUMBER
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES - {"1"} or text in FALSE_VALUES - {"0"}:
+        return CategoryAttribute.DataType.BOOLEAN
+    try:
+        _as_decimal(text)
+    except RowError:
+        return CategoryAttribute.DataType.STRING
+    return CategoryAttribute.DataType.NUMBER
+
+
+class CatalogImporter:
+    """
+    Chunked upsert of brands, categories, category attributes, products and
+    attribute values. Slug-to-id maps are kept in memory so rows never trigger
+    per-row lookups; each chunk costs a fixed number of queries.
+    """
+
+    def __init__(self):
+        self.brand_ids = {}
+        self.category_ids = {}
+        self.attribute_ids = {}
+        self.loaded_attribute_categories = set()
+        self.stats = {"rows": 0, "products": 0, "attribute_values": 0, "errors": []}
+
+    def _load_ids(self, model, slugs, target):
+        missing = [slug for slug in slugs if slug not in target]
+        if missing:
+            target.update(model.objects.filter(slug__in=missing).values_list("slug", "id"))
+
+    def ensure_brands(self, rows):
+        names = {row["brand_slug"]: row["brand_name"] for row in rows if row["brand_slug"]}
+        self._load_ids(Brand, names, self.brand_ids)
+        new = [Brand(slug=slug, name=name) for slug, name in names.items() if slug not in self.brand_ids]
+        if new:
+            Brand.objects.bulk_create(new, ignore_conflicts=True)
+            self._load_ids(Brand, names, self.brand_ids)
+            reference_data_changed.send(sender=Brand)
+
+    def ensure_categories(self, rows):
+        categories = {}
+        for row in rows:
+            if row["category_slug"]:
+                categories[row["category_slug"]] = (row["category_name"], row["category_parent"])
+            if row["category_parent"]:
+                categories.setdefault(row["category_parent"], (row["category_parent"], ""))
+        self._load_ids(Category, categories, self.category_ids)
+        new = [
+            Category(slug=slug, name=name)
+            for slug, (name, _) in categories.items()
+            if slug not in self.category_ids
+        ]
+        if not new:
+            return
+        Category.objects.bulk_create(new, ignore_conflicts=True)
+        self._load_ids(Category, categories, self.category_ids)
+        created = {category.slug for category in new}
+        parents = [
+            Category(id=self.category_ids[slug], parent_id=self.category_ids[parent])
+            for slug, (_, parent) in categories.items()
+            if slug in created and parent in self.category_ids
+        ]
+        Category.objects.bulk_update(parents, ["parent"])
+        reference_data_changed.send(sender=Category)
+
+    def _load_attributes(self, category_ids):
+        for attribute in CategoryAttribute.objects.filter(category_id__in=category_ids).order_by("id"):
+            self.attribute_ids.setdefault(
+                (attribute.category_id, attribute.name), (attribute.id, attribute.data_type)
+            )
+
+    def ensure_attributes(self, rows):
+        category_ids = {
+            self.category_ids[row["category_slug"]]
+            for row in rows
+            if row["category_slug"] in self.category_ids
+        }
+        to_load = category_ids - self.loaded_attribute_categories
+        if to_load:
+            self._load_attributes(to_load)
+            self.loaded_attribute_categories |= to_load
+
+        new = {}
+        for row in rows:
+            category_id = self.category_ids.get(row["category_slug"])
+            if category_id is None:
+                continue
+            for name, value in row["attributes"].items():
+                key = (category_id, name)
+                if key in self.attribute_ids or key in new:
+                    continue
+                data_type = _infer_data_type(value)
+                new[key] = CategoryAttribute(
+                    category_id=category_id,
+                    name=name,
+                    data_type=data_type,
+                    filter_type=(
+                        CategoryAttribute.FilterType.RANGE
+                        if data_type == CategoryAttribute.DataType.NUMBER
+                        else CategoryAttribute.FilterType.CHECKBOX
+                    ),
+                )
+        if new:
+            CategoryAttribute.objects.bulk_create(list(new.values()))
+            reference_data_changed.send(sender=CategoryAttribute)
+            self._load_attributes({category_id for category_id, _ in new})
+
+    def ensure_dimensions(self, rows):
+        with transaction.atomic():
+            self.ensure_brands(rows)
+            self.ensure_categories(rows)
+            self.ensure_attributes(rows)
+
+    def _build_product(self, row):
+        if row.get("error"):
+            raise RowError(row["error"])
+        if not row["slug"] or not row["name"]:
+            raise RowError("slug and name are required")
+        brand_id = self.brand_ids.get(row["brand_slug"])
+        category_id = self.category_ids.get(row["category_slug"])
+        if brand_id is None or category_id is None:
+            raise RowError("brand and category are required")
+        if row["price"] in (None, ""):
+            raise RowError("price is required")
+        try:
+            stock_quantity = int(row["stock_quantity"])
+        except (TypeError, ValueError):
+            raise RowError(f"Not an integer: {row['stock_quantity']!r}")
+        return Product(
+            slug=row["slug"],
+            name=row["name"],
+            description=row["description"],
+            brand_id=brand_id,
+            category_id=category_id,
+            price=_as_decimal(row["price"]),
+            stock_quantity=stock_quantity,
+            is_active=_as_bool(row["is_active"]),
+        )
+
+    def _build_values(self, row, category_id):
+        values = []
+        for name, raw in row["attributes"].items():
+            attribute_id, data_type = self.attribute_ids[(category_id, name)]
+            value = ProductAttributeValue(attribute_id=attribute_id)
+            if data_type == CategoryAttribute.DataType.NUMBER:
+                value.value_number = _as_decimal(raw)
+            elif data_type == CategoryAttribute.DataType.BOOLEAN:
+                value.value_boolean = _as_bool(raw)
+            else:
+                value.value_string = str(raw)[:255]
+            values.append(value)
+        return values
+
+    def upsert_products(self, rows, first_row_number=1):
+        products, values_by_slug = {}, {}
+        for offset, row in enumerate(rows):
+            try:
+                product = self._build_product(row)
+                values_by_slug[product.slug] = self._build_values(row, product.category_id)
+            except RowError as exc:
+                self.stats["errors"].append({"row": first_row_number + offset, "error": str(exc)})
+                continue
+            products[product.slug] = product
+
+        self.stats["rows"] += len(rows)
+        if not products:
+            return
+
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                list(products.values()),
+                update_conflicts=True,
+                unique_fields=["slug"],
+                update_fields=PRODUCT_UPDATE_FIELDS,
+            )
+            product_ids = dict(
+                Product.objects.filter(slug__in=products).values_list("slug", "id")
+            )
+            attribute_values = []
+            for slug, values in values_by_slug.items():
+                for value in values:
+                    value.product_id = product_ids[slug]
+                    attribute_values.append(value)
+            ProductAttributeValue.objects.bulk_create(
+                attribute_values,
+                update_conflicts=True,
+                unique_fields=["product", "attribute"],
+                update_fields=["value_string", "value_number", "value_boolean"],
+            )
+            ids = list(product_ids.values())
+            refresh_attribute_data(ids)
+            transaction.on_commit(
+                lambda: products_changed.send(sender=Product, product_ids=ids)
+            )
+        self.stats["products"] += len(products)
+        self.stats["attribute_values"] += len(attribute_values)
+
+    def import_chunk(self, rows, first_row_number=1):
+        self.ensure_dimensions(rows)
+        self.upsert_products(rows, first_row_number)
+
+
+def import_catalog(stream, fmt, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """
+    Stream ``stream`` and import it chunk by chunk in this process.
+    ``progress`` is called with the running stats after each chunk.
+    """
+
+    importer = CatalogImporter()
+    row_number = 1
+    for rows in chunked(read_rows(stream, fmt), chunk_size):
+        importer.import_chunk(rows, row_number)
+        row_number += len(rows)
+        if progress:
+            progress(importer.stats)
+    return importer.stats
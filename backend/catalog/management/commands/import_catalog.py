@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.importer import IMPORT_CHUNK_SIZE, detect_format, import_catalog, open_source
+from catalog.tasks import dispatch_catalog_import
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV/JSONL supplier catalog and upsert it in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"], default=None)
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument(
+            "--parallel",
+            action="store_true",
+            help="Import product chunks on Celery workers instead of in this process.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or detect_format(path)
+        try:
+            if options["parallel"]:
+                stats = self.run_parallel(path, fmt, options["chunk_size"])
+            else:
+                with open_source(path) as stream:
+                    stats = import_catalog(
+                        stream, fmt, options["chunk_size"], progress=self.report
+                    )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for error in stats["errors"][:50]:
+            self.stderr.write(f"row {error['row']}: {error['error']}")
+        self.stdout.write(
+            f"Imported {stats['products']} products and {stats['attribute_values']} "
+            f"attribute values from {stats['rows']} rows ({len(stats['errors'])} errors)"
+        )
+
+    def report(self, stats):
+        self.stdout.write(f"{stats['rows']} rows processed, {stats['products']} products upserted")
+
+    def run_parallel(self, path, fmt, chunk_size):
+        results = dispatch_catalog_import(path, fmt, chunk_size)
+        self.stdout.write(f"Dispatched {len(results)} chunks")
+        while True:
+            done = sum(1 for result in results if result.ready())
+            self.stdout.write(f"{done}/{len(results)} chunks done")
+            if done == len(results):
+                break
+            time.sleep(2)
+
+        stats = {"rows": 0, "products": 0, "attribute_values": 0, "errors": []}
+        for result in results:
+            chunk = result.get(propagate=False)
+            if isinstance(chunk, Exception):
+                stats["errors"].append({"row": "?", "error": f"chunk {result.id} failed: {chunk}"})
+                continue
+            for key in ("rows", "products", "attribute_values"):
+                stats[key] += chunk[key]
+            stats["errors"].extend(chunk["errors"])
+        return stats
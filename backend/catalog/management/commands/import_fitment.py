@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.fitment import load_fitment
+from catalog.importer import IMPORT_CHUNK_SIZE, detect_format, open_source
+
+
+class Command(BaseCommand):
+    help = "Load a CSV/JSONL supplier compatibility file into the vehicle fitment tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"], default=None)
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        try:
+            with open_source(path) as stream:
+                stats = load_fitment(
+                    stream, options["format"] or detect_format(path), options["chunk_size"]
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for error in stats["errors"][:50]:
+            self.stderr.write(f"row {error['row']}: {error['error']}")
+        self.stdout.write(
+            f"Loaded {stats['fitments']} fitments from {stats['rows']} rows "
+            f"({len(stats['errors'])} errors)"
+        )
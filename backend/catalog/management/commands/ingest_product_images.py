@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.media_ingest import ingest_images
+
+
+class Command(BaseCommand):
+    help = (
+        "Upload a folder of product photos to MinIO with content-hash dedup and attach "
+        "them to products matched by slug (<slug>/<file> or <slug>_<n>.<ext>)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("folder")
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Hash and match files without uploading or creating media rows.",
+        )
+
+    def handle(self, *args, **options):
+        folder = Path(options["folder"])
+        if not folder.is_dir():
+            raise CommandError(f"{folder} is not a directory")
+
+        stats = ingest_images(folder, workers=options["workers"], dry_run=options["dry_run"])
+
+        for path in stats["unmatched"][:50]:
+            self.stderr.write(f"no product for {path}")
+        self.stdout.write(
+            f"{stats['files']} files: {stats['uploaded']} uploaded, {stats['reused']} already "
+            f"stored, {stats['media_created']} media rows created, "
+            f"{len(stats['unmatched'])} unmatched"
+        )
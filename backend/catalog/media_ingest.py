@@ -0,0 +1,143 @@
+import hashlib
+import mimetypes
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.db.models import Max
+from django.utils import timezone
+
+from storage import minio_client
+
+from .models import Product, ProductMedia
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+HASH_BLOCK_SIZE = 1024 * 1024
+_INDEX_SUFFIX_RE = re.compile(r"[_-]\d+$")
+
+
+def scan_images(root):
+    root = Path(root)
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            if path.suffix.lower() in IMAGE_EXTENSIONS:
+                yield path
+
+
+def product_slug_candidates(path, root):
+    """
+    ``<root>/<slug>/<anything>.jpg`` or ``<root>/<slug>[_<n>].jpg``; the full
+    stem is tried first so slugs that themselves end in ``-<n>`` still match.
+    """
+
+    path, root = Path(path), Path(root)
+    if path.parent != root:
+        return (path.parent.name.lower(),)
+    stem = path.stem.lower()
+    stripped = _INDEX_SUFFIX_RE.sub("", stem)
+    return (stem, stripped) if stripped != stem else (stem,)
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as stream:
+        for block in iter(lambda: stream.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def object_key_for(digest, suffix):
+    return f"products/{digest}{suffix.lower()}"
+
+
+def ingest_images(root, workers=8, dry_run=False):
+    """
+    Hash every image under ``root``, upload the content the bucket does not
+    have yet from a thread pool sharing one S3 client, and bulk-create the
+    missing ``ProductMedia`` rows. Returns stats including unmatched files.
+    """
+
+    stats = {"files": 0, "unmatched": [], "uploaded": 0, "reused": 0, "media_created": 0}
+    candidates = []
+    for path in scan_images(root):
+        stats["files"] += 1
+        candidates.append((path, product_slug_candidates(path, root)))
+
+    product_ids = dict(
+        Product.objects.filter(
+            slug__in={slug for _, slugs in candidates for slug in slugs}
+        ).values_list("slug", "id")
+    )
+    matched = []
+    for path, slugs in candidates:
+        product_id = next((product_ids[slug] for slug in slugs if slug in product_ids), None)
+        if product_id is None:
+            stats["unmatched"].append(str(path))
+        else:
+            matched.append((product_id, path))
+    if not matched:
+        return stats
+
+    client = minio_client.get_s3_client()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = list(pool.map(hash_file, [path for _, path in matched]))
+        keys = [object_key_for(digest, path.suffix) for digest, (_, path) in zip(digests, matched)]
+
+        source_by_key = {}
+        for key, (_, path) in zip(keys, matched):
+            source_by_key.setdefault(key, path)
+        known = set(
+            ProductMedia.objects.filter(file_url__in=source_by_key).values_list("file_url", flat=True)
+        )
+        unknown = [key for key in source_by_key if key not in known]
+        present = dict(
+            zip(unknown, pool.map(lambda key: minio_client.object_exists(key, client), unknown))
+        )
+        to_upload = [key for key in unknown if not present[key]]
+        stats["reused"] = len(source_by_key) - len(to_upload)
+
+        def upload(key):
+            path = source_by_key[key]
+            content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            client.upload_file(
+                str(path),
+                minio_client.bucket_name(),
+                key,
+                ExtraArgs={"ContentType": content_type},
+                Config=minio_client.MULTIPART_TRANSFER_CONFIG,
+            )
+
+        if not dry_run:
+            list(pool.map(upload, to_upload))
+        stats["uploaded"] = len(to_upload)
+
+    existing = set(
+        ProductMedia.objects.filter(
+            product_id__in={product_id for product_id, _ in matched}
+        ).values_list("product_id", "file_url")
+    )
+    next_sort_order = dict(
+        ProductMedia.objects.filter(product_id__in={product_id for product_id, _ in matched})
+        .values("product_id")
+        .annotate(last=Max("sort_order"))
+        .values_list("product_id", "last")
+    )
+    new_media = []
+    for key, (product_id, path) in zip(keys, matched):
+        if (product_id, key) in existing:
+            continue
+        existing.add((product_id, key))
+        sort_order = next_sort_order.get(product_id, -1) + 1
+        next_sort_order[product_id] = sort_order
+        new_media.append(
+            ProductMedia(product_id=product_id, file_url=key, sort_order=sort_order)
+        )
+    if not dry_run:
+        ProductMedia.objects.bulk_create(new_media)
+        Product.objects.filter(id__in={media.product_id for media in new_media}).update(
+            content_changed_at=timezone.now()
+        )
+    stats["media_created"] = len(new_media)
+    return stats
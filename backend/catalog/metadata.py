@@ -0,0 +1,66 @@
+from django.db import DEFAULT_DB_ALIAS
+
+from storage.tiered_cache import TieredCache
+
+from .models import Banner, Brand, Category, CategoryAttribute
+
+# Loaders read the primary: a lagging replica could put rows that predate an
+# invalidation back into the cache.
+METADATA_CACHE = TieredCache("catalog-metadata")
+BRANDS_CACHE = TieredCache("brands")
+BANNERS_CACHE = TieredCache("banners")
+CATEGORY_ATTRIBUTES_CACHE = TieredCache("category-attributes")
+
+
+def _load_categories():
+    return tuple(Category.objects.using(DEFAULT_DB_ALIAS).filter(is_active=True).order_by("sort_order", "name"))
+
+
+class CatalogMetadata:
+    """
+    Active categories and filterable attributes (by category id). Shared
+    between requests and threads, so treat it as read-only.
+    """
+
+    def __init__(self):
+        self.categories = _load_categories()
+        attributes = {}
+        for attribute in (
+            CategoryAttribute.objects.using(DEFAULT_DB_ALIAS).filter(is_filterable=True).order_by("name", "id")
+        ):
+            attributes.setdefault(attribute.category_id, []).append(attribute)
+        self.attributes = {category_id: tuple(items) for category_id, items in attributes.items()}
+
+
+def catalog_metadata():
+    """
+    ``CatalogMetadata`` from the two-tier cache. Under gunicorn ``preload_app``
+    the master loads it before fork.
+    """
+
+    return METADATA_CACHE.get("tree", CatalogMetadata)
+
+
+def categories():
+    """
+    Active categories without the attributes, for pages that need no more.
+    """
+
+    return METADATA_CACHE.get("categories", _load_categories)
+
+
+def brands():
+    return BRANDS_CACHE.get("all", lambda: tuple(Brand.objects.using(DEFAULT_DB_ALIAS).order_by("name")))
+
+
+def banners():
+    return BANNERS_CACHE.get("all", lambda: tuple(Banner.objects.using(DEFAULT_DB_ALIAS).order_by("name")))
+
+
+def category_attributes(category_id):
+    return CATEGORY_ATTRIBUTES_CACHE.get(
+        category_id,
+        lambda: tuple(
+            CategoryAttribute.objects.using(DEFAULT_DB_ALIAS).filter(category_id=category_id).order_by("name")
+        ),
+    )
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.10 on 2026-10-19 08:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_alter_banner_image_url_alter_category_image_url_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format', models.CharField(choices=[('yml', 'YML'), ('csv', 'CSV')], max_length=10)),
+                ('is_delta', models.BooleanField(default=False)),
+                ('since', models.DateTimeField(blank=True, null=True)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(auto_now_add=True)),
+                ('object_key', models.CharField(max_length=255)),
+                ('product_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
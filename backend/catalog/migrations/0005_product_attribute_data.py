@@ -0,0 +1,68 @@
+from django.db import migrations, models
+
+
+POSTGRES_BACKFILL_SQL = """
+UPDATE "catalog_product" AS p SET "attribute_data" = agg.data
+FROM (
+    SELECT v."product_id",
+        jsonb_object_agg(
+            'a' || v."attribute_id"::text,
+            CASE
+                WHEN v."value_number" IS NOT NULL THEN to_jsonb(v."value_number")
+                WHEN v."value_boolean" IS NOT NULL THEN to_jsonb(v."value_boolean")
+                ELSE to_jsonb(v."value_string")
+            END
+        ) AS data
+    FROM "catalog_productattributevalue" AS v
+    WHERE v."value_number" IS NOT NULL OR v."value_boolean" IS NOT NULL OR v."value_string" <> ''
+    GROUP BY v."product_id"
+) AS agg
+WHERE p."id" = agg."product_id";
+CREATE INDEX IF NOT EXISTS "catalog_product_attr_data_gin"
+    ON "catalog_product" USING gin ("attribute_data" jsonb_path_ops);
+"""
+
+
+def backfill_attribute_data(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(POSTGRES_BACKFILL_SQL)
+        return
+
+    Product = apps.get_model("catalog", "Product")
+    ProductAttributeValue = apps.get_model("catalog", "ProductAttributeValue")
+    data = {}
+    for value in ProductAttributeValue.objects.iterator(chunk_size=2000):
+        if value.value_number is not None:
+            json_value = float(value.value_number)
+        elif value.value_boolean is not None:
+            json_value = value.value_boolean
+        else:
+            json_value = value.value_string or None
+        if json_value is not None:
+            data.setdefault(value.product_id, {})[f"a{value.attribute_id}"] = json_value
+    Product.objects.bulk_update(
+        [Product(id=product_id, attribute_data=values) for product_id, values in data.items()],
+        ["attribute_data"],
+        batch_size=1000,
+    )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute('DROP INDEX IF EXISTS "catalog_product_attr_data_gin"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0004_catalogfeed"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="attribute_data",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(backfill_attribute_data, drop_gin_index),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.10 on 2026-10-19 08:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_product_attribute_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleMake',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VehicleModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField()),
+                ('make', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='models', to='catalog.vehiclemake')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VehicleGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('year_from', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('year_to', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='generations', to='catalog.vehiclemodel')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductFitment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year_from', models.PositiveSmallIntegerField()),
+                ('year_to', models.PositiveSmallIntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fitments', to='catalog.product')),
+                ('generation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fitments', to='catalog.vehiclegeneration')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['generation', 'year_from', 'year_to', 'product'], name='catalog_fitment_interval_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'generation', 'year_from', 'year_to'), name='product_fitment_unique'), models.CheckConstraint(condition=models.Q(('year_from__lte', models.F('year_to'))), name='product_fitment_year_range')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='vehiclemodel',
+            constraint=models.UniqueConstraint(fields=('make', 'slug'), name='vehicle_model_unique_slug'),
+        ),
+        migrations.AddConstraint(
+            model_name='vehiclegeneration',
+            constraint=models.UniqueConstraint(fields=('model', 'name'), name='vehicle_generation_unique_name'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.10 on 2026-10-19 08:39
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_sales_scores(apps, schema_editor):
+    # Seed the counters with undecayed lifetime unit sales from the hot order tables.
+    Product = apps.get_model("catalog", "Product")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    sold = Coalesce(
+        Subquery(
+            OrderItem.objects.filter(product_id=OuterRef("pk"))
+            .order_by()
+            .values("product_id")
+            .annotate(total=Sum("quantity"))
+            .values("total")
+        ),
+        0,
+    )
+    Product.objects.filter(
+        id__in=OrderItem.objects.values("product_id")
+    ).update(sales_score=sold, popularity=sold)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_vehicle_fitment'),
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='popularity',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sales_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='view_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['name', 'id'], name='catalog_product_name_sort'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['price', 'id'], name='catalog_product_price_sort'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at', 'id'], name='catalog_product_newest_sort'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['popularity', 'id'], name='catalog_product_popular_sort'),
+        ),
+        migrations.RunPython(backfill_sales_scores, migrations.RunPython.noop),
+    ]
@@ -44,9 +44,51 @@ class Product(models.Model):
     stock_quantity = models.IntegerField(default=0)
     stock_reserved = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
+    # Denormalized copy of the ProductAttributeValue rows: {"a<attribute_id>": value}.
+    attribute_data = models.JSONField(default=dict, blank=True)
+    # Time-decayed counters maintained by catalog.popularity; never touch updated_at.
+    sales_score = models.FloatField(default=0)
+    view_score = models.FloatField(default=0)
+    popularity = models.FloatField(default=0)
+    # Last attribute or media change, which leave updated_at alone; delta feeds
+    # (catalog.feeds) select on both.
+    content_changed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # One partial index per sort mode of the storefront listings (see
+        # catalog.popularity.PRODUCT_SORTS); descending sorts scan them backwards.
+        indexes = [
+            models.Index(
+                fields=["name", "id"],
+                condition=models.Q(is_active=True),
+                name="catalog_product_name_sort",
+            ),
+            models.Index(
+                fields=["price", "id"],
+                condition=models.Q(is_active=True),
+                name="catalog_product_price_sort",
+            ),
+            models.Index(
+                fields=["created_at", "id"],
+                condition=models.Q(is_active=True),
+                name="catalog_product_newest_sort",
+            ),
+            models.Index(
+                fields=["popularity", "id"],
+                condition=models.Q(is_active=True),
+                name="catalog_product_popular_sort",
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets ``post_save`` also invalidate the category a product moved out of.
+        instance._loaded_category_id = instance.__dict__.get("category_id")
+        return instance
+
     @property
     def stock_available(self) -> int:
         return max(0, self.stock_quantity - self.stock_reserved)
@@ -111,3 +153,105 @@ class Banner(models.Model):
 
     def __str__(self) -> str:
         return self.name
+
+
+class DeletedProduct(models.Model):
+    """
+    What a delta feed needs to withdraw the offer of a deleted product; rows
+    older than ``catalog.feeds.DELETED_PRODUCT_RETENTION`` are pruned.
+    """
+
+    product_id = models.BigIntegerField()
+    slug = models.SlugField()
+    name = models.CharField(max_length=255)
+    price = models.DecimalField(max_digits=12, decimal_places=2)
+    brand_name = models.CharField(max_length=200, blank=True)
+    category_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(db_index=True)
+
+    def __str__(self) -> str:
+        return self.slug
+
+
+class CatalogFeed(models.Model):
+    class Format(models.TextChoices):
+        YML = "yml", "YML"
+        CSV = "csv", "CSV"
+
+    format = models.CharField(max_length=10, choices=Format.choices)
+    is_delta = models.BooleanField(default=False)
+    since = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(auto_now_add=True)
+    object_key = models.CharField(max_length=255)
+    product_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return self.object_key
+
+
+class VehicleMake(models.Model):
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(unique=True)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class VehicleModel(models.Model):
+    make = models.ForeignKey(VehicleMake, on_delete=models.CASCADE, related_name="models")
+    name = models.CharField(max_length=100)
+    slug = models.SlugField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["make", "slug"], name="vehicle_model_unique_slug"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.make.name} {self.name}"
+
+
+class VehicleGeneration(models.Model):
+    model = models.ForeignKey(VehicleModel, on_delete=models.CASCADE, related_name="generations")
+    # Blank when the supplier only knows the model; such a generation covers all years listed.
+    name = models.CharField(max_length=100, blank=True)
+    year_from = models.PositiveSmallIntegerField(null=True, blank=True)
+    year_to = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["model", "name"], name="vehicle_generation_unique_name"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.model} {self.name}".strip()
+
+
+class ProductFitment(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="fitments")
+    generation = models.ForeignKey(
+        VehicleGeneration, on_delete=models.CASCADE, related_name="fitments"
+    )
+    year_from = models.PositiveSmallIntegerField()
+    year_to = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "generation", "year_from", "year_to"],
+                name="product_fitment_unique",
+            ),
+            models.CheckConstraint(
+                condition=models.Q(year_from__lte=models.F("year_to")),
+                name="product_fitment_year_range",
+            ),
+        ]
+        indexes = [
+            # Interval lookup for one vehicle: equality on generation, range on the
+            # years, product id read straight from the index.
+            models.Index(
+                fields=["generation", "year_from", "year_to", "product"],
+                name="catalog_fitment_interval_idx",
+            ),
+        ]
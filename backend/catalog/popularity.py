@@ -0,0 +1,128 @@
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from redis.exceptions import RedisError
+
+from storage.redis_client import acquire_lock, get_redis, release_lock
+
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+VIEWS_KEY = "catalog:product-views"
+FLUSHING_KEY = f"{VIEWS_KEY}:flushing"
+FLUSH_LOCK_KEY = f"{VIEWS_KEY}:lock"
+FLUSH_LOCK_SECONDS = 300
+UPDATE_CHUNK_SIZE = 500
+DECAY_ID_WINDOW = 10000
+# Scores below this are rounded down to zero so decay stops touching the row.
+SCORE_FLOOR = 0.001
+
+# Storefront sort modes; each matches a partial index on Product.
+PRODUCT_SORTS = {
+    "name": ("name", "id"),
+    "price_asc": ("price", "id"),
+    "price_desc": ("-price", "-id"),
+    "newest": ("-created_at", "-id"),
+    "popularity": ("-popularity", "-id"),
+}
+DEFAULT_SORT = "name"
+
+
+def sort_products(queryset, sort):
+    return queryset.order_by(*PRODUCT_SORTS.get(sort, PRODUCT_SORTS[DEFAULT_SORT]))
+
+
+def _increment(field, amounts, weight):
+    """
+    Add ``amounts`` (product id -> count) to ``field`` and to ``popularity``
+    with one UPDATE per chunk.
+    """
+
+    items = sorted(amounts.items())
+    for start in range(0, len(items), UPDATE_CHUNK_SIZE):
+        chunk = items[start:start + UPDATE_CHUNK_SIZE]
+        delta = Case(
+            *[When(id=product_id, then=Value(float(amount))) for product_id, amount in chunk],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        Product.objects.filter(id__in=[product_id for product_id, _ in chunk]).update(
+            **{field: F(field) + delta},
+            popularity=F("popularity") + delta * weight,
+        )
+
+
+def record_sales(quantities):
+    """
+    Count units sold (product id -> quantity) at order placement.
+    """
+
+    _increment("sales_score", quantities, 1.0)
+
+
+def views_tracking_enabled() -> bool:
+    return settings.PRODUCT_VIEWS_BACKEND == "redis"
+
+
+def record_product_view(product_id) -> None:
+    """
+    Buffer one product-page view in Redis; ``flush_product_views`` applies the
+    batch. Views are best effort, so a Redis outage never fails the page.
+    """
+
+    if not views_tracking_enabled():
+        return
+    try:
+        get_redis().hincrby(VIEWS_KEY, product_id, 1)
+    except RedisError:
+        logger.warning("Could not record a view of product %s", product_id, exc_info=True)
+
+
+def flush_product_views(client=None) -> int:
+    """
+    Move the buffered views aside atomically and add them to the products.
+    A batch left behind by an interrupted flush is applied first. Returns the
+    number of views, or None when another flush is running (its batch must
+    not be counted twice).
+    """
+
+    client = client or get_redis()
+    token = acquire_lock(client, FLUSH_LOCK_KEY, FLUSH_LOCK_SECONDS)
+    if token is None:
+        return None
+    try:
+        if not client.exists(FLUSHING_KEY):
+            if not client.exists(VIEWS_KEY):
+                return 0
+            client.rename(VIEWS_KEY, FLUSHING_KEY)
+        views = {int(product_id): int(count) for product_id, count in client.hgetall(FLUSHING_KEY).items()}
+        with transaction.atomic():
+            _increment("view_score", views, settings.POPULARITY_VIEW_WEIGHT)
+        client.delete(FLUSHING_KEY)
+        return sum(views.values())
+    finally:
+        release_lock(client, FLUSH_LOCK_KEY, token)
+
+
+def decay_popularity(half_life_days=None, window=DECAY_ID_WINDOW) -> int:
+    """
+    Scale every score by ``0.5 ** (1 / half_life_days)``; run once a day so a
+    sale or view loses half its weight every half-life.
+    """
+
+    half_life_days = half_life_days or settings.POPULARITY_HALF_LIFE_DAYS
+    factor = 0.5 ** (1 / half_life_days)
+    last_id = Product.objects.order_by("-id").values_list("id", flat=True).first() or 0
+    decayed = 0
+    for low in range(0, last_id, window):
+        rows = Product.objects.filter(id__gt=low, id__lte=low + window, popularity__gt=0)
+        rows.filter(popularity__lt=SCORE_FLOOR).update(sales_score=0, view_score=0, popularity=0)
+        decayed += rows.update(
+            sales_score=F("sales_score") * factor,
+            view_score=F("view_score") * factor,
+            popularity=F("popularity") * factor,
+        )
+    return decayed
@@ -0,0 +1,138 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from .cache import bump_category_versions
+
+# Sent once per batch of product writes that bypass ``Model.save()``.
+# Arguments: ``product_ids`` and, when the sender already knows them, ``category_ids``.
+products_changed = Signal()
+
+# Sent after brand, banner, category or category attribute writes that bypass
+# ``Model.save()``; ``sender`` is the model.
+reference_data_changed = Signal()
+
+
+@receiver(products_changed)
+def invalidate_product_categories(sender, product_ids, category_ids=None, **kwargs):
+    from .models import Product
+
+    if category_ids is None:
+        category_ids = (
+            Product.objects.filter(id__in=product_ids)
+            .values_list("category_id", flat=True)
+            .distinct()
+        )
+    bump_category_versions(category_ids)
+
+
+@receiver(post_save, sender="catalog.Product")
+@receiver(post_delete, sender="catalog.Product")
+def invalidate_saved_product_categories(sender, instance, **kwargs):
+    category_ids = {instance.category_id, getattr(instance, "_loaded_category_id", None)} - {None}
+    instance._loaded_category_id = instance.category_id
+    # After commit: a request that rebuilt the cache earlier would keep the old rows.
+    transaction.on_commit(lambda: bump_category_versions(category_ids))
+
+
+@receiver(post_delete, sender="catalog.Product")
+def record_deleted_product(sender, instance, **kwargs):
+    from .models import DeletedProduct
+
+    DeletedProduct.objects.create(
+        product_id=instance.pk,
+        slug=instance.slug,
+        name=instance.name,
+        price=instance.price,
+        brand_name=instance.brand.name,
+        category_id=instance.category_id,
+        deleted_at=timezone.now(),
+    )
+
+
+@receiver(post_save, sender="catalog.ProductMedia")
+@receiver(post_delete, sender="catalog.ProductMedia")
+def stamp_product_media_change(sender, instance, **kwargs):
+    from .models import Product
+
+    Product.objects.filter(pk=instance.product_id).update(content_changed_at=timezone.now())
+
+
+class _AttributeDataRefresh:
+    """
+    On-commit callback rebuilding ``attribute_data`` once for every product
+    whose attribute values were written in the transaction.
+    """
+
+    def __init__(self, sender):
+        self.sender = sender
+        self.product_ids = set()
+        self.ran = False
+
+    def __call__(self):
+        from .attributes import refresh_attribute_data
+
+        self.ran = True
+        product_ids = sorted(self.product_ids)
+        refresh_attribute_data(product_ids)
+        products_changed.send(sender=self.sender, product_ids=product_ids)
+
+
+def _pending_attribute_refresh():
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return None
+    # Only a callback of the current savepoint: one registered in an inner
+    # savepoint is dropped if that savepoint rolls back.
+    savepoints = set(connection.savepoint_ids)
+    for savepoint_ids, callback, _ in connection.run_on_commit:
+        if (
+            isinstance(callback, _AttributeDataRefresh)
+            and not callback.ran
+            and savepoint_ids == savepoints
+        ):
+            return callback
+    return None
+
+
+@receiver(post_save, sender="catalog.ProductAttributeValue")
+@receiver(post_delete, sender="catalog.ProductAttributeValue")
+def sync_product_attribute_data(sender, instance, **kwargs):
+    callback = _pending_attribute_refresh()
+    if callback is not None:
+        callback.product_ids.add(instance.product_id)
+        return
+    callback = _AttributeDataRefresh(sender)
+    callback.product_ids.add(instance.product_id)
+    # Runs right away outside a transaction.
+    transaction.on_commit(callback)
+
+
+def _invalidate_reference_data(model):
+    from . import metadata
+
+    name = model._meta.model_name
+    if name == "brand":
+        metadata.BRANDS_CACHE.invalidate()
+    elif name == "banner":
+        metadata.BANNERS_CACHE.invalidate()
+    else:
+        metadata.METADATA_CACHE.invalidate()
+        if name == "categoryattribute":
+            # Whole namespace: a save may have moved the attribute between categories.
+            metadata.CATEGORY_ATTRIBUTES_CACHE.invalidate()
+
+
+@receiver(reference_data_changed)
+@receiver(post_save, sender="catalog.Brand")
+@receiver(post_delete, sender="catalog.Brand")
+@receiver(post_save, sender="catalog.Banner")
+@receiver(post_delete, sender="catalog.Banner")
+@receiver(post_save, sender="catalog.Category")
+@receiver(post_delete, sender="catalog.Category")
+@receiver(post_save, sender="catalog.CategoryAttribute")
+@receiver(post_delete, sender="catalog.CategoryAttribute")
+def invalidate_reference_data(sender, **kwargs):
+    # After commit: a process that reloaded earlier would cache the old rows again.
+    transaction.on_commit(lambda: _invalidate_reference_data(sender))
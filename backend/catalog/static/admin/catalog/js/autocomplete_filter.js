@@ -0,0 +1,12 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    $(document).on('change', '.catalog-autocomplete-filter', function() {
+        const params = new URLSearchParams(this.dataset.baseQuery);
+        if (this.value) {
+            params.set(this.dataset.queryParam, this.value);
+        }
+        window.location.search = params.toString();
+    });
+}
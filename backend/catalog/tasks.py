@@ -0,0 +1,80 @@
+from celery import shared_task
+
+from .feeds import generate_feed
+from .media_ingest import ingest_images
+from .importer import (
+    IMPORT_CHUNK_SIZE,
+    CatalogImporter,
+    chunked,
+    detect_format,
+    import_catalog,
+    open_source,
+    read_rows,
+)
+from .popularity import decay_popularity, flush_product_views
+
+
+@shared_task
+def import_catalog_chunk(rows, first_row_number=1):
+    importer = CatalogImporter()
+    importer.import_chunk(rows, first_row_number)
+    return importer.stats
+
+
+def dispatch_catalog_import(path, fmt=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Create brands, categories and attributes in one serial pass (so workers
+    never race on them), then fan product chunks out to Celery workers.
+    Returns the ``AsyncResult`` of every chunk.
+    """
+
+    fmt = fmt or detect_format(path)
+    importer = CatalogImporter()
+    with open_source(path) as stream:
+        for rows in chunked(read_rows(stream, fmt), chunk_size):
+            importer.ensure_dimensions(rows)
+
+    results = []
+    row_number = 1
+    with open_source(path) as stream:
+        for rows in chunked(read_rows(stream, fmt), chunk_size):
+            results.append(import_catalog_chunk.delay(rows, row_number))
+            row_number += len(rows)
+    return results
+
+
+@shared_task(bind=True)
+def import_catalog_file(self, path, fmt=None, chunk_size=IMPORT_CHUNK_SIZE, parallel=False):
+    if parallel:
+        return [result.id for result in dispatch_catalog_import(path, fmt, chunk_size)]
+
+    def report(stats):
+        self.update_state(
+            state="PROGRESS",
+            meta={"rows": stats["rows"], "products": stats["products"], "errors": len(stats["errors"])},
+        )
+
+    with open_source(path) as stream:
+        return import_catalog(stream, fmt or detect_format(path), chunk_size, progress=report)
+
+
+@shared_task
+def generate_catalog_feed(fmt="yml", delta=False):
+    feed = generate_feed(fmt=fmt, delta=delta)
+    return {"object_key": feed.object_key, "products": feed.product_count, "delta": feed.is_delta}
+
+
+@shared_task
+def flush_product_view_counts():
+    return flush_product_views()
+
+
+@shared_task
+def decay_product_popularity():
+    return decay_popularity()
+
+
+@shared_task
+def ingest_product_images(folder, workers=8):
+    stats = ingest_images(folder, workers=workers)
+    return {**stats, "unmatched": len(stats["unmatched"])}
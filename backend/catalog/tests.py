@@ -0,0 +1,650 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from decimal import Decimal
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from config.celery import app as celery_app
+
+from . import popularity
+from .cache import category_version
+from .facets import cached_category_histograms, numeric_histograms
+from .feeds import generate_feed
+from .importer import import_catalog
+from .metadata import BRANDS_CACHE, METADATA_CACHE, brands, catalog_metadata
+from .media_ingest import object_key_for
+from .popularity import FLUSHING_KEY, VIEWS_KEY, decay_popularity, flush_product_views
+from .signals import reference_data_changed, products_changed
+from .models import (
+    Brand,
+    CatalogFeed,
+    Category,
+    CategoryAttribute,
+    Product,
+    ProductAttributeValue,
+    ProductFitment,
+    ProductMedia,
+    VehicleGeneration,
+    VehicleMake,
+)
+
+try:
+    import fakeredis
+except ImportError:  # pragma: no cover - optional test dependency
+    fakeredis = None
+
+
+class ImportCatalogCommandTests(TestCase):
+    def write_source(self, suffix, content):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, "w", encoding="utf-8") as stream:
+            stream.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_imports_csv_with_attributes(self):
+        path = self.write_source(
+            ".csv",
+            "slug,name,price,stock_quantity,brand_name,category_slug,category_name,"
+            "category_parent,attr:Diameter,attr:Material\n"
+            "disc-1,Brake disc,120.50,4,Brembo,discs,Brake discs,brakes,280,steel\n"
+            "disc-2,Brake disc XL,150,0,Brembo,discs,Brake discs,brakes,320,carbon\n"
+            "broken,,1,1,Brembo,discs,Brake discs,brakes,,\n",
+        )
+        out = StringIO()
+
+        call_command("import_catalog", path, "--chunk-size", "2", stdout=out, stderr=StringIO())
+
+        self.assertIn("Imported 2 products", out.getvalue())
+        self.assertEqual(Brand.objects.get().slug, "brembo")
+        discs = Category.objects.get(slug="discs")
+        self.assertEqual(discs.parent.slug, "brakes")
+        product = Product.objects.get(slug="disc-1")
+        self.assertEqual(product.price, Decimal("120.50"))
+        diameter = CategoryAttribute.objects.get(category=discs, name="Diameter")
+        self.assertEqual(diameter.data_type, CategoryAttribute.DataType.NUMBER)
+        self.assertEqual(
+            ProductAttributeValue.objects.get(product=product, attribute=diameter).value_number,
+            Decimal("280"),
+        )
+        material = CategoryAttribute.objects.get(category=discs, name="Material")
+        self.assertEqual(
+            product.attribute_data, {f"a{diameter.id}": 280.0, f"a{material.id}": "steel"}
+        )
+
+    def test_reimport_updates_existing_rows(self):
+        rows = [
+            {
+                "slug": "pad-1",
+                "name": "Brake pad",
+                "price": "10.00",
+                "brand_slug": "ate",
+                "category_slug": "pads",
+                "attributes": {"Ceramic": True},
+            }
+        ]
+        path = self.write_source(".jsonl", "\n".join(json.dumps(row) for row in rows))
+        call_command("import_catalog", path, stdout=StringIO())
+
+        rows[0]["price"] = "12.00"
+        rows[0]["attributes"]["Ceramic"] = False
+        path = self.write_source(".jsonl", "\n".join(json.dumps(row) for row in rows))
+        call_command("import_catalog", path, stdout=StringIO())
+
+        product = Product.objects.get(slug="pad-1")
+        self.assertEqual(Product.objects.count(), 1)
+        self.assertEqual(product.price, Decimal("12.00"))
+        self.assertIs(ProductAttributeValue.objects.get(product=product).value_boolean, False)
+
+    def test_unreadable_records_are_reported_and_skipped(self):
+        header = "slug,name,price,brand_name,category_slug\n"
+        csv_path = self.write_source(
+            ".csv",
+            header + "disc-1,Brake disc,10,Brembo,discs\n"
+            "disc-2,Brake disc,10,Brembo,discs,extra\n"
+            "disc-3,Brake disc,10,Brembo,discs\n",
+        )
+        good = {"slug": "pad-1", "name": "Pad", "price": "5", "brand_slug": "ate", "category_slug": "pads"}
+        jsonl_path = self.write_source(
+            ".jsonl",
+            "\n".join([json.dumps(good), "{not json", "", "[1, 2]", json.dumps({**good, "slug": "pad-2"})]),
+        )
+
+        with open(csv_path, encoding="utf-8", newline="") as stream:
+            csv_stats = import_catalog(stream, "csv")
+        with open(jsonl_path, encoding="utf-8", newline="") as stream:
+            jsonl_stats = import_catalog(stream, "jsonl")
+
+        self.assertEqual(csv_stats["products"], 2)
+        self.assertEqual(
+            csv_stats["errors"], [{"row": 2, "error": "Line 3: more fields than the header"}]
+        )
+        self.assertEqual(jsonl_stats["products"], 2)
+        self.assertEqual(
+            [error["error"] for error in jsonl_stats["errors"]],
+            [
+                "Line 2: invalid JSON (Expecting property name enclosed in double quotes)",
+                "Line 4: expected a JSON object",
+            ],
+        )
+        self.assertEqual(
+            sorted(Product.objects.values_list("slug", flat=True)),
+            ["disc-1", "disc-3", "pad-1", "pad-2"],
+        )
+
+    def test_parallel_import_runs_chunks_as_tasks(self):
+        path = self.write_source(
+            ".csv",
+            "slug,name,price,brand_slug,category_slug\n"
+            + "".join(f"part-{index},Part {index},5,acme,parts\n" for index in range(5)),
+        )
+
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, "task_always_eager", False)
+        out = StringIO()
+
+        call_command("import_catalog", path, "--parallel", "--chunk-size", "2", stdout=out)
+
+        self.assertIn("Dispatched 3 chunks", out.getvalue())
+        self.assertEqual(Product.objects.count(), 5)
+
+
+class CatalogFeedTests(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name="Brembo", slug="brembo")
+        self.category = Category.objects.create(name="Discs & Drums", slug="discs")
+        self.attribute = CategoryAttribute.objects.create(
+            category=self.category,
+            name="Diameter",
+            data_type=CategoryAttribute.DataType.NUMBER,
+            unit="mm",
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(3):
+                product = Product.objects.create(
+                    name=f"Disc {index}",
+                    slug=f"disc-{index}",
+                    brand=self.brand,
+                    category=self.category,
+                    price=Decimal("100.00"),
+                    stock_quantity=index,
+                )
+                ProductAttributeValue.objects.create(
+                    product=product, attribute=self.attribute, value_number=Decimal("280.000")
+                )
+        self.uploads = {}
+        patcher = patch("catalog.feeds.minio_client.upload_fileobj", side_effect=self.capture)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def capture(self, fileobj, key, content_type=None, content_encoding=None):
+        self.uploads[key] = gzip.decompress(fileobj.read()).decode("utf-8")
+
+    def test_yml_feed_streams_offers_with_params(self):
+        with self.assertNumQueries(7):
+            feed = generate_feed(CatalogFeed.Format.YML)
+
+        body = self.uploads["feeds/catalog.yml.gz"]
+        self.assertEqual(feed.product_count, 3)
+        self.assertIn('<category id="%d">Discs &amp; Drums</category>' % self.category.id, body)
+        self.assertEqual(body.count("<offer "), 3)
+        self.assertIn('<param name="Diameter" unit="mm">280</param>', body)
+        self.assertIn('available="false"', body)
+
+    def test_delta_feed_only_emits_changed_products(self):
+        generate_feed(CatalogFeed.Format.CSV)
+        Product.objects.update(
+            updated_at=timezone.now() - timedelta(hours=2), content_changed_at=timezone.now() - timedelta(hours=2)
+        )
+        CatalogFeed.objects.update(started_at=timezone.now() - timedelta(hours=1))
+        Product.objects.filter(slug="disc-1").update(is_active=False, updated_at=timezone.now())
+
+        feed = generate_feed(CatalogFeed.Format.CSV, delta=True)
+
+        self.assertTrue(feed.is_delta)
+        self.assertEqual(feed.product_count, 1)
+        body = self.uploads[feed.object_key]
+        self.assertIn("disc-1", body)
+        self.assertNotIn("disc-2", body)
+
+    def test_delta_feed_emits_attribute_media_changes_and_deletions(self):
+        generate_feed(CatalogFeed.Format.YML)
+        Product.objects.update(
+            updated_at=timezone.now() - timedelta(hours=2), content_changed_at=timezone.now() - timedelta(hours=2)
+        )
+        CatalogFeed.objects.update(started_at=timezone.now() - timedelta(hours=1))
+        ProductAttributeValue.objects.filter(product__slug="disc-0").update(value_number=Decimal("300"))
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductAttributeValue.objects.filter(product__slug="disc-0").get().save()
+        ProductMedia.objects.create(product=Product.objects.get(slug="disc-1"), file_url="products/disc-1.jpg")
+        deleted = Product.objects.get(slug="disc-2")
+        deleted_id = deleted.id
+        deleted.attributes.all().delete()
+        Product.objects.filter(slug="disc-2").update(updated_at=timezone.now() - timedelta(hours=2))
+        deleted.delete()
+
+        feed = generate_feed(CatalogFeed.Format.YML, delta=True)
+
+        body = self.uploads[feed.object_key]
+        self.assertEqual(feed.product_count, 3)
+        self.assertIn('<param name="Diameter" unit="mm">300</param>', body)
+        self.assertIn("disc-1.jpg", body)
+        self.assertIn(
+            f'<offer id="{deleted_id}" available="false"><url>https://carbon69.ru/products/disc-2</url>', body
+        )
+
+
+class IngestProductImagesCommandTests(TestCase):
+    def setUp(self):
+        brand = Brand.objects.create(name="Brembo", slug="brembo")
+        category = Category.objects.create(name="Discs", slug="discs")
+        self.product = Product.objects.create(
+            name="Disc",
+            slug="disc-1",
+            brand=brand,
+            category=category,
+            price=Decimal("100.00"),
+        )
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.client = patch("catalog.media_ingest.minio_client.get_s3_client").start()
+        self.addCleanup(patch.stopall)
+        self.exists = patch(
+            "catalog.media_ingest.minio_client.object_exists", return_value=False
+        ).start()
+
+    def write(self, name, content):
+        path = os.path.join(self.folder.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as stream:
+            stream.write(content)
+
+    def test_uploads_unique_content_once_and_creates_media(self):
+        self.write("disc-1_1.jpg", b"front")
+        self.write("disc-1_2.jpg", b"front")
+        self.write("disc-1/side.png", b"side")
+        self.write("unknown.jpg", b"other")
+        out, err = StringIO(), StringIO()
+
+        call_command("ingest_product_images", self.folder.name, stdout=out, stderr=err)
+
+        self.assertEqual(self.client.return_value.upload_file.call_count, 2)
+        media = list(ProductMedia.objects.filter(product=self.product).order_by("sort_order"))
+        self.assertEqual(len(media), 2)
+        self.assertTrue(all(item.file_url.name.startswith("products/") for item in media))
+        self.assertIn("unknown.jpg", err.getvalue())
+
+        call_command("ingest_product_images", self.folder.name, stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(self.client.return_value.upload_file.call_count, 2)
+        self.assertEqual(ProductMedia.objects.filter(product=self.product).count(), 2)
+
+    def test_skips_upload_when_bucket_already_has_content(self):
+        self.write("disc-1.jpg", b"front")
+        self.exists.return_value = True
+
+        call_command("ingest_product_images", self.folder.name, stdout=StringIO())
+
+        self.client.return_value.upload_file.assert_not_called()
+        expected = object_key_for(hashlib.sha256(b"front").hexdigest(), ".jpg")
+        self.assertEqual(ProductMedia.objects.get().file_url.name, expected)
+
+
+class ProductAdminTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+
+        self.admin_user = get_user_model().objects.create_superuser(
+            username="admin", email="admin@example.com", password="password"
+        )
+        self.client.force_login(self.admin_user)
+        brand = Brand.objects.create(name="Brembo", slug="brembo")
+        self.category = Category.objects.create(name="Discs", slug="discs")
+        self.target = Category.objects.create(name="Pads", slug="pads")
+        self.products = [
+            Product.objects.create(
+                name=f"Disc {index}",
+                slug=f"disc-{index}",
+                brand=brand,
+                category=self.category,
+                price=Decimal("100.00"),
+            )
+            for index in range(3)
+        ]
+
+    def run_action(self, action, **extra):
+        return self.client.post(
+            "/admin/catalog/product/",
+            {
+                "action": action,
+                "_selected_action": [product.id for product in self.products[:2]],
+                **extra,
+            },
+        )
+
+    def test_changelist_query_count_does_not_grow_with_rows(self):
+        with self.assertNumQueries(4):
+            response = self.client.get("/admin/catalog/product/")
+        self.assertEqual(response.status_code, 200)
+
+        for index in range(3, 10):
+            Product.objects.create(
+                name=f"Disc {index}",
+                slug=f"disc-{index}",
+                brand=self.products[0].brand,
+                category=self.category,
+                price=Decimal("1.00"),
+            )
+        with self.assertNumQueries(4):
+            self.client.get("/admin/catalog/product/")
+
+    def test_autocomplete_filter_renders_selected_value_only(self):
+        response = self.client.get(
+            f"/admin/catalog/product/?category__id__exact={self.category.id}"
+        )
+
+        self.assertContains(response, "catalog-autocomplete-filter")
+        self.assertContains(
+            response, f'<option value="{self.category.id}" selected>Discs</option>', html=True
+        )
+        self.assertNotContains(response, ">Pads</option>")
+
+    def test_reprice_action_updates_selection(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_action("reprice", percent="12.5")
+
+        prices = dict(Product.objects.values_list("slug", "price"))
+        self.assertEqual(
+            prices,
+            {"disc-0": Decimal("112.50"), "disc-1": Decimal("112.50"), "disc-2": Decimal("100.00")},
+        )
+
+    def test_move_and_deactivate_actions(self):
+        version = category_version(self.target.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_action("move_to_category", category_id=self.target.id)
+        self.run_action("deactivate")
+
+        self.assertEqual(Product.objects.filter(category=self.target, is_active=False).count(), 2)
+        self.assertEqual(category_version(self.target.id), version + 1)
+
+    def test_move_action_rejects_unknown_category(self):
+        self.run_action("move_to_category", category_id=999999)
+
+        self.assertFalse(Product.objects.exclude(category=self.category).exists())
+
+
+class ImportFitmentCommandTests(TestCase):
+    def setUp(self):
+        brand = Brand.objects.create(name="Brembo", slug="brembo")
+        category = Category.objects.create(name="Discs", slug="discs")
+        for slug in ("disc-1", "disc-2"):
+            Product.objects.create(
+                name=slug, slug=slug, brand=brand, category=category, price=Decimal("10.00")
+            )
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+
+    def test_loads_vehicles_and_fitments(self):
+        path = os.path.join(self.folder.name, "fitment.csv")
+        with open(path, "w", encoding="utf-8") as stream:
+            stream.write(
+                "product_slug,make,model,generation,year_from,year_to\n"
+                "disc-1,Volkswagen,Golf,Mk7,2012,2019\n"
+                "disc-1,Volkswagen,Golf,Mk8,2019,2024\n"
+                "disc-2,Volkswagen,Golf,Mk7,2015,2019\n"
+                "disc-2,Skoda,Octavia,,2013,2020\n"
+                "missing,Skoda,Octavia,,2013,2020\n"
+                "disc-1,Skoda,Octavia,,2020,2013\n"
+            )
+        out, err = StringIO(), StringIO()
+
+        call_command("import_fitment", path, "--chunk-size", "2", stdout=out, stderr=err)
+        call_command("import_fitment", path, stdout=StringIO(), stderr=StringIO())
+
+        self.assertIn("Loaded 4 fitments from 6 rows (2 errors)", out.getvalue())
+        self.assertEqual(VehicleMake.objects.count(), 2)
+        self.assertEqual(VehicleGeneration.objects.filter(model__slug="golf").count(), 2)
+        mk7 = VehicleGeneration.objects.get(name="Mk7")
+        self.assertEqual((mk7.year_from, mk7.year_to), (2012, 2019))
+        self.assertEqual(ProductFitment.objects.count(), 4)
+        self.assertIn("Unknown product 'missing'", err.getvalue())
+
+    def test_later_chunks_and_imports_widen_generation_years(self):
+        path = os.path.join(self.folder.name, "fitment.csv")
+        with open(path, "w", encoding="utf-8") as stream:
+            stream.write(
+                "product_slug,make,model,generation,year_from,year_to\n"
+                "disc-1,Volkswagen,Golf,Mk7,2015,2017\n"
+                "disc-2,Volkswagen,Golf,Mk7,2012,2016\n"
+                "disc-1,Skoda,Octavia,,2013,2015\n"
+            )
+        call_command("import_fitment", path, "--chunk-size", "1", stdout=StringIO(), stderr=StringIO())
+        with open(path, "w", encoding="utf-8") as stream:
+            stream.write(
+                "product_slug,make,model,generation,year_from,year_to\n"
+                "disc-2,Skoda,Octavia,,2014,2020\n"
+            )
+        call_command("import_fitment", path, stdout=StringIO(), stderr=StringIO())
+
+        mk7 = VehicleGeneration.objects.get(name="Mk7")
+        self.assertEqual((mk7.year_from, mk7.year_to), (2012, 2017))
+        octavia = VehicleGeneration.objects.get(model__slug="octavia")
+        self.assertEqual((octavia.year_from, octavia.year_to), (2013, 2020))
+
+
+class PopularityTests(TestCase):
+    def setUp(self):
+        brand = Brand.objects.create(name="Brembo", slug="brembo")
+        category = Category.objects.create(name="Discs", slug="discs")
+        self.product = Product.objects.create(
+            name="Disc", slug="disc", brand=brand, category=category, price=Decimal("10.00")
+        )
+
+    @skipUnless(fakeredis, "fakeredis is not installed")
+    @override_settings(PRODUCT_VIEWS_BACKEND="redis", POPULARITY_VIEW_WEIGHT=0.5)
+    def test_views_are_buffered_and_flushed_in_batches(self):
+        redis = fakeredis.FakeRedis(decode_responses=True)
+        with patch("catalog.popularity.get_redis", return_value=redis):
+            for _ in range(3):
+                self.client.get(f"/api/products/{self.product.id}/")
+            self.client.get(f"/api/products/by-slug/{self.product.slug}/")
+
+            self.assertEqual(redis.hget(VIEWS_KEY, str(self.product.id)), "4")
+            self.assertEqual(Product.objects.get().view_score, 0)
+
+            self.assertEqual(flush_product_views(), 4)
+            self.assertEqual(flush_product_views(), 0)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.view_score, 4)
+        self.assertEqual(self.product.popularity, 2)
+        self.assertFalse(redis.exists(VIEWS_KEY))
+
+    @skipUnless(fakeredis, "fakeredis is not installed")
+    @override_settings(POPULARITY_VIEW_WEIGHT=1)
+    def test_overlapping_flushes_apply_a_batch_once(self):
+        redis = fakeredis.FakeRedis(decode_responses=True)
+        redis.hset(VIEWS_KEY, str(self.product.id), 3)
+        overlapping = []
+        increment = popularity._increment
+
+        def increment_during_another_flush(*args):
+            overlapping.append(flush_product_views(client=redis))
+            increment(*args)
+
+        with patch("catalog.popularity._increment", side_effect=increment_during_another_flush):
+            self.assertEqual(flush_product_views(client=redis), 3)
+
+        self.assertEqual(overlapping, [None])
+        self.assertFalse(redis.exists(FLUSHING_KEY))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.view_score, 3)
+        self.assertEqual(flush_product_views(client=redis), 0)
+
+    def test_decay_halves_scores_every_half_life(self):
+        Product.objects.update(sales_score=8, view_score=2, popularity=8.1)
+        updated_at = Product.objects.get().updated_at
+
+        decay_popularity(half_life_days=1)
+
+        self.product.refresh_from_db()
+        self.assertAlmostEqual(self.product.sales_score, 4)
+        self.assertAlmostEqual(self.product.popularity, 4.05)
+        self.assertEqual(self.product.updated_at, updated_at)
+
+
+class HistogramFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        brand = Brand.objects.create(name="Brembo", slug="brembo")
+        self.category = Category.objects.create(name="Discs", slug="discs")
+        self.diameter = CategoryAttribute.objects.create(
+            category=self.category,
+            name="Diameter",
+            data_type=CategoryAttribute.DataType.NUMBER,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            for index, (price, size) in enumerate([(10, 280), (20, 280), (30, 300), (100, 320)]):
+                product = Product.objects.create(
+                    name=f"Disc {index}",
+                    slug=f"disc-{index}",
+                    brand=brand,
+                    category=self.category,
+                    price=Decimal(price),
+                )
+                ProductAttributeValue.objects.create(
+                    product=product, attribute=self.diameter, value_number=Decimal(size)
+                )
+        Product.objects.create(
+            name="No size", slug="no-size", brand=brand, category=self.category, price=Decimal("55")
+        )
+        self.products = Product.objects.filter(category=self.category)
+
+    def test_equal_width_buckets_for_price_and_attributes_in_one_query(self):
+        with self.assertNumQueries(1):
+            histograms = numeric_histograms(self.products, [self.diameter.id], buckets=3)
+
+        price = histograms["price"]
+        self.assertEqual((price["min"], price["max"]), (10.0, 100.0))
+        self.assertEqual([bucket["count"] for bucket in price["buckets"]], [3, 1, 1])
+        self.assertEqual(price["buckets"][1]["from"], 40.0)
+        self.assertEqual(price["buckets"][2]["to"], 100.0)
+        diameter = histograms[self.diameter.id]
+        self.assertEqual([bucket["count"] for bucket in diameter["buckets"]], [2, 1, 1])
+
+    def test_quantile_buckets(self):
+        histograms = numeric_histograms(self.products, mode="quantile", buckets=2)
+
+        self.assertEqual(
+            histograms["price"]["buckets"],
+            [
+                {"from": 10.0, "to": 30.0, "count": 3},
+                {"from": 55.0, "to": 100.0, "count": 2},
+            ],
+        )
+
+    def test_cached_until_category_version_changes(self):
+        category_ids = [self.category.id]
+        cached_category_histograms(category_ids, self.products)
+
+        with self.assertNumQueries(0):
+            cached_category_histograms(category_ids, self.products)
+
+        products_changed.send(sender=Product, product_ids=[], category_ids=category_ids)
+        with self.assertNumQueries(1):
+            cached_category_histograms(category_ids, self.products)
+
+    def test_saving_a_single_product_or_value_invalidates_its_categories(self):
+        category_ids = [self.category.id]
+        before = cached_category_histograms(category_ids, self.products, [self.diameter.id])
+        product = Product.objects.get(slug="disc-3")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.price = Decimal("200")
+            product.save()
+        after = cached_category_histograms(category_ids, self.products, [self.diameter.id])
+        self.assertEqual(before["price"]["max"], 100.0)
+        self.assertEqual(after["price"]["max"], 200.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductAttributeValue.objects.filter(product=product).get().delete()
+        after = cached_category_histograms(category_ids, self.products, [self.diameter.id])
+        self.assertEqual(after[self.diameter.id]["max"], 300.0)
+
+        other = Category.objects.create(name="Drums", slug="drums")
+        version = category_version(self.category.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.category = other
+            product.save()
+        self.assertEqual(category_version(self.category.id), version + 1)
+
+
+class CatalogMetadataTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        METADATA_CACHE.evict()
+
+    def tearDown(self):
+        # Other tests must not inherit this process-wide snapshot.
+        cache.clear()
+        METADATA_CACHE.evict()
+
+    def test_snapshot_is_reused_until_categories_or_attributes_change(self):
+        tools = Category.objects.create(name="Tools", slug="tools")
+        Category.objects.create(name="Hidden", slug="hidden", is_active=False)
+
+        first = catalog_metadata()
+        self.assertEqual([category.slug for category in first.categories], ["tools"])
+        with self.assertNumQueries(0):
+            self.assertIs(catalog_metadata(), first)
+
+        attribute = CategoryAttribute.objects.create(
+            category=tools, name="Length", data_type=CategoryAttribute.DataType.NUMBER
+        )
+        refreshed = catalog_metadata()
+        self.assertIsNot(refreshed, first)
+        self.assertEqual(list(refreshed.attributes[tools.id]), [attribute])
+
+        Category.objects.filter(pk=tools.pk).update(is_active=False)
+        self.assertIs(catalog_metadata(), refreshed)
+        reference_data_changed.send(sender=Category)
+        self.assertEqual(catalog_metadata().categories, ())
+
+    def test_snapshot_read_inside_a_transaction_is_not_kept(self):
+        first = catalog_metadata()
+        with transaction.atomic():
+            Category.objects.create(name="Draft", slug="draft")
+            inside = catalog_metadata()
+            self.assertEqual([category.slug for category in inside.categories], ["draft"])
+            transaction.set_rollback(True)
+
+        self.assertIs(catalog_metadata(), first)
+
+    def test_brands_are_cached_until_a_brand_changes(self):
+        BRANDS_CACHE.evict()
+        self.addCleanup(BRANDS_CACHE.evict)
+        acme = Brand.objects.create(name="Acme", slug="acme")
+
+        first = brands()
+        self.assertEqual(list(first), [acme])
+        with self.assertNumQueries(0):
+            self.assertIs(brands(), first)
+
+        Brand.objects.filter(pk=acme.pk).update(name="Acme Tools")
+        self.assertEqual(brands()[0].name, "Acme")
+        acme.refresh_from_db()
+        acme.save()
+        self.assertEqual(brands()[0].name, "Acme Tools")
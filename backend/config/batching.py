@@ -0,0 +1,161 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+
+from storage.redis_client import acquire_lock, get_redis, release_lock
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "batch"
+# Extra lifetime of the "flush scheduled" marker, so a flush task lost by the
+# broker only delays the batch until the next event rather than forever.
+SCHEDULE_GRACE_SECONDS = 60
+FLUSH_LOCK_SECONDS = 300
+FLUSH_MAX_RETRIES = 5
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class CoalescingBatch:
+    """
+    Buffers ids in a Redis set (so repeats collapse) and hands them to
+    ``handler`` from one Celery task per window: the first id of a window
+    schedules a flush ``window`` seconds later, and a buffer that reaches
+    ``max_size`` is flushed right away. ``handler`` receives a sorted list of
+    at most ``max_size`` ints per call and must be idempotent: a failed flush
+    is retried with the same ids, and after ``FLUSH_MAX_RETRIES`` failed
+    retries they are parked in a dead-letter set so later ids keep flowing.
+    """
+
+    def __init__(self, handler, *, name, window=None, max_size=None, queue=None):
+        self.handler = handler
+        self.name = name
+        self.window = window if window is not None else settings.BATCH_WINDOW_SECONDS
+        self.max_size = max_size or settings.BATCH_MAX_SIZE
+        self.queue = queue
+        self.pending_key = f"{KEY_PREFIX}:{name}:pending"
+        self.flushing_key = f"{KEY_PREFIX}:{name}:flushing"
+        self.scheduled_key = f"{KEY_PREFIX}:{name}:scheduled"
+        self.full_key = f"{KEY_PREFIX}:{name}:full"
+        self.lock_key = f"{KEY_PREFIX}:{name}:lock"
+        self.attempts_key = f"{KEY_PREFIX}:{name}:attempts"
+        self.dead_key = f"{KEY_PREFIX}:{name}:dead"
+
+        @shared_task(name=name, bind=True, ignore_result=True, max_retries=FLUSH_MAX_RETRIES)
+        def flush_task(task):
+            try:
+                return self.flush()
+            except Exception as exc:
+                raise task.retry(exc=exc, countdown=self.window)
+
+        self.flush_task = flush_task
+
+    def __call__(self, ids):
+        return self.handler(ids)
+
+    def schedule(self, countdown=None):
+        self.flush_task.apply_async(countdown=countdown, queue=self.queue)
+
+    def add(self, *ids, client=None):
+        """
+        Buffer ``ids`` and make sure a flush is on its way.
+        """
+
+        if not ids:
+            return
+        client = client or get_redis()
+        with client.pipeline() as pipe:
+            pipe.sadd(self.pending_key, *ids)
+            pipe.scard(self.pending_key)
+            pipe.set(self.scheduled_key, 1, nx=True, ex=int(self.window) + SCHEDULE_GRACE_SECONDS)
+            _, size, opened_window = pipe.execute()
+        if opened_window:
+            self.schedule(countdown=self.window)
+        if size >= self.max_size and client.set(self.full_key, 1, nx=True, ex=SCHEDULE_GRACE_SECONDS):
+            self.schedule()
+
+    def flush(self, client=None):
+        """
+        Hand everything buffered so far to ``handler``, after the batch left
+        behind by an interrupted or failed flush, if any. Returns the number
+        of ids, or None when another flush holds the lock (this one is then
+        rescheduled).
+        """
+
+        client = client or get_redis()
+        token = acquire_lock(client, self.lock_key, FLUSH_LOCK_SECONDS)
+        if token is None:
+            self.schedule(countdown=self.window)
+            return None
+        try:
+            # Events from here on open a new window.
+            client.delete(self.scheduled_key, self.full_key)
+            flushed = 0
+            if client.exists(self.flushing_key):
+                flushed += self._flush_batch(client)
+            if client.exists(self.pending_key):
+                client.rename(self.pending_key, self.flushing_key)
+                flushed += self._flush_batch(client)
+            return flushed
+        finally:
+            release_lock(client, self.lock_key, token)
+
+    def _flush_batch(self, client):
+        ids = sorted(int(member) for member in client.smembers(self.flushing_key))
+        try:
+            for chunk in _chunks(ids, self.max_size):
+                self.handler(chunk)
+        except Exception:
+            if client.incr(self.attempts_key) <= FLUSH_MAX_RETRIES:
+                raise
+            logger.exception(
+                "Batch %s: moving %d ids to %s after failed retries",
+                self.name,
+                len(ids),
+                self.dead_key,
+            )
+            with client.pipeline() as pipe:
+                pipe.sunionstore(self.dead_key, [self.dead_key, self.flushing_key])
+                pipe.delete(self.flushing_key, self.attempts_key)
+                pipe.execute()
+            return 0
+        client.delete(self.flushing_key, self.attempts_key)
+        return len(ids)
+
+    def requeue_dead_letters(self, client=None):
+        """
+        Move dead-lettered ids back into the buffer, once ``handler`` is fixed.
+        Returns the number of ids.
+        """
+
+        client = client or get_redis()
+        with client.pipeline() as pipe:
+            pipe.scard(self.dead_key)
+            pipe.sunionstore(self.pending_key, [self.pending_key, self.dead_key])
+            pipe.delete(self.dead_key)
+            count, _, _ = pipe.execute()
+        if count:
+            self.schedule()
+        return count
+
+
+def coalescing_batch(*, name=None, window=None, max_size=None, queue=None):
+    """
+    Turn ``handler(ids)`` into a ``CoalescingBatch``; call ``.add(*ids)`` on
+    the result to submit events and use it directly to run the handler now.
+    """
+
+    def decorator(handler):
+        return CoalescingBatch(
+            handler,
+            name=name or f"{handler.__module__}.{handler.__name__}",
+            window=window,
+            max_size=max_size,
+            queue=queue,
+        )
+
+    return decorator
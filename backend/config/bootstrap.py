@@ -0,0 +1,98 @@
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections
+from django.db.migrations.executor import MigrationExecutor
+
+# Same defaults as ``collectstatic``.
+STATIC_IGNORE_PATTERNS = ["CVS", ".*", "*~"]
+STATIC_DIGEST_FILE = ".collectstatic.sha256"
+
+
+def reset_multiprocess_dir():
+    # Metric files from a previous run would be merged into /metrics.
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        return None
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+    return f"Metrics: reset {path}"
+
+
+def pending_migrations(database=DEFAULT_DB_ALIAS):
+    connection = connections[database]
+    connection.prepare_database()
+    executor = MigrationExecutor(connection)
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+def migrate(database=DEFAULT_DB_ALIAS):
+    plan = pending_migrations(database)
+    if not plan:
+        return "Migrations: up to date"
+    call_command("migrate", database=database, interactive=False, verbosity=0)
+    return f"Migrations: applied {len(plan)}"
+
+
+def static_sources_digest():
+    """
+    Hash of the storage backend and of the path, size and mtime of every
+    file ``collectstatic`` would copy.
+    """
+
+    entries = []
+    for finder in get_finders():
+        for path, storage in finder.list(STATIC_IGNORE_PATTERNS):
+            stat = os.stat(storage.path(path))
+            entries.append(f"{storage.location}\0{path}\0{stat.st_size}\0{stat.st_mtime_ns}")
+    digest = hashlib.sha256(settings.STORAGES["staticfiles"]["BACKEND"].encode())
+    for entry in sorted(entries):
+        digest.update(entry.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def collect_static():
+    """
+    Run ``collectstatic`` unless ``STATIC_ROOT`` was collected from the same
+    sources before (the digest is kept next to the collected files).
+    """
+
+    digest_path = Path(settings.STATIC_ROOT) / STATIC_DIGEST_FILE
+    digest = static_sources_digest()
+    if digest_path.exists() and digest_path.read_text().strip() == digest:
+        return "Static files: unchanged"
+    call_command("collectstatic", interactive=False, verbosity=0)
+    digest_path.parent.mkdir(parents=True, exist_ok=True)
+    digest_path.write_text(digest)
+    return "Static files: collected"
+
+
+def ensure_superuser():
+    from django.contrib.auth import get_user_model
+
+    username = os.getenv("DJANGO_SUPERUSER_USERNAME")
+    email = os.getenv("DJANGO_SUPERUSER_EMAIL")
+    password = os.getenv("DJANGO_SUPERUSER_PASSWORD")
+    if not (username and email and password):
+        return "Superuser env vars not fully set; skipping superuser creation"
+
+    User = get_user_model()
+    try:
+        user, created = User.objects.get_or_create(
+            username=username,
+            defaults={"email": email, "is_superuser": True, "is_staff": True},
+        )
+    except IntegrityError as exc:
+        return f"Superuser creation failed: {exc}"
+    if not created:
+        return f"Superuser '{username}' already exists; skipping creation"
+    user.set_password(password)
+    user.save()
+    return f"Superuser '{username}' created"
+
@@ -1,6 +1,7 @@
 import os
 
 from celery import Celery
+from celery.signals import worker_init
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
@@ -12,3 +13,27 @@ app.autodiscover_tasks()
 @app.task
 def ping():
     return "pong"
+
+
+def queue_prefetch_multiplier(queues, prefetch):
+    """
+    Prefetch multiplier for a worker consuming ``queues``: the lowest one
+    configured for them, so a worker that also takes long tasks never hoards
+    them. None when none of the queues is configured.
+    """
+
+    values = [prefetch[queue] for queue in queues if queue in prefetch]
+    return min(values) if values else None
+
+
+@worker_init.connect
+def tune_prefetch(sender, **kwargs):
+    from django.conf import settings
+
+    # An explicit --prefetch-multiplier differs from the configured default.
+    if sender.prefetch_multiplier != sender.app.conf.worker_prefetch_multiplier:
+        return
+    consumed = sender.app.amqp.queues.consume_from or sender.app.amqp.queues
+    multiplier = queue_prefetch_multiplier(list(consumed), settings.CELERY_QUEUE_PREFETCH)
+    if multiplier:
+        sender.prefetch_multiplier = multiplier
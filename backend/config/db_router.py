@@ -0,0 +1,162 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+PIN_COOKIE = "db_primary_until"
+PIN_CACHE_PREFIX = "db-pin:user"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Zero when the replica has replayed everything it received (an idle primary
+# would otherwise look like growing lag), else seconds since the last replay.
+REPLICA_LAG_SQL = (
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class RoutingState:
+    """
+    Per-request routing decision. It is mutated rather than replaced so that
+    worker threads started from the request (which copy the context) see it.
+    """
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+
+_state = ContextVar("db_routing_state", default=None)
+_health = {}
+
+
+def replica_lag(alias):
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(REPLICA_LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def replica_is_healthy(alias):
+    """
+    Whether ``alias`` answers and lags less than ``REPLICA_MAX_LAG_SECONDS``;
+    the answer is remembered per process for ``REPLICA_HEALTH_CHECK_INTERVAL``.
+    """
+
+    now = time.monotonic()
+    checked = _health.get(alias)
+    if checked and now - checked[0] < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+        return checked[1]
+    try:
+        healthy = replica_lag(alias) <= settings.REPLICA_MAX_LAG_SECONDS
+    except DatabaseError:
+        healthy = False
+        connections[alias].close()
+    _health[alias] = (now, healthy)
+    return healthy
+
+
+def choose_replica():
+    healthy = [alias for alias in settings.REPLICA_DATABASE_ALIASES if replica_is_healthy(alias)]
+    return random.choice(healthy) if healthy else None
+
+
+def primary_pinned(request):
+    try:
+        until = float(request.COOKIES.get(PIN_COOKIE, 0))
+    except ValueError:
+        until = 0
+    if until > time.time():
+        return True
+    user = getattr(request, "user", None)
+    return bool(user is not None and user.is_authenticated and cache.get(f"{PIN_CACHE_PREFIX}:{user.pk}"))
+
+
+def pin_to_primary(request, response):
+    seconds = settings.REPLICA_PIN_SECONDS
+    response.set_cookie(
+        PIN_COOKIE,
+        str(int(time.time()) + seconds),
+        max_age=seconds,
+        httponly=True,
+        samesite="Lax",
+        secure=settings.SESSION_COOKIE_SECURE,
+    )
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        cache.set(f"{PIN_CACHE_PREFIX}:{user.pk}", 1, seconds)
+
+
+def route_reads_to_replica(request):
+    """
+    Let the rest of this request read from a healthy replica, unless it is
+    not a safe method, has already written, or the client recently wrote.
+    """
+
+    state = _state.get()
+    if state is None or request.method not in SAFE_METHODS or state.wrote:
+        return
+    if primary_pinned(request):
+        return
+    state.replica = choose_replica()
+
+
+class PrimaryReplicaRouter:
+    """
+    Reads go to the replica picked for the current request, if any; writes
+    and everything outside a routed request use the primary. A write also
+    sends the remaining reads of that request back to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.wrote:
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASE_ALIASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.REPLICA_DATABASE_ALIASES:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Opens the routing state for each request and pins a client that wrote to
+    the primary for ``REPLICA_PIN_SECONDS`` (cookie, plus a cache key for
+    authenticated users whose clients do not keep cookies).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REPLICA_DATABASE_ALIASES:
+            return self.get_response(request)
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            pin_to_primary(request, response)
+        return response
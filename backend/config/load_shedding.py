@@ -0,0 +1,151 @@
+import threading
+import time
+
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from metrics.collectors import HTTP_SHED_REQUESTS
+
+CRITICAL = "critical"
+DEFAULT = "default"
+LOW = "low"
+
+CRITICAL_PATHS = ("/api/orders/", "/api/carts/", "/api/cart-items/", "/api/token/")
+CATALOG_PATHS = ("/api/catalog-page/",)
+SEARCH_PATH = "/api/products/"
+
+# Weight of the newest sample in the latency average.
+LATENCY_WEIGHT = 0.2
+# Multiplicative decrease of the limit after a slow response.
+BACKOFF = 0.9
+
+
+def _is_anonymous(request):
+    # JWT is checked by DRF after the middleware; a signature check is enough here.
+    scheme, _, raw = request.META.get("HTTP_AUTHORIZATION", "").partition(" ")
+    if scheme == "Bearer" and raw:
+        try:
+            AccessToken(raw)
+            return False
+        except TokenError:
+            pass
+    user = getattr(request, "user", None)
+    return not (user and user.is_authenticated)
+
+
+def route_class(request):
+    """
+    ``CRITICAL`` for checkout (carts, orders, login), ``LOW`` for anonymous
+    catalog pages and product searches, ``DEFAULT`` for everything else.
+    """
+
+    path = request.path_info
+    if path.startswith(CRITICAL_PATHS):
+        return CRITICAL
+    expensive = path.startswith(CATALOG_PATHS) or (path == SEARCH_PATH and request.GET.get("search"))
+    if request.method == "GET" and expensive and _is_anonymous(request):
+        return LOW
+    return DEFAULT
+
+
+class RouteClass:
+    """
+    In-flight requests and average latency of one route class in this
+    process. With a ``target`` latency, admission is limited to ``limit``
+    concurrent requests, adjusted AIMD-style: each response slower than the
+    target cuts the limit by ``BACKOFF`` (down to ``minimum``), each faster
+    one raises it by ``1 / limit`` (up to ``maximum``).
+    """
+
+    def __init__(self, name, *, target=None, minimum=1, maximum=None):
+        self.name = name
+        self.target = target
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = maximum
+        self.in_flight = 0
+        self.latency = 0.0
+        self.updated = None
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.limit is not None and self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, elapsed):
+        with self._lock:
+            self.in_flight -= 1
+            if self.updated is None:
+                self.latency = elapsed
+            else:
+                self.latency += LATENCY_WEIGHT * (elapsed - self.latency)
+            self.updated = time.monotonic()
+            if self.target is None:
+                return
+            if elapsed > self.target:
+                self.limit = max(self.minimum, self.limit * BACKOFF)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def slower_than(self, seconds, window):
+        """
+        Whether the average latency over responses from the last ``window``
+        seconds exceeds ``seconds``; a class that has gone quiet is not slow.
+        """
+
+        with self._lock:
+            recent = self.updated is not None and time.monotonic() - self.updated < window
+            return recent and self.latency > seconds
+
+
+class LoadSheddingMiddleware:
+    """
+    Answers low-priority requests (``route_class``) with 503 and
+    ``Retry-After`` when this process already runs as many of them as their
+    adaptive limit allows, or while checkout responses are slower than
+    ``LOAD_SHEDDING_CRITICAL_LATENCY_MS``, so crawler bursts cannot occupy
+    every worker thread. Other requests are only measured.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = settings.LOAD_SHEDDING_ENABLED
+        self.critical_latency = settings.LOAD_SHEDDING_CRITICAL_LATENCY_MS / 1000
+        self.window = settings.LOAD_SHEDDING_WINDOW_SECONDS
+        self.retry_after = settings.LOAD_SHEDDING_RETRY_AFTER
+        self.classes = {
+            CRITICAL: RouteClass(CRITICAL),
+            DEFAULT: RouteClass(DEFAULT),
+            LOW: RouteClass(
+                LOW,
+                target=settings.LOAD_SHEDDING_TARGET_LATENCY_MS / 1000,
+                minimum=settings.LOAD_SHEDDING_MIN_CONCURRENCY,
+                maximum=settings.LOAD_SHEDDING_MAX_CONCURRENCY,
+            ),
+        }
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+        name = route_class(request)
+        route = self.classes[name]
+        if name == LOW and self.classes[CRITICAL].slower_than(self.critical_latency, self.window):
+            return self.shed(name)
+        if not route.acquire():
+            return self.shed(name)
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            route.release(time.perf_counter() - started)
+
+    def shed(self, name):
+        HTTP_SHED_REQUESTS.labels(name).inc()
+        response = JsonResponse({"detail": "Server is busy, please retry later."}, status=503)
+        response["Retry-After"] = str(self.retry_after)
+        return response
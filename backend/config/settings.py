@@ -3,6 +3,8 @@ from datetime import timedelta
 from pathlib import Path
 from urllib.parse import urlparse
 
+from celery.schedules import crontab
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
@@ -33,6 +35,8 @@ INSTALLED_APPS = [
     "orders",
     "shipping",
     "payments",
+    "metrics",
+    "benchmarks",
     "storages",
     'django.contrib.admin',
     'django.contrib.auth',
@@ -45,14 +49,17 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "users.User"
 
 MIDDLEWARE = [
+    "metrics.middleware.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    "config.load_shedding.LoadSheddingMiddleware",
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    "config.db_router.ReplicaRoutingMiddleware",
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -88,34 +95,32 @@ postgres_env = {
     "PORT": os.getenv("POSTGRES_PORT", "5432"),
 }
 
-if DATABASE_URL:
-    parsed = urlparse(DATABASE_URL)
+
+def database_from_url(url):
+    parsed = urlparse(url)
     if parsed.scheme in ("postgres", "postgresql"):
-        DATABASES = {
-            "default": {
-                "ENGINE": "django.db.backends.postgresql",
-                "NAME": parsed.path.lstrip("/"),
-                "USER": parsed.username,
-                "PASSWORD": parsed.password,
-                "HOST": parsed.hostname,
-                "PORT": parsed.port or "",
-            }
+        return {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": parsed.path.lstrip("/"),
+            "USER": parsed.username,
+            "PASSWORD": parsed.password,
+            "HOST": parsed.hostname,
+            "PORT": parsed.port or "",
         }
-    elif parsed.scheme == "sqlite":
+    if parsed.scheme == "sqlite":
         db_path = parsed.path
-        DATABASES = {
-            "default": {
-                "ENGINE": "django.db.backends.sqlite3",
-                "NAME": db_path if db_path.startswith("/") else BASE_DIR / db_path,
-            }
-        }
-    else:
-        DATABASES = {
-            "default": {
-                "ENGINE": "django.db.backends.sqlite3",
-                "NAME": BASE_DIR / "db.sqlite3",
-            }
+        return {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": db_path if db_path.startswith("/") else BASE_DIR / db_path,
         }
+    return {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+    }
+
+
+if DATABASE_URL:
+    DATABASES = {"default": database_from_url(DATABASE_URL)}
 elif postgres_env["NAME"] and postgres_env["USER"] and postgres_env["PASSWORD"]:
     DATABASES = {
         "default": {
@@ -135,6 +140,27 @@ else:
         }
     }
 
+# Read replicas: comma-separated URLs in the DATABASE_URL format, exposed as
+# "replica1", "replica2", ... Read-only catalog endpoints read from a healthy
+# replica whose lag is below REPLICA_MAX_LAG_SECONDS (checked at most every
+# REPLICA_HEALTH_CHECK_INTERVAL seconds); a client that wrote is kept on the
+# primary for REPLICA_PIN_SECONDS.
+REPLICA_DATABASE_ALIASES = []
+for index, url in enumerate(
+    (url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()), start=1
+):
+    alias = f"replica{index}"
+    DATABASES[alias] = {**database_from_url(url), "TEST": {"MIRROR": "default"}}
+    if DATABASES[alias]["ENGINE"] == "django.db.backends.postgresql":
+        # A replica that is down must fail fast so reads fall back to the primary.
+        DATABASES[alias]["OPTIONS"] = {"connect_timeout": int(os.getenv("REPLICA_CONNECT_TIMEOUT", "2"))}
+    REPLICA_DATABASE_ALIASES.append(alias)
+
+DATABASE_ROUTERS = ["config.db_router.PrimaryReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "15"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv("REPLICA_HEALTH_CHECK_INTERVAL", "5"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -201,6 +227,16 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    # Redis token buckets (api.throttling.TokenBucketThrottle) per user or
+    # client IP: "<n>/<s|min|hour|day>" allows bursts of n requests refilled
+    # over the period; an empty rate disables the scope.
+    "DEFAULT_THROTTLE_RATES": {
+        "catalog": os.getenv("THROTTLE_CATALOG_RATE") or None,
+        "search": os.getenv("THROTTLE_SEARCH_RATE") or None,
+    },
+    # Proxies in front of gunicorn (nginx): the client IP is taken from
+    # X-Forwarded-For counting back this many hops.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "1")),
 }
 
 CORS_ALLOWED_ORIGINS = []
@@ -220,3 +256,156 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
+# Dedicated queues per workload class so a burst of one never waits behind
+# another: run a worker per queue (celery -A config worker -Q media). Its
+# prefetch multiplier comes from CELERY_QUEUE_PREFETCH unless given with
+# --prefetch-multiplier; long tasks take one message at a time.
+CELERY_TASK_DEFAULT_QUEUE = "default"
+CELERY_TASK_ROUTES = {
+    "catalog.tasks.ingest_product_images": {"queue": "media"},
+    "catalog.tasks.generate_catalog_feed": {"queue": "exports"},
+}
+CELERY_QUEUE_PREFETCH = {
+    "default": 4,
+    "media": 1,
+    "exports": 1,
+    "indexing": 8,
+}
+# Coalescing batches (config.batching) flush BATCH_WINDOW_SECONDS after their
+# first buffered id, or at once when BATCH_MAX_SIZE distinct ids are waiting.
+BATCH_WINDOW_SECONDS = float(os.getenv("BATCH_WINDOW_SECONDS", "5"))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "1000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/2")
+
+CACHE_URL = os.getenv("CACHE_URL")
+# Django's backends with hit/miss counters for /metrics.
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "metrics.cache.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "metrics.cache.LocMemCache",
+        }
+    }
+
+# Two-tier cache (storage.tiered_cache) for small reference data: a per-process
+# LRU in front of CACHES["default"]. Invalidations reach other processes over
+# Redis pub/sub (REDIS_URL) when TIERED_CACHE_BROADCAST is on; L1 entries
+# expire after TIERED_CACHE_L1_TIMEOUT seconds either way.
+TIERED_CACHE_BROADCAST = os.getenv(
+    "TIERED_CACHE_BROADCAST", "True" if CACHE_URL else "False"
+).lower() in ("1", "true", "yes")
+TIERED_CACHE_L1_TIMEOUT = int(os.getenv("TIERED_CACHE_L1_TIMEOUT", "60"))
+TIERED_CACHE_L1_MAXSIZE = int(os.getenv("TIERED_CACHE_L1_MAXSIZE", "1024"))
+TIERED_CACHE_TIMEOUT = int(os.getenv("TIERED_CACHE_TIMEOUT", "3600"))
+
+# Load shedding (config.load_shedding): per process, anonymous catalog and
+# search requests beyond an adaptive concurrency limit (between MIN and MAX,
+# lowered while they take longer than TARGET_LATENCY_MS), or while checkout
+# requests average more than CRITICAL_LATENCY_MS, get 503 + Retry-After.
+# gunicorn.conf.py sets MAX to its threads - 1 when left empty.
+LOAD_SHEDDING_ENABLED = os.getenv("LOAD_SHEDDING_ENABLED", "True").lower() in ("1", "true", "yes")
+LOAD_SHEDDING_MAX_CONCURRENCY = int(os.getenv("LOAD_SHEDDING_MAX_CONCURRENCY") or "4")
+LOAD_SHEDDING_MIN_CONCURRENCY = int(os.getenv("LOAD_SHEDDING_MIN_CONCURRENCY", "1"))
+LOAD_SHEDDING_TARGET_LATENCY_MS = int(os.getenv("LOAD_SHEDDING_TARGET_LATENCY_MS", "750"))
+LOAD_SHEDDING_CRITICAL_LATENCY_MS = int(os.getenv("LOAD_SHEDDING_CRITICAL_LATENCY_MS", "1000"))
+LOAD_SHEDDING_WINDOW_SECONDS = int(os.getenv("LOAD_SHEDDING_WINDOW_SECONDS", "10"))
+LOAD_SHEDDING_RETRY_AFTER = int(os.getenv("LOAD_SHEDDING_RETRY_AFTER", "2"))
+
+# Prometheus metrics are served on /metrics (Bearer METRICS_TOKEN when set).
+# Gunicorn and Celery workers need PROMETHEUS_MULTIPROC_DIR pointing at an
+# empty shared directory; a Celery worker serves its own metrics on
+# CELERY_METRICS_PORT when set.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+CELERY_METRICS_PORT = int(os.getenv("CELERY_METRICS_PORT", "0"))
+
+# "redis" keeps anonymous carts in Redis until login or checkout, identified by
+# a server-issued id in the signed GUEST_CART_COOKIE; with "db" only signed-in
+# users have carts.
+GUEST_CART_BACKEND = os.getenv("GUEST_CART_BACKEND", "db")
+GUEST_CART_TTL = int(os.getenv("GUEST_CART_TTL", str(60 * 60 * 24 * 14)))
+GUEST_CART_COOKIE = os.getenv("GUEST_CART_COOKIE", "guest_cart")
+
+CELERY_BEAT_SCHEDULE = {
+    "archive-old-orders": {
+        "task": "orders.tasks.archive_old_orders",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "catalog-feed-yml-full": {
+        "task": "catalog.tasks.generate_catalog_feed",
+        "schedule": crontab(hour=4, minute=0),
+        "kwargs": {"fmt": "yml"},
+    },
+    "catalog-feed-csv-full": {
+        "task": "catalog.tasks.generate_catalog_feed",
+        "schedule": crontab(hour=4, minute=30),
+        "kwargs": {"fmt": "csv"},
+    },
+    "flush-product-views": {
+        "task": "catalog.tasks.flush_product_view_counts",
+        "schedule": 60.0,
+    },
+    "decay-product-popularity": {
+        "task": "catalog.tasks.decay_product_popularity",
+        "schedule": crontab(hour=2, minute=30),
+    },
+    "refresh-co-purchases": {
+        "task": "orders.tasks.refresh_co_purchases",
+        "schedule": crontab(minute=40),
+    },
+    # Drops orders canceled after they were counted by the hourly runs.
+    "rebuild-co-purchases": {
+        "task": "orders.tasks.refresh_co_purchases",
+        "schedule": crontab(day_of_week=0, hour=4, minute=10),
+        "kwargs": {"full": True},
+    },
+    "catalog-feed-yml-delta": {
+        "task": "catalog.tasks.generate_catalog_feed",
+        "schedule": crontab(minute=15),
+        "kwargs": {"fmt": "yml", "delta": True},
+    },
+}
+
+# Orders older than this horizon (and in a final status) move to the archive table.
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv("ORDER_ARCHIVE_AFTER_DAYS", "365"))
+ORDER_ARCHIVE_CHUNK_SIZE = int(os.getenv("ORDER_ARCHIVE_CHUNK_SIZE", "500"))
+# Archived orders returned per GET /api/orders/?archived=1 page.
+ARCHIVED_ORDERS_PAGE_SIZE = int(os.getenv("ARCHIVED_ORDERS_PAGE_SIZE", "50"))
+
+# Seconds a category's price/attribute histograms stay cached; category version
+# bumps invalidate them earlier.
+FACET_CACHE_TIMEOUT = int(os.getenv("FACET_CACHE_TIMEOUT", "600"))
+
+# Serve catalog reads from async views when running under an ASGI worker
+# (gunicorn -k uvicorn.workers.UvicornWorker config.asgi:application); their
+# queries run concurrently on a pool of CATALOG_QUERY_WORKERS threads per
+# process, each holding its own database connection.
+ASYNC_CATALOG_VIEWS = os.getenv("ASYNC_CATALOG_VIEWS", "False").lower() in ("1", "true", "yes")
+CATALOG_QUERY_WORKERS = int(os.getenv("CATALOG_QUERY_WORKERS", "8"))
+
+# Popularity sort: product-page views are buffered in Redis ("redis") or not
+# tracked ("off"); a view weighs POPULARITY_VIEW_WEIGHT of a unit sold and both
+# halve every POPULARITY_HALF_LIFE_DAYS.
+PRODUCT_VIEWS_BACKEND = os.getenv("PRODUCT_VIEWS_BACKEND", "off")
+POPULARITY_VIEW_WEIGHT = float(os.getenv("POPULARITY_VIEW_WEIGHT", "0.05"))
+POPULARITY_HALF_LIFE_DAYS = float(os.getenv("POPULARITY_HALF_LIFE_DAYS", "14"))
+
+# "Frequently bought together": neighbours kept per product, minimum number of
+# shared orders, and how long new orders settle before they are counted.
+RECOMMENDATIONS_TOP_K = int(os.getenv("RECOMMENDATIONS_TOP_K", "10"))
+RECOMMENDATIONS_MIN_SUPPORT = int(os.getenv("RECOMMENDATIONS_MIN_SUPPORT", "2"))
+RECOMMENDATIONS_SETTLE_HOURS = int(os.getenv("RECOMMENDATIONS_SETTLE_HOURS", "24"))
+
+# Marketplace feeds (YML/CSV) uploaded to MinIO under feeds/
+FEED_SHOP_NAME = os.getenv("FEED_SHOP_NAME", "Carbon69")
+FEED_SHOP_COMPANY = os.getenv("FEED_SHOP_COMPANY", "Carbon69")
+FEED_SHOP_URL = os.getenv("FEED_SHOP_URL", "https://carbon69.ru")
+FEED_PRODUCT_URL_TEMPLATE = os.getenv(
+    "FEED_PRODUCT_URL_TEMPLATE", f"{FEED_SHOP_URL.rstrip('/')}/products/{{slug}}"
+)
+FEED_CURRENCY = os.getenv("FEED_CURRENCY", "RUB")
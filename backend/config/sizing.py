@@ -0,0 +1,62 @@
+import math
+import os
+
+MAX_THREADS = 8
+
+
+def _read(path):
+    try:
+        with open(path) as stream:
+            return stream.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus() -> int:
+    """
+    CPUs this process may use: its affinity mask, further limited by a cgroup
+    CPU quota (containers with ``--cpus``).
+    """
+
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    quota = _read("/sys/fs/cgroup/cpu.max")
+    if quota:
+        limit, _, period = quota.partition(" ")
+        if limit != "max" and period:
+            cpus = min(cpus, math.ceil(int(limit) / int(period)))
+    else:
+        limit = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+        period = _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+        if limit and period and int(limit) > 0:
+            cpus = min(cpus, math.ceil(int(limit) / int(period)))
+    return max(cpus, 1)
+
+
+def available_memory_mb() -> int:
+    """
+    Physical memory, or the cgroup memory limit when it is lower.
+    """
+
+    memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        limit = _read(path)
+        if limit and limit.isdigit():
+            memory = min(memory, int(limit))
+            break
+    return memory // (1024 * 1024)
+
+
+def worker_layout(cpus, memory_mb, worker_memory_mb=256, reserved_memory_mb=256):
+    """
+    Gunicorn ``(workers, threads)`` for a host: the classic ``2 * cpus + 1``
+    workers, capped by how many ``worker_memory_mb`` workers fit next to
+    ``reserved_memory_mb`` for the master and the OS. Each worker runs at least
+    two threads; when memory caps the process count, the threads make up the
+    missing concurrency (up to ``MAX_THREADS``).
+    """
+
+    target = 2 * cpus + 1
+    fit = max((memory_mb - reserved_memory_mb) // worker_memory_mb, 1)
+    workers = max(min(target, fit), 1)
+    threads = min(max(math.ceil(2 * target / workers), 2), MAX_THREADS)
+    return workers, threads
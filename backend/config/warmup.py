@@ -0,0 +1,86 @@
+import inspect
+import logging
+
+from django.apps import apps
+from django.core.cache import close_caches
+from django.db import connections
+from django.urls import get_resolver
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def warm_url_resolver():
+    # Populating the reverse dict compiles every URL pattern.
+    return len(get_resolver().reverse_dict)
+
+
+def warm_model_metadata():
+    models = apps.get_models()
+    for model in models:
+        model._meta.get_fields()
+    return len(models)
+
+
+def warm_serializers():
+    """
+    Build the fields of every API serializer once, which imports the field
+    classes they use and fills the model metadata caches behind them.
+    """
+
+    from api import serializers
+
+    classes = [
+        value
+        for value in vars(serializers).values()
+        if inspect.isclass(value)
+        and issubclass(value, BaseSerializer)
+        and value.__module__ == serializers.__name__
+    ]
+    for serializer_class in classes:
+        serializer_class().fields
+    return len(classes)
+
+
+def warm_s3_client():
+    from storage.minio_client import get_s3_client
+
+    get_s3_client()
+    return 1
+
+
+def warm_catalog_metadata():
+    from catalog.metadata import catalog_metadata
+
+    return len(catalog_metadata().categories)
+
+
+WARMERS = (
+    warm_url_resolver,
+    warm_model_metadata,
+    warm_serializers,
+    warm_s3_client,
+    warm_catalog_metadata,
+)
+
+
+def warm_process():
+    """
+    Build read-mostly per-process structures ahead of the first request; under
+    gunicorn ``preload_app`` this runs in the master so forked workers share
+    them copy-on-write. A failing step is logged and skipped (workers then
+    build that part lazily). Database and cache connections opened on the way
+    are closed again: sockets must not be shared with the workers.
+    """
+
+    results = {}
+    try:
+        for warmer in WARMERS:
+            try:
+                results[warmer.__name__] = warmer()
+            except Exception:
+                logger.warning("Warm-up step %s failed", warmer.__name__, exc_info=True)
+        return results
+    finally:
+        connections.close_all()
+        close_caches()
@@ -0,0 +1,43 @@
+import gc
+import os
+
+from config.sizing import available_cpus, available_memory_mb, worker_layout
+
+# Sized from the cores and memory the container may use unless given
+# explicitly; GUNICORN_WORKER_MEMORY_MB is the expected RSS of one worker.
+_workers, _threads = worker_layout(
+    available_cpus(),
+    available_memory_mb(),
+    worker_memory_mb=int(os.environ.get("GUNICORN_WORKER_MEMORY_MB", "256")),
+    reserved_memory_mb=int(os.environ.get("GUNICORN_RESERVED_MEMORY_MB", "256")),
+)
+workers = int(os.environ.get("GUNICORN_WORKERS") or os.environ.get("WEB_CONCURRENCY") or _workers)
+threads = int(os.environ.get("GUNICORN_THREADS") or _threads)
+# Load shedding keeps one thread per worker free of anonymous catalog traffic.
+if not os.environ.get("LOAD_SHEDDING_MAX_CONCURRENCY"):
+    os.environ["LOAD_SHEDDING_MAX_CONCURRENCY"] = str(max(threads - 1, 1))
+
+# Import the app in the master so workers share its pages copy-on-write.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "True").lower() in ("1", "true", "yes")
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before the first fork.
+    if not server.cfg.preload_app:
+        return
+    from config.warmup import warm_process
+
+    server.log.info("Warmed up: %s", warm_process())
+    # Objects created so far are never collected; otherwise the workers' GC
+    # passes would write to (and so copy) every shared page.
+    gc.collect()
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    # Drop the live-gauge files of a dead worker; its counters and histograms
+    # stay in PROMETHEUS_MULTIPROC_DIR so /metrics totals never go backwards.
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
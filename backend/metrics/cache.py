@@ -0,0 +1,40 @@
+from collections import Counter
+
+from django.core.cache.backends import locmem, redis
+
+from .collectors import CACHE_REQUESTS
+
+_MISSING = object()
+
+
+def key_namespace(key):
+    # The leading non-numeric segments ("catalog:version", "db-pin:user") keep
+    # the label bounded by the code rather than by the data.
+    return ":".join(part for part in str(key).split(":")[:2] if not part.isdigit())
+
+
+class InstrumentedCacheMixin:
+    """
+    Counts hits and misses of ``get`` per key namespace. Backends keep
+    Django's ``get_many``, which goes through ``get``, unless they override it.
+    """
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        hit = value is not _MISSING
+        CACHE_REQUESTS.labels(key_namespace(key), "hit" if hit else "miss").inc()
+        return value if hit else default
+
+
+class LocMemCache(InstrumentedCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class RedisCache(InstrumentedCacheMixin, redis.RedisCache):
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        counts = Counter((key_namespace(key), key in found) for key in keys)
+        for (namespace, hit), count in counts.items():
+            CACHE_REQUESTS.labels(namespace, "hit" if hit else "miss").inc(count)
+        return found
@@ -0,0 +1,74 @@
+from contextvars import ContextVar
+
+from prometheus_client import Counter, Histogram
+
+# Metrics are written to PROMETHEUS_MULTIPROC_DIR when it is set (gunicorn and
+# Celery prefork workers), so every process's samples end up in /metrics.
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template.",
+    ["method", "route", "status"],
+)
+HTTP_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries issued per request.",
+    ["method", "route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+HTTP_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent in database queries per request.",
+    ["method", "route"],
+)
+HTTP_SERIALIZER_SECONDS = Histogram(
+    "http_request_serializer_seconds",
+    "Time spent building serializer output per request.",
+    ["method", "route"],
+)
+CELERY_TASK_SECONDS = Histogram(
+    "celery_task_duration_seconds",
+    "Task run time by final state.",
+    ["task", "state"],
+)
+CELERY_QUEUE_WAIT_SECONDS = Histogram(
+    "celery_task_queue_wait_seconds",
+    "Time between publishing a task and a worker starting it.",
+    ["task"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 15, 30, 60, 300, 900, 3600),
+)
+HTTP_SHED_REQUESTS = Counter(
+    "http_requests_shed_total",
+    "Requests refused by load shedding, by route class.",
+    ["route_class"],
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by key namespace and result.",
+    ["namespace", "result"],
+)
+S3_PRESIGN_SECONDS = Histogram(
+    "s3_presign_duration_seconds",
+    "Time to build a presigned S3 URL, client setup included.",
+    ["operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+
+class RequestStats:
+    """
+    Per-request accumulator; mutated in place so query threads started from
+    the request (which copy the context) add to the same totals.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+
+
+request_stats = ContextVar("metrics_request_stats", default=None)
+
@@ -0,0 +1,78 @@
+import os
+import time
+
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+from rest_framework.serializers import BaseSerializer
+
+from .collectors import request_stats
+
+_serializers_instrumented = False
+
+
+def metrics_registry():
+    """
+    The registry to export: with ``PROMETHEUS_MULTIPROC_DIR`` set, a fresh one
+    that merges the files of every worker process; otherwise this process's.
+    """
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def route_name(request):
+    """
+    Route label for a request: the URL name (``products-detail``), the view's
+    dotted path for unnamed routes, or ``unmatched``. Never the raw path.
+    """
+
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.view_name or match.route
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Connection execute wrapper that adds each query to the current request's
+    totals; outside a request it only calls through.
+    """
+
+    stats = request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def instrument_serializers():
+    """
+    Time ``serializer.data`` for the outermost serializer of a request; nested
+    and list serializers are counted as part of it.
+    """
+
+    global _serializers_instrumented
+    if _serializers_instrumented:
+        return
+    _serializers_instrumented = True
+    original = BaseSerializer.data
+
+    def data(self):
+        stats = request_stats.get()
+        if stats is None or stats.serializer_depth:
+            return original.fget(self)
+        stats.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            stats.serializer_depth -= 1
+            stats.serializer_seconds += time.perf_counter() - started
+
+    BaseSerializer.data = property(data)
@@ -0,0 +1,38 @@
+import time
+
+from .collectors import (
+    HTTP_DB_QUERIES,
+    HTTP_DB_SECONDS,
+    HTTP_REQUEST_SECONDS,
+    HTTP_SERIALIZER_SECONDS,
+    RequestStats,
+    request_stats,
+)
+from .instrumentation import route_name
+
+
+class MetricsMiddleware:
+    """
+    Records latency, database queries and time, and serializer time for each
+    request, labelled by route template rather than path.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            request_stats.reset(token)
+        elapsed = time.perf_counter() - started
+
+        method, route = request.method, route_name(request)
+        HTTP_REQUEST_SECONDS.labels(method, route, str(response.status_code)).observe(elapsed)
+        HTTP_DB_QUERIES.labels(method, route).observe(stats.queries)
+        HTTP_DB_SECONDS.labels(method, route).observe(stats.db_seconds)
+        HTTP_SERIALIZER_SECONDS.labels(method, route).observe(stats.serializer_seconds)
+        return response
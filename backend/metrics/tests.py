@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from catalog.models import Brand
+
+from .signals import stamp_publish_time, task_finished, task_started
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsMiddlewareTests(TestCase):
+    def test_request_is_recorded_under_its_route_name(self):
+        Brand.objects.create(name="Acme", slug="acme")
+        labels = {"method": "GET", "route": "brands-list"}
+        before = {
+            "requests": sample("http_request_duration_seconds_count", status="200", **labels),
+            "queries": sample("http_request_db_queries_sum", **labels),
+            "serialized": sample("http_request_serializer_seconds_count", **labels),
+        }
+
+        response = APIClient().get("/api/brands/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sample("http_request_duration_seconds_count", status="200", **labels),
+            before["requests"] + 1,
+        )
+        self.assertEqual(sample("http_request_db_queries_sum", **labels), before["queries"] + 1)
+        self.assertEqual(
+            sample("http_request_serializer_seconds_count", **labels), before["serialized"] + 1
+        )
+
+    def test_metrics_endpoint_exposes_prometheus_text(self):
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"# TYPE http_request_duration_seconds histogram", response.content)
+        self.assertIn(b"cache_requests_total", response.content)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_endpoint_requires_token_when_configured(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+
+
+class CacheMetricsTests(TestCase):
+    def test_hits_and_misses_are_counted_per_namespace(self):
+        cache.clear()
+        hits = sample("cache_requests_total", namespace="catalog:version", result="hit")
+        misses = sample("cache_requests_total", namespace="catalog:version", result="miss")
+        cache.set("catalog:version:category:1", 3)
+
+        self.assertEqual(cache.get("catalog:version:category:1"), 3)
+        self.assertEqual(cache.get("catalog:version:category:2", "fallback"), "fallback")
+        cache.get_many(["catalog:version:category:1", "catalog:version:category:3"])
+
+        self.assertEqual(sample("cache_requests_total", namespace="catalog:version", result="hit"), hits + 2)
+        self.assertEqual(
+            sample("cache_requests_total", namespace="catalog:version", result="miss"), misses + 2
+        )
+
+
+class CeleryMetricsTests(TestCase):
+    def test_task_duration_and_queue_wait_are_observed(self):
+        headers = {}
+        stamp_publish_time(headers=headers)
+        task = SimpleNamespace(name="catalog.tasks.example", request=SimpleNamespace(**headers))
+        waits = sample("celery_task_queue_wait_seconds_count", task=task.name)
+        runs = sample("celery_task_duration_seconds_count", task=task.name, state="SUCCESS")
+
+        task_started(task_id="t-1", task=task)
+        task_finished(task_id="t-1", task=task, state="SUCCESS")
+
+        self.assertEqual(sample("celery_task_queue_wait_seconds_count", task=task.name), waits + 1)
+        self.assertEqual(
+            sample("celery_task_duration_seconds_count", task=task.name, state="SUCCESS"), runs + 1
+        )
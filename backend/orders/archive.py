@@ -0,0 +1,137 @@
+import logging
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from uuid import UUID
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, Order
+
+logger = logging.getLogger(__name__)
+
+ARCHIVABLE_STATUSES = (
+    Order.Status.DELIVERED,
+    Order.Status.CANCELED,
+    Order.Status.FAILED,
+)
+
+
+def _jsonable(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def _snapshot(instance, exclude=()):
+    return {
+        field.attname: _jsonable(getattr(instance, field.attname))
+        for field in instance._meta.concrete_fields
+        if field.name not in exclude
+    }
+
+
+def _shipment_snapshot(order):
+    try:
+        shipment = order.shipment
+    except ObjectDoesNotExist:
+        return None
+    payload = _snapshot(shipment, exclude=("order",))
+    try:
+        payload["address"] = _snapshot(shipment.address, exclude=("shipment",))
+    except ObjectDoesNotExist:
+        payload["address"] = None
+    return payload
+
+
+def build_archived_order(order):
+    return ArchivedOrder(
+        id=order.id,
+        user_id=order.user_id,
+        status=order.status,
+        subtotal=order.subtotal,
+        shipping_total=order.shipping_total,
+        tax_total=order.tax_total,
+        discount_total=order.discount_total,
+        grand_total=order.grand_total,
+        created_at=order.created_at,
+        updated_at=order.updated_at,
+        items=[_snapshot(item, exclude=("order",)) for item in order.items.all()],
+        payments=[_snapshot(payment, exclude=("order",)) for payment in order.payments.all()],
+        shipment=_shipment_snapshot(order),
+    )
+
+
+def ensure_archive_partitions(years):
+    """
+    Create the yearly range partitions needed for ``years`` (Postgres only).
+    """
+
+    if connection.vendor != "postgresql":
+        return
+    table = ArchivedOrder._meta.db_table
+    with connection.cursor() as cursor:
+        for year in sorted(set(years)):
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table}_y{year}" '
+                f'PARTITION OF "{table}" '
+                f"FOR VALUES FROM ('{year}-01-01 00:00:00+00') "
+                f"TO ('{year + 1}-01-01 00:00:00+00')"
+            )
+
+
+def archive_orders(older_than_days=None, chunk_size=None):
+    """
+    Move finished orders older than the horizon into ``ArchivedOrder`` in chunks.
+    An order is only deleted once its archive row is confirmed; orders whose
+    insert hit a conflicting row are left in place and logged. Returns the
+    number of archived orders.
+    """
+
+    if older_than_days is None:
+        older_than_days = settings.ORDER_ARCHIVE_AFTER_DAYS
+    if chunk_size is None:
+        chunk_size = settings.ORDER_ARCHIVE_CHUNK_SIZE
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    candidates = Order.objects.filter(
+        created_at__lt=cutoff, status__in=ARCHIVABLE_STATUSES
+    ).order_by("id")
+
+    archived = 0
+    skipped = set()
+    while True:
+        with transaction.atomic():
+            orders = list(
+                candidates.exclude(id__in=skipped)
+                .select_for_update(skip_locked=True, of=("self",))
+                .select_related("shipment__address")
+                .prefetch_related("items", "payments")[:chunk_size]
+            )
+            if not orders:
+                break
+            ensure_archive_partitions(
+                order.created_at.astimezone(dt_timezone.utc).year for order in orders
+            )
+            ArchivedOrder.objects.bulk_create(
+                [build_archived_order(order) for order in orders],
+                ignore_conflicts=True,
+            )
+            present = set(
+                ArchivedOrder.objects.filter(id__in=[order.id for order in orders]).values_list(
+                    "id", "created_at"
+                )
+            )
+            moved = [order.id for order in orders if (order.id, order.created_at) in present]
+            Order.objects.filter(id__in=moved).delete()
+        conflicts = {order.id for order in orders} - set(moved)
+        if conflicts:
+            logger.error("Orders %s not archived: conflicting archive rows", sorted(conflicts))
+            skipped |= conflicts
+        archived += len(moved)
+    return archived
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from orders.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = "Move finished orders older than the archive horizon into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-days", type=int, default=None)
+        parser.add_argument("--chunk-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        archived = archive_orders(
+            older_than_days=options["older_than_days"],
+            chunk_size=options["chunk_size"],
+        )
+        self.stdout.write(f"Archived {archived} orders")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from orders.recommendations import refresh_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold new orders into the co-purchase matrix and rebuild frequently-bought-together "
+        "lists. Orders canceled or refunded after being counted stay counted until the next "
+        "--full run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Discard the matrix and rebuild it from every order, archived ones included.",
+        )
+
+    def handle(self, *args, **options):
+        run = refresh_recommendations(full=options["full"])
+        if run is None:
+            self.stderr.write("Another refresh is running")
+            return
+        self.stdout.write(
+            f"Counted {run.orders_counted} orders up to #{run.last_order_id}, "
+            f"ranked {run.products_ranked} products"
+        )
@@ -0,0 +1,121 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+POSTGRES_CREATE_SQL = """
+CREATE TABLE "orders_archivedorder" (
+    "id" bigint NOT NULL,
+    "user_id" {user_type} NULL
+        REFERENCES {user_table} ({user_pk}) DEFERRABLE INITIALLY DEFERRED,
+    "status" varchar(20) NOT NULL,
+    "subtotal" numeric(12, 2) NOT NULL,
+    "shipping_total" numeric(12, 2) NOT NULL,
+    "tax_total" numeric(12, 2) NOT NULL,
+    "discount_total" numeric(12, 2) NOT NULL,
+    "grand_total" numeric(12, 2) NOT NULL,
+    "created_at" timestamp with time zone NOT NULL,
+    "updated_at" timestamp with time zone NOT NULL,
+    "archived_at" timestamp with time zone NOT NULL,
+    "items" jsonb NOT NULL,
+    "payments" jsonb NOT NULL,
+    "shipment" jsonb NULL,
+    PRIMARY KEY ("id", "created_at")
+) PARTITION BY RANGE ("created_at");
+CREATE INDEX "orders_arch_user_created_idx"
+    ON "orders_archivedorder" ("user_id", "created_at" DESC);
+"""
+
+
+def user_column(model, schema_editor):
+    # The column type follows the user model's primary key, as Django's own DDL does.
+    field = model._meta.get_field("user")
+    target = field.target_field
+    quote = schema_editor.quote_name
+    return {
+        "user_type": field.db_type(schema_editor.connection),
+        "user_table": quote(target.model._meta.db_table),
+        "user_pk": quote(target.column),
+    }
+
+
+def create_archive_table(apps, schema_editor):
+    # Postgres gets a range-partitioned table (partitions are added on demand by
+    # orders.archive); every other backend gets a plain table.
+    ArchivedOrder = apps.get_model("orders", "ArchivedOrder")
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(POSTGRES_CREATE_SQL.format(**user_column(ArchivedOrder, schema_editor)))
+    else:
+        schema_editor.create_model(ArchivedOrder)
+
+
+def drop_archive_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute('DROP TABLE IF EXISTS "orders_archivedorder" CASCADE')
+    else:
+        schema_editor.delete_model(apps.get_model("orders", "ArchivedOrder"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="ArchivedOrder",
+                    fields=[
+                        ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                        (
+                            "status",
+                            models.CharField(
+                                choices=[
+                                    ("pending", "Pending"),
+                                    ("paid", "Paid"),
+                                    ("failed", "Failed"),
+                                    ("shipped", "Shipped"),
+                                    ("delivered", "Delivered"),
+                                    ("canceled", "Canceled"),
+                                ],
+                                max_length=20,
+                            ),
+                        ),
+                        ("subtotal", models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                        ("shipping_total", models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                        ("tax_total", models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                        ("discount_total", models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                        ("grand_total", models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                        ("created_at", models.DateTimeField()),
+                        ("updated_at", models.DateTimeField()),
+                        ("archived_at", models.DateTimeField(auto_now_add=True)),
+                        ("items", models.JSONField(default=list)),
+                        ("payments", models.JSONField(default=list)),
+                        ("shipment", models.JSONField(blank=True, null=True)),
+                        (
+                            "user",
+                            models.ForeignKey(
+                                blank=True,
+                                null=True,
+                                on_delete=django.db.models.deletion.SET_NULL,
+                                related_name="archived_orders",
+                                to=settings.AUTH_USER_MODEL,
+                            ),
+                        ),
+                    ],
+                    options={
+                        "indexes": [
+                            models.Index(
+                                fields=["user", "-created_at"],
+                                name="orders_arch_user_created_idx",
+                            )
+                        ],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_archive_table, drop_archive_table),
+    ]
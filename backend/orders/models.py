@@ -33,3 +33,85 @@ class OrderItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
     quantity = models.PositiveIntegerField(default=1)
     price_snapshot = models.DecimalField(max_digits=12, decimal_places=2)
+
+
+class ArchivedOrder(models.Model):
+    """
+    Compact, denormalized copy of an order moved out of the hot tables.
+    On Postgres the table is range-partitioned by ``created_at``.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="archived_orders",
+    )
+    status = models.CharField(max_length=20, choices=Order.Status.choices)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    shipping_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    tax_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    discount_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    grand_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    items = models.JSONField(default=list)
+    payments = models.JSONField(default=list)
+    shipment = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="orders_arch_user_created_idx"),
+        ]
+
+
+class CoPurchaseCount(models.Model):
+    """
+    Sparse product x product co-purchase matrix: the number of counted orders
+    that contain both products. The diagonal (``product == other``) holds the
+    number of orders containing the product.
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "other"], name="orders_copurchase_pair"),
+        ]
+
+
+class FrequentlyBoughtTogether(models.Model):
+    """
+    Top-K co-purchased products per product, ranked by normalized co-occurrence.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="bought_together"
+    )
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "rank"], name="orders_fbt_product_rank"),
+        ]
+
+
+class CoPurchaseRun(models.Model):
+    """
+    One refresh of the co-purchase matrix; ``last_order_id`` is the watermark
+    the next incremental run continues from.
+    """
+
+    is_full = models.BooleanField(default=False)
+    last_order_id = models.BigIntegerField(default=0)
+    orders_counted = models.PositiveIntegerField(default=0)
+    products_ranked = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
@@ -0,0 +1,240 @@
+import heapq
+import math
+from collections import Counter
+from datetime import timedelta
+from itertools import product as cartesian
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Max, Min
+from django.utils import timezone
+
+from catalog.models import Product
+
+from .models import (
+    ArchivedOrder,
+    CoPurchaseCount,
+    CoPurchaseRun,
+    FrequentlyBoughtTogether,
+    Order,
+    OrderItem,
+)
+
+COUNTED_STATUSES = (Order.Status.PAID, Order.Status.SHIPPED, Order.Status.DELIVERED)
+LOCK_KEY = "orders:copurchase:lock"
+ORDER_ID_WINDOW = 5000
+RANK_CHUNK_SIZE = 500
+
+
+def _count_window(low, high):
+    """
+    Add the item pairs of counted orders with ``low < id <= high`` to the
+    matrix in one ``INSERT ... SELECT ... ON CONFLICT`` statement.
+    """
+
+    quote = connection.ops.quote_name
+    counts = quote(CoPurchaseCount._meta.db_table)
+    items = quote(OrderItem._meta.db_table)
+    orders = quote(Order._meta.db_table)
+    statuses = ", ".join(["%s"] * len(COUNTED_STATUSES))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {counts} (product_id, other_id, orders) "
+            f"SELECT a.product_id, b.product_id, COUNT(DISTINCT a.order_id) "
+            f"FROM {items} AS a "
+            f"JOIN {items} AS b ON b.order_id = a.order_id "
+            f"JOIN {orders} AS o ON o.id = a.order_id "
+            f"WHERE a.order_id > %s AND a.order_id <= %s AND o.status IN ({statuses}) "
+            f"GROUP BY a.product_id, b.product_id "
+            f"ON CONFLICT (product_id, other_id) "
+            f"DO UPDATE SET orders = {counts}.orders + excluded.orders",
+            [low, high, *COUNTED_STATUSES],
+        )
+
+
+def _upsert_counts(pairs):
+    quote = connection.ops.quote_name
+    counts = quote(CoPurchaseCount._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {counts} (product_id, other_id, orders) VALUES (%s, %s, %s) "
+            f"ON CONFLICT (product_id, other_id) "
+            f"DO UPDATE SET orders = {counts}.orders + excluded.orders",
+            [(product_id, other_id, orders) for (product_id, other_id), orders in pairs.items()],
+        )
+
+
+def _count_archived(window):
+    """
+    Add the item pairs of counted archived orders to the matrix, ``window``
+    orders at a time, skipping products deleted since. Returns the number of
+    orders counted.
+    """
+
+    counted = 0
+    archived = (
+        ArchivedOrder.objects.filter(status__in=COUNTED_STATUSES)
+        .order_by("id")
+        .values_list("items", flat=True)
+    )
+    baskets = []
+    for items in archived.iterator(chunk_size=window):
+        baskets.append({item["product_id"] for item in items})
+        if len(baskets) == window:
+            counted += _count_baskets(baskets)
+            baskets = []
+    if baskets:
+        counted += _count_baskets(baskets)
+    return counted
+
+
+def _count_baskets(baskets):
+    existing = set(
+        Product.objects.filter(id__in=set().union(*baskets)).values_list("id", flat=True)
+    )
+    pairs = Counter()
+    for basket in baskets:
+        basket &= existing
+        pairs.update(cartesian(basket, basket))
+    with transaction.atomic():
+        _upsert_counts(pairs)
+    return len(baskets)
+
+
+def _neighbours(product_ids):
+    """Products whose pairs include one of ``product_ids``."""
+
+    product_ids = sorted(product_ids)
+    neighbours = set()
+    for start in range(0, len(product_ids), RANK_CHUNK_SIZE):
+        neighbours.update(
+            CoPurchaseCount.objects.filter(
+                other_id__in=product_ids[start:start + RANK_CHUNK_SIZE]
+            ).values_list("product_id", flat=True)
+        )
+    return neighbours
+
+
+def rank_products(product_ids, top_k=None, min_support=None):
+    """
+    Rebuild the top-K lists of ``product_ids``. Pairs are scored by cosine
+    similarity ``c(a, b) / sqrt(c(a) * c(b))`` over order counts.
+    """
+
+    top_k = top_k or settings.RECOMMENDATIONS_TOP_K
+    min_support = min_support or settings.RECOMMENDATIONS_MIN_SUPPORT
+    product_ids = sorted(set(product_ids))
+    ranked = 0
+    for start in range(0, len(product_ids), RANK_CHUNK_SIZE):
+        chunk = product_ids[start:start + RANK_CHUNK_SIZE]
+        pairs = {}
+        for product_id, other_id, orders in CoPurchaseCount.objects.filter(
+            product_id__in=chunk, orders__gte=min_support
+        ).exclude(other_id=F("product_id")).values_list("product_id", "other_id", "orders"):
+            pairs.setdefault(product_id, []).append((other_id, orders))
+        needed = set(chunk)
+        for neighbours in pairs.values():
+            needed.update(other_id for other_id, _ in neighbours)
+        totals = dict(
+            CoPurchaseCount.objects.filter(
+                product_id=F("other_id"), product_id__in=needed
+            ).values_list("product_id", "orders")
+        )
+
+        rows = []
+        for product_id, neighbours in pairs.items():
+            best = heapq.nlargest(
+                top_k,
+                (
+                    (orders / math.sqrt(totals[product_id] * totals[other_id]), orders, -other_id)
+                    for other_id, orders in neighbours
+                ),
+            )
+            rows.extend(
+                FrequentlyBoughtTogether(
+                    product_id=product_id, recommended_id=-other_id, rank=rank, score=score
+                )
+                for rank, (score, _, other_id) in enumerate(best, start=1)
+            )
+        with transaction.atomic():
+            FrequentlyBoughtTogether.objects.filter(product_id__in=chunk).delete()
+            FrequentlyBoughtTogether.objects.bulk_create(rows)
+        ranked += len(chunk)
+    return ranked
+
+
+def refresh_recommendations(full=False, window=ORDER_ID_WINDOW):
+    """
+    Fold orders placed since the last run into the co-purchase matrix and
+    re-rank the products they touch, along with every product paired with
+    them (their totals moved, so their scores did too). Orders younger than
+    ``RECOMMENDATIONS_SETTLE_HOURS`` wait for the next run so late payments
+    are still counted.
+
+    Incremental runs only add: an order canceled or refunded after it was
+    counted stays in the matrix until the next ``full`` run, which recounts
+    everything from the order and archive tables (scheduled weekly).
+    Returns the run, or ``None`` when another refresh holds the lock.
+    """
+
+    if not cache.add(LOCK_KEY, 1, timeout=60 * 60):
+        return None
+    try:
+        if full:
+            # Current lists keep being served until their products are re-ranked.
+            CoPurchaseCount.objects.all().delete()
+            watermark = 0
+        else:
+            # Windows are committed with the watermark, so an interrupted run
+            # is continued rather than counted twice.
+            previous = CoPurchaseRun.objects.order_by("-id").first()
+            watermark = previous.last_order_id if previous else 0
+        run = CoPurchaseRun.objects.create(is_full=full, last_order_id=watermark)
+        if full:
+            # Archived orders left the order tables and were counted when
+            # they were placed, so only a rebuild needs them.
+            run.orders_counted = _count_archived(window)
+            run.save(update_fields=["orders_counted"])
+
+        settled = timezone.now() - timedelta(hours=settings.RECOMMENDATIONS_SETTLE_HOURS)
+        # Stop right before the oldest unsettled order; ids follow creation order.
+        unsettled = Order.objects.filter(id__gt=watermark, created_at__gt=settled).aggregate(
+            Min("id")
+        )["id__min"]
+        if unsettled is not None:
+            high = unsettled - 1
+        else:
+            high = Order.objects.aggregate(Max("id"))["id__max"] or watermark
+        affected = set()
+        low = watermark
+        while low < high:
+            upper = min(low + window, high)
+            with transaction.atomic():
+                _count_window(low, upper)
+                counted = Order.objects.filter(
+                    id__gt=low, id__lte=upper, status__in=COUNTED_STATUSES
+                )
+                run.orders_counted += counted.count()
+                run.last_order_id = upper
+                run.save(update_fields=["orders_counted", "last_order_id"])
+            affected.update(
+                OrderItem.objects.filter(order__in=counted).values_list("product_id", flat=True)
+            )
+            low = upper
+
+        if full:
+            affected = set(
+                CoPurchaseCount.objects.filter(product_id=F("other_id")).values_list(
+                    "product_id", flat=True
+                )
+            )
+            FrequentlyBoughtTogether.objects.exclude(product_id__in=affected).delete()
+        else:
+            affected |= _neighbours(affected)
+        run.products_ranked = rank_products(affected)
+        run.finished_at = timezone.now()
+        run.save(update_fields=["products_ranked", "finished_at"])
+        return run
+    finally:
+        cache.delete(LOCK_KEY)
@@ -0,0 +1,17 @@
+from celery import shared_task
+
+from .archive import archive_orders
+from .recommendations import refresh_recommendations
+
+
+@shared_task
+def archive_old_orders() -> int:
+    return archive_orders()
+
+
+@shared_task
+def refresh_co_purchases(full=False):
+    run = refresh_recommendations(full=full)
+    if run is None:
+        return None
+    return {"orders": run.orders_counted, "products": run.products_ranked}
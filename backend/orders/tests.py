@@ -0,0 +1,207 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from catalog.models import Brand, Category, Product
+from payments.models import Payment
+
+from .archive import archive_orders
+from .models import (
+    ArchivedOrder,
+    CoPurchaseCount,
+    FrequentlyBoughtTogether,
+    Order,
+    OrderItem,
+)
+from .recommendations import refresh_recommendations
+
+
+User = get_user_model()
+
+
+class ArchiveOrdersTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="user",
+            email="user@example.com",
+            password="password",
+        )
+        brand = Brand.objects.create(name="Acme", slug="acme")
+        category = Category.objects.create(name="Widgets", slug="widgets")
+        self.product = Product.objects.create(
+            name="Widget",
+            slug="widget",
+            brand=brand,
+            category=category,
+            price=Decimal("25.00"),
+            stock_quantity=10,
+        )
+
+    def create_order(self, status, age_days):
+        order = Order.objects.create(
+            user=self.user,
+            status=status,
+            subtotal=Decimal("50.00"),
+            grand_total=Decimal("50.00"),
+        )
+        OrderItem.objects.create(
+            order=order,
+            product=self.product,
+            quantity=2,
+            price_snapshot=Decimal("25.00"),
+        )
+        Order.objects.filter(pk=order.pk).update(
+            created_at=timezone.now() - timedelta(days=age_days)
+        )
+        return order
+
+    def test_archives_only_old_finished_orders(self):
+        old = self.create_order(Order.Status.DELIVERED, age_days=400)
+        Payment.objects.create(
+            order=old,
+            provider=Payment.Provider.YOOKASSA,
+            status=Payment.Status.CAPTURED,
+            amount=Decimal("50.00"),
+        )
+        old_pending = self.create_order(Order.Status.PENDING, age_days=400)
+        recent = self.create_order(Order.Status.DELIVERED, age_days=10)
+
+        archived = archive_orders(older_than_days=365, chunk_size=1)
+
+        self.assertEqual(archived, 1)
+        self.assertEqual(
+            set(Order.objects.values_list("id", flat=True)), {old_pending.id, recent.id}
+        )
+        self.assertFalse(OrderItem.objects.filter(order_id=old.id).exists())
+        record = ArchivedOrder.objects.get(pk=old.id)
+        self.assertEqual(record.user, self.user)
+        self.assertEqual(record.grand_total, Decimal("50.00"))
+        self.assertEqual(record.items[0]["product_id"], self.product.id)
+        self.assertEqual(record.items[0]["quantity"], 2)
+        self.assertEqual(record.items[0]["price_snapshot"], "25.00")
+        self.assertEqual(record.payments[0]["amount"], "50.00")
+        self.assertIsNone(record.shipment)
+
+    def test_order_with_a_conflicting_archive_row_is_kept(self):
+        order = self.create_order(Order.Status.DELIVERED, age_days=400)
+        other = self.create_order(Order.Status.DELIVERED, age_days=400)
+        ArchivedOrder.objects.create(
+            id=order.id,
+            status=Order.Status.DELIVERED,
+            created_at=timezone.now() - timedelta(days=800),
+            updated_at=timezone.now(),
+        )
+
+        with self.assertLogs("orders.archive", "ERROR"):
+            archived = archive_orders(older_than_days=365, chunk_size=1)
+
+        self.assertEqual(archived, 1)
+        self.assertTrue(Order.objects.filter(pk=order.pk).exists())
+        self.assertFalse(Order.objects.filter(pk=other.pk).exists())
+        self.assertTrue(ArchivedOrder.objects.filter(pk=other.pk).exists())
+
+    def test_archives_in_chunks(self):
+        for _ in range(3):
+            self.create_order(Order.Status.CANCELED, age_days=400)
+
+        self.assertEqual(archive_orders(older_than_days=365, chunk_size=2), 3)
+        self.assertEqual(ArchivedOrder.objects.count(), 3)
+        self.assertFalse(Order.objects.exists())
+
+
+@override_settings(RECOMMENDATIONS_TOP_K=2, RECOMMENDATIONS_MIN_SUPPORT=1)
+class FrequentlyBoughtTogetherTests(TestCase):
+    def setUp(self):
+        brand = Brand.objects.create(name="Acme", slug="acme")
+        category = Category.objects.create(name="Widgets", slug="widgets")
+        self.disc, self.pad, self.fluid, self.wiper = [
+            Product.objects.create(
+                name=slug, slug=slug, brand=brand, category=category, price=Decimal("10.00")
+            )
+            for slug in ("disc", "pad", "fluid", "wiper")
+        ]
+
+    def create_order(self, products, status=Order.Status.PAID, age_days=2):
+        order = Order.objects.create(status=status)
+        for product in products:
+            OrderItem.objects.create(order=order, product=product, price_snapshot=product.price)
+        Order.objects.filter(pk=order.pk).update(
+            created_at=timezone.now() - timedelta(days=age_days)
+        )
+        return order
+
+    def recommended(self, product):
+        return list(
+            FrequentlyBoughtTogether.objects.filter(product=product)
+            .order_by("rank")
+            .values_list("recommended__slug", flat=True)
+        )
+
+    def test_builds_top_k_and_refreshes_incrementally(self):
+        self.create_order([self.disc, self.pad])
+        self.create_order([self.disc, self.pad, self.fluid])
+        self.create_order([self.disc, self.fluid, self.wiper])
+        self.create_order([self.disc, self.wiper], status=Order.Status.CANCELED)
+        recent = self.create_order([self.disc, self.wiper], age_days=0)
+
+        run = refresh_recommendations()
+
+        self.assertEqual(run.orders_counted, 3)
+        self.assertEqual(CoPurchaseCount.objects.get(product=self.disc, other=self.disc).orders, 3)
+        self.assertEqual(self.recommended(self.disc), ["pad", "fluid"])
+        self.assertEqual(self.recommended(self.wiper), ["fluid", "disc"])
+
+        self.create_order([self.disc, self.wiper])
+        self.create_order([self.disc, self.wiper])
+        self.assertEqual(refresh_recommendations().orders_counted, 0)
+
+        Order.objects.filter(pk=recent.pk).update(created_at=timezone.now() - timedelta(days=2))
+        run = refresh_recommendations()
+
+        self.assertEqual(run.orders_counted, 3)
+        self.assertEqual(CoPurchaseCount.objects.get(product=self.disc, other=self.wiper).orders, 4)
+        self.assertEqual(self.recommended(self.disc)[0], "wiper")
+
+        refresh_recommendations(full=True)
+
+        self.assertEqual(CoPurchaseCount.objects.get(product=self.disc, other=self.wiper).orders, 4)
+
+    def test_reranks_products_paired_with_changed_ones(self):
+        self.create_order([self.pad, self.disc])
+        self.create_order([self.pad, self.fluid])
+        refresh_recommendations()
+        self.assertEqual(self.recommended(self.pad), ["disc", "fluid"])
+
+        # Only disc's total grows, which lowers its score on pad's list.
+        self.create_order([self.disc, self.wiper])
+        self.create_order([self.disc, self.wiper])
+        refresh_recommendations()
+
+        self.assertEqual(self.recommended(self.pad), ["fluid", "disc"])
+
+    def test_full_rebuild_counts_archive_and_drops_canceled_orders(self):
+        self.create_order([self.disc, self.fluid], status=Order.Status.DELIVERED, age_days=400)
+        archive_orders(older_than_days=365)
+        order = self.create_order([self.disc, self.pad])
+        refresh_recommendations()
+        self.assertEqual(self.recommended(self.disc), ["pad"])
+
+        Order.objects.filter(pk=order.pk).update(status=Order.Status.CANCELED)
+        run = refresh_recommendations(full=True)
+
+        self.assertEqual(run.orders_counted, 1)
+        self.assertEqual(self.recommended(self.disc), ["fluid"])
+        self.assertEqual(self.recommended(self.pad), [])
+
+    def test_product_detail_serves_recommendations(self):
+        self.create_order([self.disc, self.pad])
+        refresh_recommendations()
+
+        response = self.client.get(f"/api/products/{self.disc.id}/")
+
+        self.assertEqual(
+            [item["slug"] for item in response.json()["bought_together"]], ["pad"]
+        )
@@ -1,13 +1,45 @@
+import base64
 import os
 import re
 import uuid
 from typing import Optional
 
 import boto3
+import botocore.session
+from boto3.s3.transfer import TransferConfig
 from botocore.client import Config
+from botocore.exceptions import ClientError
+
+from metrics.collectors import S3_PRESIGN_SECONDS
 
 _FILENAME_SAFE_RE = re.compile(r"[^A-Za-z0-9._-]+")
 
+# Files above the threshold are sent as parallel multipart uploads.
+MULTIPART_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+)
+
+
+_data_loader = None
+
+
+def _session() -> boto3.session.Session:
+    """
+    A new session (sessions are not thread-safe) sharing one botocore data
+    loader, so the S3 service model JSON is parsed once per process instead of
+    on every client.
+    """
+
+    global _data_loader
+    session = botocore.session.get_session()
+    if _data_loader is None:
+        _data_loader = session.get_component("data_loader")
+    else:
+        session.register_component("data_loader", _data_loader)
+    return boto3.session.Session(botocore_session=session)
+
 
 def get_s3_client(endpoint_override: Optional[str] = None):
     endpoint = endpoint_override or os.getenv("MINIO_ENDPOINT", "http://minio:9000")
@@ -16,8 +48,7 @@ def get_s3_client(endpoint_override: Optional[str] = None):
     region = os.getenv("MINIO_REGION", "us-east-1")
     use_ssl = os.getenv("MINIO_USE_SSL", "False").lower() in ("1", "true", "yes")
 
-    session = boto3.session.Session()
-    return session.client(
+    return _session().client(
         "s3",
         endpoint_url=endpoint,
         aws_access_key_id=access_key,
@@ -37,28 +68,77 @@ def make_object_key(filename: str) -> str:
     return f"{uuid.uuid4()}-{safe_name}"
 
 
+def make_content_key(sha256: str, owner_id) -> str:
+    return f"sha256/{owner_id}/{sha256[:2]}/{sha256}"
+
+
 def presigned_put_url(
-    key: str, content_type: Optional[str] = None, expires_in: int = 900
+    key: str,
+    content_type: Optional[str] = None,
+    expires_in: int = 900,
+    sha256: Optional[str] = None,
 ) -> str:
     public_endpoint = os.getenv("MINIO_PUBLIC_ENDPOINT")
-    client = get_s3_client(endpoint_override=public_endpoint)
     params = {"Bucket": bucket_name(), "Key": key}
     if content_type:
         params["ContentType"] = content_type
-    url = client.generate_presigned_url(
-        ClientMethod="put_object",
-        Params=params,
-        ExpiresIn=expires_in,
-    )
+    if sha256:
+        # The client must send a matching x-amz-checksum-sha256 header, so the
+        # bucket rejects content that does not hash to the declared digest.
+        params["ChecksumSHA256"] = base64.b64encode(bytes.fromhex(sha256)).decode()
+    with S3_PRESIGN_SECONDS.labels("put_object").time():
+        client = get_s3_client(endpoint_override=public_endpoint)
+        url = client.generate_presigned_url(
+            ClientMethod="put_object",
+            Params=params,
+            ExpiresIn=expires_in,
+        )
     return url
 
 
 def presigned_get_url(key: str, expires_in: int = 900) -> str:
     public_endpoint = os.getenv("MINIO_PUBLIC_ENDPOINT")
-    client = get_s3_client(endpoint_override=public_endpoint)
-    url = client.generate_presigned_url(
-        ClientMethod="get_object",
-        Params={"Bucket": bucket_name(), "Key": key},
-        ExpiresIn=expires_in,
-    )
+    with S3_PRESIGN_SECONDS.labels("get_object").time():
+        client = get_s3_client(endpoint_override=public_endpoint)
+        url = client.generate_presigned_url(
+            ClientMethod="get_object",
+            Params={"Bucket": bucket_name(), "Key": key},
+            ExpiresIn=expires_in,
+        )
     return url
+
+
+def upload_fileobj(
+    fileobj,
+    key: str,
+    content_type: Optional[str] = None,
+    content_encoding: Optional[str] = None,
+) -> None:
+    extra_args = {}
+    if content_type:
+        extra_args["ContentType"] = content_type
+    if content_encoding:
+        extra_args["ContentEncoding"] = content_encoding
+    get_s3_client().upload_fileobj(
+        fileobj,
+        bucket_name(),
+        key,
+        ExtraArgs=extra_args,
+        Config=MULTIPART_TRANSFER_CONFIG,
+    )
+
+
+def object_exists(key: str, client=None) -> bool:
+    client = client or get_s3_client()
+    try:
+        client.head_object(Bucket=bucket_name(), Key=key)
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+    return True
+
+
+def delete_object(key: str, client=None) -> None:
+    client = client or get_s3_client()
+    client.delete_object(Bucket=bucket_name(), Key=key)
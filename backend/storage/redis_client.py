@@ -0,0 +1,34 @@
+import uuid
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from redis.exceptions import WatchError
+
+
+@lru_cache(maxsize=None)
+def get_redis(url: str = "") -> redis.Redis:
+    return redis.Redis.from_url(url or settings.REDIS_URL, decode_responses=True)
+
+
+def acquire_lock(client, key, timeout):
+    """
+    Take the lock ``key`` for at most ``timeout`` seconds; returns the token
+    for ``release_lock``, or None when someone else holds it.
+    """
+
+    token = uuid.uuid4().hex
+    return token if client.set(key, token, nx=True, ex=timeout) else None
+
+
+def release_lock(client, key, token):
+    # Only our own lock: after its timeout it may belong to someone else.
+    with client.pipeline() as pipe:
+        try:
+            pipe.watch(key)
+            if pipe.get(key) == token:
+                pipe.multi()
+                pipe.delete(key)
+                pipe.execute()
+        except WatchError:
+            pass
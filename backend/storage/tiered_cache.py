@@ -0,0 +1,187 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from redis.exceptions import RedisError
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "tiered-cache:invalidate"
+KEY_PREFIX = "tiered"
+RECONNECT_SECONDS = 1
+
+_MISSING = object()
+_registry = {}
+_listener_lock = threading.Lock()
+_listener_pid = None
+
+
+class TieredCache:
+    """
+    Per-process LRU (L1) in front of the default Django cache (L2) for small,
+    hot, rarely changing values. ``invalidate`` drops a key, or the whole
+    namespace, from L2 and from the L1 of every process that listens on the
+    Redis pub/sub channel; L1 entries also expire after
+    ``TIERED_CACHE_L1_TIMEOUT`` in case a message is lost. Keys are strings or
+    ints (they travel as JSON); values are shared between threads, so callers
+    must not mutate them.
+    """
+
+    def __init__(self, namespace, *, maxsize=None, timeout=None, l1_timeout=None):
+        self.namespace = namespace
+        self.maxsize = maxsize or settings.TIERED_CACHE_L1_MAXSIZE
+        self.timeout = timeout or settings.TIERED_CACHE_TIMEOUT
+        self.l1_timeout = l1_timeout or settings.TIERED_CACHE_L1_TIMEOUT
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        _registry[namespace] = self
+
+    def _generation_key(self):
+        return f"{KEY_PREFIX}:{self.namespace}:generation"
+
+    def _generation(self):
+        # Seeded from the clock so a flushed L2 never repeats an old generation.
+        generation = cache.get(self._generation_key())
+        if generation is None:
+            cache.add(self._generation_key(), time.time_ns(), timeout=None)
+            generation = cache.get(self._generation_key())
+        return generation
+
+    def _l2_key(self, key):
+        return f"{KEY_PREFIX}:{self.namespace}:{self._generation()}:{key}"
+
+    def get(self, key, loader):
+        """
+        The value cached under ``key``, else ``loader()`` (stored in both tiers).
+        Inside a transaction both tiers are bypassed: the loader may see
+        uncommitted rows, and invalidations are only sent on commit.
+        """
+
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return loader()
+        ensure_listener()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        l2_key = self._l2_key(key)
+        value = cache.get(l2_key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            cache.set(l2_key, value, self.timeout)
+        with self._lock:
+            self._entries[key] = (now + self.l1_timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def evict(self, key=None):
+        """
+        Drop ``key`` (everything when None) from this process's L1 only.
+        """
+
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def invalidate(self, key=None):
+        """
+        Drop ``key`` (the whole namespace when None) from L2 and from the L1 of
+        every process. Call it after commit.
+        """
+
+        if key is None:
+            try:
+                cache.incr(self._generation_key())
+            except ValueError:
+                cache.add(self._generation_key(), time.time_ns(), timeout=None)
+        else:
+            cache.delete(self._l2_key(key))
+        self.evict(key)
+        publish(self.namespace, key)
+
+
+def publish(namespace, key):
+    if not settings.TIERED_CACHE_BROADCAST:
+        return
+    try:
+        get_redis().publish(CHANNEL, json.dumps({"namespace": namespace, "key": key}))
+    except RedisError:
+        logger.warning("Could not broadcast invalidation of %s:%s", namespace, key, exc_info=True)
+
+
+def evict_all():
+    """
+    Drop every namespace from this process's L1.
+    """
+
+    for tiered in list(_registry.values()):
+        tiered.evict()
+
+
+def handle_message(data):
+    message = json.loads(data)
+    tiered = _registry.get(message["namespace"])
+    if tiered is not None:
+        tiered.evict(message["key"])
+
+
+def _listen():
+    resubscribing = False
+    while True:
+        try:
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CHANNEL)
+            if resubscribing:
+                # Messages sent while disconnected are lost.
+                evict_all()
+            for message in pubsub.listen():
+                handle_message(message["data"])
+        except RedisError:
+            logger.warning("Tiered cache invalidation listener lost Redis", exc_info=True)
+        except Exception:
+            logger.exception("Tiered cache invalidation listener failed")
+        resubscribing = True
+        time.sleep(RECONNECT_SECONDS)
+
+
+def ensure_listener():
+    """
+    Start this process's invalidation listener thread. Checked by pid, so a
+    process forked from one that already listens (gunicorn preload, Celery
+    prefork) starts its own.
+    """
+
+    global _listener_pid
+    if not settings.TIERED_CACHE_BROADCAST or _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        threading.Thread(target=_listen, name="tiered-cache-listener", daemon=True).start()
+        _listener_pid = os.getpid()
+
+
+def _after_fork_in_child():
+    # A lock held by another thread at fork time would never be released.
+    global _listener_lock
+    _listener_lock = threading.Lock()
+    for tiered in _registry.values():
+        tiered._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)